@@ -0,0 +1,57 @@
+"""Compare serial shutil.rmtree with the parallel Deleter
+
+Each variant deletes a freshly built synthetic workspace:
+
+    python benchmarks/bench_delete.py --projects 20 --workers 16
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_sizing import build_tree  # noqa: E402
+from cleaner import DEFAULT_DELETE_WORKERS, Deleter, folder_size  # noqa: E402
+
+
+def serial_delete(items):
+    """The original perform_deletion loop"""
+    for item in items:
+        shutil.rmtree(item['path'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--projects', type=int, default=20)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--fanout', type=int, default=5)
+    parser.add_argument('--files', type=int, default=8, help='files per leaf directory')
+    parser.add_argument('--workers', type=int, default=DEFAULT_DELETE_WORKERS)
+    args = parser.parse_args()
+
+    variants = [
+        ('serial rmtree', serial_delete),
+        (f'deleter[{args.workers}]', lambda items: Deleter(args.workers).delete(items)),
+        (f'deleter[{args.workers}] fan-out', lambda items: Deleter(args.workers, fan_out=True).delete(items)),
+    ]
+    for name, delete in variants:
+        root = tempfile.mkdtemp(prefix='cleaner-bench-')
+        try:
+            folders = build_tree(root, args.projects, args.depth, args.fanout, args.files)
+            # Report every folder as huge so the fan-out variant actually splits them
+            items = [{'path': f, 'type': 'Folder', 'size': folder_size(f) << 20} for f in folders]
+            start = time.perf_counter()
+            delete(items)
+            elapsed = time.perf_counter() - start
+            left = sum(os.path.exists(f) for f in folders)
+            print(f"{name:24} {elapsed:.3f}s  ({left} folders left)")
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
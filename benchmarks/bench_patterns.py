@@ -0,0 +1,74 @@
+"""Compare the old per-pattern loop with the compiled PatternMatcher
+
+Matches a million synthetic file names against every template's file
+patterns and folder names:
+
+    python benchmarks/bench_patterns.py --names 1000000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cleaner import TEMPLATES, PatternMatcher  # noqa: E402
+
+STEMS = ['index', 'utils', 'package', 'README', 'setup', 'conftest', 'app', 'yarn', 'debug']
+EXTENSIONS = ['.js', '.ts', '.py', '.pyc', '.pyo', '.json', '.lock', '.log', '.md', '.map', '']
+
+
+def linear_match(filename, patterns):
+    """The original ImprovedCleanerApp.should_clean_file"""
+    for pattern in patterns:
+        if '*' in pattern:
+            if pattern.startswith('*'):
+                if filename.endswith(pattern[1:]):
+                    return True
+            elif pattern.endswith('*'):
+                if filename.startswith(pattern[:-1]):
+                    return True
+        else:
+            if filename == pattern:
+                return True
+    return False
+
+
+def synthetic_names(count, seed=0):
+    rng = random.Random(seed)
+    names = [f"{rng.choice(STEMS)}{rng.randrange(100)}{rng.choice(EXTENSIONS)}" for _ in range(count)]
+    # Sprinkle in the exact names templates look for
+    for i in range(0, count, 97):
+        names[i] = rng.choice(['package-lock.json', 'yarn.lock', 'poetry.lock', '.coverage', 'node_modules'])
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--names', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    names = synthetic_names(args.names)
+    print(f"{len(names)} names")
+    for template, config in TEMPLATES.items():
+        patterns = config['files'] + config['folders']
+
+        start = time.perf_counter()
+        expected = sum(1 for name in names if linear_match(name, patterns))
+        linear_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        matcher = PatternMatcher(patterns)
+        matches = matcher.matches
+        found = sum(1 for name in names if matches(name))
+        compiled_time = time.perf_counter() - start
+
+        assert found == expected, (template, found, expected)
+        print(f"{template:8} linear {linear_time:.3f}s  compiled {compiled_time:.3f}s  "
+              f"speedup {linear_time / compiled_time:.2f}x  ({found} matches)")
+
+
+if __name__ == '__main__':
+    main()
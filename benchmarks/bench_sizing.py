@@ -0,0 +1,95 @@
+"""Compare serial recursive sizing with the FolderSizer worker pool
+
+Builds a synthetic workspace of node_modules-like trees and times both paths:
+
+    python benchmarks/bench_sizing.py --projects 40 --workers 16
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cleaner import DEFAULT_SIZE_WORKERS, FolderSizer  # noqa: E402
+
+
+def build_tree(root, projects, depth, fanout, files_per_dir):
+    """Create `projects` node_modules folders, each a fanout**depth tree"""
+    payload = b'x' * 512
+    folders = []
+    for p in range(projects):
+        modules = os.path.join(root, f'project-{p}', 'node_modules')
+        folders.append(modules)
+        level = [modules]
+        for _ in range(depth):
+            next_level = []
+            for parent in level:
+                for f in range(fanout):
+                    next_level.append(os.path.join(parent, f'pkg-{f}'))
+            level = next_level
+        for leaf in level:
+            os.makedirs(leaf, exist_ok=True)
+            for i in range(files_per_dir):
+                with open(os.path.join(leaf, f'file-{i}.js'), 'wb') as fh:
+                    fh.write(payload)
+    return folders
+
+
+def serial_size(folder_path):
+    """The original recursive calculate_folder_size"""
+    total_size = 0
+    try:
+        with os.scandir(folder_path) as entries:
+            for entry in entries:
+                if entry.is_file(follow_symlinks=False):
+                    try:
+                        total_size += entry.stat().st_size
+                    except (OSError, FileNotFoundError):
+                        pass
+                elif entry.is_dir(follow_symlinks=False):
+                    total_size += serial_size(entry.path)
+    except (OSError, FileNotFoundError, PermissionError):
+        pass
+    return total_size
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--projects', type=int, default=30)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--fanout', type=int, default=5)
+    parser.add_argument('--files', type=int, default=8, help='files per leaf directory')
+    parser.add_argument('--workers', type=int, default=DEFAULT_SIZE_WORKERS)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='cleaner-bench-')
+    try:
+        folders = build_tree(root, args.projects, args.depth, args.fanout, args.files)
+        print(f"{len(folders)} folders, {args.projects * args.fanout ** args.depth * args.files} files")
+
+        sizer = FolderSizer(args.workers)
+        for run in range(args.repeat):
+            serial_time, serial = timed(lambda: [serial_size(f) for f in folders])
+            pool_time, pooled = timed(lambda: dict(sizer.size_all(folders)))
+            assert sum(serial) == sum(usage.apparent for usage in pooled.values())
+            print(f"run {run + 1}: serial {serial_time:.3f}s  "
+                  f"pool[{sizer.workers}] {pool_time:.3f}s  "
+                  f"speedup {serial_time / pool_time:.2f}x")
+        sizer.shutdown()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Time what the GUI does before its first paint
+
+A cold ``import main`` in fresh interpreters (what a user waits for
+before the window appears), then saving and loading a results snapshot
+of the given size:
+
+    python benchmarks/bench_startup.py --repeat 10 --rows 100000
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cleaner import ResultStore  # noqa: E402
+
+IMPORT_PROBE = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+
+
+def import_times(repeat):
+    times = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', IMPORT_PROBE], cwd=ROOT, check=True,
+                             capture_output=True, text=True).stdout
+        times.append(float(out))
+    return times
+
+
+def synthetic_store(rows):
+    store = ResultStore('/work')
+    for i in range(rows):
+        project = f'/work/project{i % 1000}'
+        if i % 2:
+            store.add({'path': f'{project}/node_modules{i}', 'type': 'Folder', 'size': i * 4096,
+                       'template': 'Node.js'})
+        else:
+            store.add({'path': f'{project}/debug{i}.log', 'type': 'File', 'size': i, 'template': 'Node.js'})
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    times = import_times(args.repeat)
+    print(f"{'import main':24} median {statistics.median(times) * 1000:.1f}ms  min {min(times) * 1000:.1f}ms")
+
+    store = synthetic_store(args.rows)
+    fd, path = tempfile.mkstemp(prefix='cleaner-bench-', suffix='.bin')
+    os.close(fd)
+    try:
+        start = time.perf_counter()
+        store.save(path)
+        saved = time.perf_counter() - start
+        start = time.perf_counter()
+        loaded, _meta = ResultStore.load(path)
+        elapsed = time.perf_counter() - start
+        print(f"{'snapshot save':24} {saved * 1000:.1f}ms  ({os.path.getsize(path) >> 10} KiB, {args.rows} rows)")
+        print(f"{'snapshot load':24} {elapsed * 1000:.1f}ms  ({len(loaded)} rows)")
+        loaded.close()
+    finally:
+        store.close()
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
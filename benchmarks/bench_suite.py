@@ -0,0 +1,162 @@
+"""Time the scan, size and delete phases on a synthetic workspace, as JSON
+
+Every run builds a fresh tree (see synthetic.py) and measures:
+
+- scan and size without a ScanCache ("none"), with an empty one ("cold")
+  and with the one the cold pass saved ("warm")
+- delete of everything the scan found
+
+--drop-caches also empties the OS page cache before the "none" and
+"cold" passes (Linux, needs root); the report says whether it worked.
+The report goes to stdout or --output, so runs of different versions can
+be compared:
+
+    python benchmarks/bench_suite.py --projects 20 --repeat 5 --output bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import LAYOUTS, add_arguments, generate, tree_options  # noqa: E402
+from cleaner import (AUTO, DEFAULT_DELETE_WORKERS, DEFAULT_SIZE_WORKERS, Deleter, FolderSizer,  # noqa: E402
+                     ProjectScan, ScanCache)
+
+CACHE_MODES = ('none', 'cold', 'warm')
+
+
+def drop_page_cache():
+    """Whether the OS page cache could be emptied"""
+    try:
+        os.sync()
+        with open('/proc/sys/vm/drop_caches', 'w') as fh:
+            fh.write('3\n')
+        return True
+    except (OSError, AttributeError):
+        return False
+
+
+def commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def scan_and_size(root, cache, sizer):
+    """Returns (items found, scan timings, size timings)"""
+    start = time.perf_counter()
+    scan = ProjectScan([root], AUTO, cache)
+    items = list(scan)
+    scanned = {'seconds': time.perf_counter() - start, 'items': len(items), 'dirs_visited': scan.dirs_visited}
+    if cache is not None:
+        scanned['cache_hit_rate'] = round(cache.hit_rate, 4)
+
+    start = time.perf_counter()
+    folders = [item['path'] for item in items if item['type'] == 'Folder']
+    usages = dict(sizer.size_all(folders, cache))
+    if cache is not None:
+        cache.save()
+    sized = {'seconds': time.perf_counter() - start, 'folders': len(folders),
+             'bytes': sum(usage.apparent for usage in usages.values()),
+             'allocated': sum(usage.allocated for usage in usages.values())}
+    if cache is not None:
+        sized['cache_hit_rate'] = round(cache.hit_rate, 4)  # Over the scan and sizing lookups together
+    return items, scanned, sized
+
+
+def run_once(args, run, sizer, record):
+    workdir = tempfile.mkdtemp(prefix='cleaner-bench-')
+    try:
+        root = os.path.join(workdir, 'workspace')
+        start = time.perf_counter()
+        stats = generate(root, args.projects, args.layouts.split(','), **tree_options(args))
+        record(run, 'generate', None, seconds=time.perf_counter() - start, **stats.as_dict())
+
+        cache_path = os.path.join(workdir, 'scan-cache.sqlite3')
+        items = None
+        for mode in CACHE_MODES:
+            dropped = drop_page_cache() if args.drop_caches and mode != 'warm' else False
+            cache = None
+            if mode != 'none':
+                cache = ScanCache(cache_path)
+                cache.load(root)
+            items, scanned, sized = scan_and_size(root, cache, sizer)
+            record(run, 'scan', mode, page_cache_dropped=dropped, **scanned)
+            record(run, 'size', mode, page_cache_dropped=dropped, **sized)
+
+        start = time.perf_counter()
+        report = Deleter(args.delete_workers).delete(items)
+        record(run, 'delete', None, seconds=time.perf_counter() - start,
+               items=len(report.removed), errors=len(report.errors))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def summarize(results):
+    """min/median/max seconds per phase and cache mode"""
+    groups = {}
+    for result in results:
+        key = result['phase'] if result['cache'] is None else f"{result['phase']}:{result['cache']}"
+        groups.setdefault(key, []).append(result['seconds'])
+    return {key: {'min': min(times), 'median': statistics.median(times), 'max': max(times), 'runs': len(times)}
+            for key, times in groups.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_arguments(parser)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--size-workers', type=int, default=DEFAULT_SIZE_WORKERS)
+    parser.add_argument('--delete-workers', type=int, default=DEFAULT_DELETE_WORKERS)
+    parser.add_argument('--drop-caches', action='store_true', help="empty the page cache before cold passes")
+    parser.add_argument('--output', help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+    for layout in args.layouts.split(','):
+        if layout not in LAYOUTS:
+            parser.error(f"unknown layout {layout!r} (choose from {', '.join(LAYOUTS)})")
+
+    results = []
+
+    def record(run, phase, cache, **fields):
+        results.append({'run': run, 'phase': phase, 'cache': cache, **fields})
+        print(f"run {run} {phase:8} {cache or '':5} {fields['seconds']:.3f}s", file=sys.stderr)
+
+    sizer = FolderSizer(args.size_workers)
+    try:
+        for run in range(1, args.repeat + 1):
+            run_once(args, run, sizer, record)
+    finally:
+        sizer.shutdown()
+
+    report = {
+        'benchmark': 'cleaner-suite',
+        'commit': commit(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'params': {key: value for key, value in vars(args).items() if key != 'output'},
+        'summary': summarize(results),
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""Generate synthetic workspaces that look like real project trees
+
+Each project gets the layout its package manager would leave behind:
+
+- node: package.json and src/, a node_modules tree of packages with a
+  .bin folder of symlinks; with --hardlinks, package files are hard links
+  into a shared pnpm-style store next to the projects
+- python: pyproject.toml, a package with __pycache__ folders and a .venv
+  whose site-packages holds the dependency tree; bin/python is a symlink
+
+Depth and fan-out shape the dependency tree (fanout**depth leaf packages),
+files sets the files per package. The same seed gives the same tree:
+
+    python benchmarks/synthetic.py /tmp/workspace --projects 20 --hardlinks 0.3
+"""
+
+import argparse
+import json
+import os
+import random
+
+LAYOUTS = ('node', 'python')
+
+
+class TreeStats:
+    """What generate() created"""
+
+    def __init__(self):
+        self.projects = 0
+        self.dirs = 0
+        self.files = 0
+        self.bytes = 0
+        self.hardlinks = 0
+        self.symlinks = 0
+        self.artifacts = []  # Artifact folders, the ones a scan should find
+
+    def as_dict(self):
+        return {'projects': self.projects, 'dirs': self.dirs, 'files': self.files, 'bytes': self.bytes,
+                'hardlinks': self.hardlinks, 'symlinks': self.symlinks, 'artifacts': len(self.artifacts)}
+
+
+class TreeGenerator:
+    def __init__(self, root, depth=3, fanout=4, files=8, file_size=2048, hardlinks=0.0, symlinks=0.1, seed=0):
+        self.root = root
+        self.depth = depth
+        self.fanout = fanout
+        self.files = files
+        self.file_size = file_size
+        self.hardlinks = hardlinks  # Fraction of dependency files linked from the shared store
+        self.symlinks = symlinks  # Fraction of packages given an extra symlink
+        self.rng = random.Random(seed)
+        self.stats = TreeStats()
+        self.store = os.path.join(root, '.pnpm-store')
+        self._stored = []
+
+    def mkdir(self, path):
+        os.makedirs(path, exist_ok=True)
+        self.stats.dirs += 1
+
+    def write(self, path, size=None):
+        size = self.file_size if size is None else size
+        size = max(1, int(size * self.rng.uniform(0.25, 1.75)))
+        with open(path, 'wb') as fh:
+            fh.write(b'x' * size)
+        self.stats.files += 1
+        self.stats.bytes += size
+
+    def dependency_file(self, path):
+        """A package file, hard linked into the store for a share of them"""
+        if self.hardlinks and self.rng.random() < self.hardlinks:
+            if not self._stored or self.rng.random() < 0.5:
+                self.mkdir(self.store)
+                stored = os.path.join(self.store, f'blob-{len(self._stored)}')
+                self.write(stored)
+                self._stored.append(stored)
+            os.link(self.rng.choice(self._stored), path)
+            self.stats.hardlinks += 1
+        else:
+            self.write(path)
+
+    def symlink(self, target, path):
+        try:
+            os.symlink(target, path)
+        except OSError:  # Not permitted (e.g. Windows without developer mode)
+            return
+        self.stats.symlinks += 1
+
+    def packages(self, parent, extension):
+        """A fanout**depth tree of packages under parent; returns the package folders"""
+        level = [parent]
+        created = []
+        for depth in range(self.depth):
+            next_level = []
+            for folder in level:
+                for i in range(self.fanout):
+                    package = os.path.join(folder, f'pkg-{depth}-{i}')
+                    self.mkdir(package)
+                    next_level.append(package)
+            created.extend(next_level)
+            level = next_level
+        for package in created:
+            for i in range(self.files):
+                self.dependency_file(os.path.join(package, f'module-{i}{extension}'))
+        return created
+
+    def node_project(self, project):
+        with open(os.path.join(project, 'package.json'), 'w') as fh:
+            json.dump({'name': os.path.basename(project), 'version': '1.0.0'}, fh)
+        self.mkdir(os.path.join(project, 'src'))
+        for i in range(self.files):
+            self.write(os.path.join(project, 'src', f'component-{i}.js'))
+        modules = os.path.join(project, 'node_modules')
+        self.mkdir(modules)
+        self.stats.artifacts.append(modules)
+        packages = self.packages(modules, '.js')
+        bin_dir = os.path.join(modules, '.bin')
+        self.mkdir(bin_dir)
+        for package in packages:
+            if self.rng.random() < self.symlinks:
+                name = os.path.basename(package)
+                self.symlink(os.path.relpath(os.path.join(package, 'module-0.js'), bin_dir),
+                             os.path.join(bin_dir, f'{name}-{self.stats.symlinks}'))
+                self.symlink(os.path.basename(package), package + '-alias')  # Folder symlink
+
+    def python_project(self, project):
+        with open(os.path.join(project, 'pyproject.toml'), 'w') as fh:
+            fh.write(f'[project]\nname = "{os.path.basename(project)}"\n')
+        package = os.path.join(project, 'app')
+        cache = os.path.join(package, '__pycache__')
+        self.mkdir(cache)
+        self.stats.artifacts.append(cache)
+        for i in range(self.files):
+            self.write(os.path.join(package, f'module_{i}.py'))
+            self.write(os.path.join(cache, f'module_{i}.cpython-311.pyc'))
+        venv = os.path.join(project, '.venv')
+        site_packages = os.path.join(venv, 'lib', 'python3.11', 'site-packages')
+        self.mkdir(site_packages)
+        self.mkdir(os.path.join(venv, 'bin'))
+        self.stats.artifacts.append(venv)
+        self.symlink('/usr/bin/python3', os.path.join(venv, 'bin', 'python'))
+        for package in self.packages(site_packages, '.py'):
+            if self.rng.random() < self.symlinks:
+                self.symlink(os.path.basename(package), package + '-alias')
+
+    def generate(self, projects, layouts=LAYOUTS):
+        for p in range(projects):
+            layout = layouts[p % len(layouts)]
+            project = os.path.join(self.root, f'{layout}-project-{p}')
+            self.mkdir(project)
+            getattr(self, f'{layout}_project')(project)
+            self.stats.projects += 1
+        return self.stats
+
+
+def generate(root, projects=10, layouts=LAYOUTS, **options):
+    """Build a workspace under root; returns its TreeStats. Options are TreeGenerator's"""
+    return TreeGenerator(root, **options).generate(projects, layouts)
+
+
+def add_arguments(parser):
+    """Tree shape options shared by the benchmarks"""
+    parser.add_argument('--projects', type=int, default=10)
+    parser.add_argument('--layouts', default=','.join(LAYOUTS), help=f"comma separated: {', '.join(LAYOUTS)}")
+    parser.add_argument('--depth', type=int, default=3, help="levels of the dependency tree")
+    parser.add_argument('--fanout', type=int, default=4, help="packages per level")
+    parser.add_argument('--files', type=int, default=8, help="files per package")
+    parser.add_argument('--file-size', type=int, default=2048, help="average file size in bytes")
+    parser.add_argument('--hardlinks', type=float, default=0.0, help="fraction of dependency files hard linked")
+    parser.add_argument('--symlinks', type=float, default=0.1, help="fraction of packages given symlinks")
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def tree_options(args):
+    return {'depth': args.depth, 'fanout': args.fanout, 'files': args.files, 'file_size': args.file_size,
+            'hardlinks': args.hardlinks, 'symlinks': args.symlinks, 'seed': args.seed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('root')
+    add_arguments(parser)
+    args = parser.parse_args()
+    stats = generate(args.root, args.projects, args.layouts.split(','), **tree_options(args))
+    print(json.dumps(stats.as_dict()))
+
+
+if __name__ == '__main__':
+    main()
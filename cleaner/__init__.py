@@ -0,0 +1,58 @@
+"""Scan, size and delete engine behind Project Cleaner Pro
+
+The names below are imported from their modules on first use, so
+``import cleaner`` stays cheap: the GUI shows its window before the scan
+engine and what it needs (sqlite3, concurrent.futures, multiprocessing)
+is loaded.
+"""
+
+import importlib
+
+_MODULES = {
+    'cache': ('ScanCache',),
+    'deletion': ('DEFAULT_DELETE_WORKERS', 'Deleter', 'DeletionReport', 'remove_tree'),
+    'duplicates': ('DEFAULT_HASH_WORKERS', 'DuplicateFinder', 'DuplicateReport', 'link_duplicates'),
+    'metrics': ('DELETE', 'SIZE', 'UI', 'WALK', 'Metrics', 'PhaseStats', 'profiled'),
+    'paths': ('default_cache_dir', 'default_config_dir'),
+    'patterns': ('PatternMatcher', 'compile_patterns', 'glob_to_regex'),
+    'policy': ('BudgetPlanner', 'CleanupPolicy', 'modified_since', 'plan_budget'),
+    'registry': ('BUILTIN_REGISTRY', 'Registry', 'load_registry'),
+    'results': ('DEFAULT_MEMORY_BUDGET', 'ResultStore'),
+    'scanner': ('SKIP_FOLDERS', 'DirVisit', 'ProjectScan', 'TemplateDetector', 'dedupe_roots', 'list_dir',
+                'make_item', 'match_file', 'walk_project', 'walk_tree'),
+    'sizing': ('DEFAULT_SIZE_WORKERS', 'DiskUsage', 'FolderSizer', 'LinkedFiles', 'file_usage', 'folder_size',
+               'folder_usage', 'format_size', 'size_dir'),
+    'templates': ('AUTO', 'TEMPLATES', 'find_template'),
+    'trash': ('UNDO_GRACE_SECONDS', 'StagedItem', 'Trash'),
+    'traversal': ('DEFAULT_DEVICE_TIMEOUT', 'Traversal', 'mount_table'),
+    'watch': ('DEFAULT_MAX_WATCHES', 'LiveIndex'),
+}
+_MODULE_OF = {name: module for module, names in _MODULES.items() for name in names}
+
+__all__ = [
+    'AUTO', 'BUILTIN_REGISTRY', 'BudgetPlanner', 'CleanupPolicy', 'DEFAULT_DELETE_WORKERS',
+    'DEFAULT_DEVICE_TIMEOUT', 'DEFAULT_HASH_WORKERS', 'DEFAULT_MAX_WATCHES',
+    'DEFAULT_MEMORY_BUDGET', 'DEFAULT_SIZE_WORKERS', 'DELETE', 'Deleter', 'DeletionReport',
+    'DirVisit', 'DiskUsage', 'DuplicateFinder', 'DuplicateReport', 'FolderSizer',
+    'LinkedFiles', 'LiveIndex', 'Metrics', 'PatternMatcher', 'PhaseStats', 'ProjectScan',
+    'Registry', 'ResultStore', 'SIZE', 'SKIP_FOLDERS', 'ScanCache', 'StagedItem', 'TEMPLATES',
+    'TemplateDetector', 'Trash', 'Traversal', 'UI', 'UNDO_GRACE_SECONDS', 'WALK',
+    'compile_patterns', 'dedupe_roots', 'default_cache_dir', 'default_config_dir',
+    'file_usage', 'find_template', 'folder_size', 'folder_usage', 'format_size', 'glob_to_regex',
+    'link_duplicates', 'list_dir', 'load_registry', 'make_item', 'match_file',
+    'modified_since', 'mount_table', 'plan_budget', 'profiled', 'remove_tree', 'size_dir',
+    'walk_project', 'walk_tree',
+]
+
+
+def __getattr__(name):
+    module = _MODULE_OF.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module}', __name__), name)
+    globals()[name] = value  # Later lookups skip this function
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,6 @@
+import sys
+
+from .cli import main
+
+if __name__ == '__main__':  # Not when a spawned worker process imports this module
+    sys.exit(main())
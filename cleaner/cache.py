@@ -0,0 +1,229 @@
+"""Persistent scan cache keyed by directory mtime
+
+Each directory's listing (for the project walk) and direct file bytes (for
+folder sizing) are stored together with the directory's inode and mtime. A
+directory's mtime changes whenever an entry is added, removed or renamed in
+it, so while it is unchanged the stored listing can be reused without a
+scandir. File contents rewritten in place do not bump the directory mtime;
+build tools and package managers write through rename, so artifact sizes
+stay accurate in practice. The same goes for the link counts of hardlinked
+files, which change when a link is added elsewhere; a package manager
+linking a new project usually rewrites the folders they are counted in.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+from .paths import default_cache_dir
+from .scanner import list_dir
+from .sizing import size_dir
+
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+CACHE_MAX_AGE = 30 * 24 * 3600  # Drop directories not seen for a month
+SCHEMA_VERSION = 2  # Bump when a table changes; older tables are dropped and rebuilt
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS walk (
+    path TEXT PRIMARY KEY,
+    ino INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    dirs TEXT NOT NULL,
+    files TEXT NOT NULL,
+    seen INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sizes (
+    path TEXT PRIMARY KEY,
+    ino INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    dirs TEXT NOT NULL,
+    file_bytes INTEGER NOT NULL,
+    allocated INTEGER NOT NULL,
+    links BLOB NOT NULL,
+    seen INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS walk_seen ON walk (seen);
+CREATE INDEX IF NOT EXISTS sizes_seen ON sizes (seen);
+"""
+_COLUMNS = {'walk': 6, 'sizes': 8}
+
+
+def _join(names):
+    return '\0'.join(names)
+
+
+def _split(text):
+    return tuple(text.split('\0')) if text else ()
+
+
+class ScanCache:
+    """Directory listings and sizes from earlier scans, reused while unchanged
+
+    load() pulls the rows under one scan root into memory, lookups are then
+    plain dict reads that are safe from the sizer worker threads, and save()
+    writes back what changed and evicts old rows to stay under max_bytes.
+    """
+
+    def __init__(self, path=None, max_bytes=CACHE_MAX_BYTES, max_age=CACHE_MAX_AGE):
+        self.path = path or os.path.join(default_cache_dir(), 'scan-cache.sqlite3')
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._walk = {}   # path -> ((ino, mtime_ns), (dirs, files))
+        self._sizes = {}  # path -> ((ino, mtime_ns), (dirs, file_bytes, allocated, links))
+        self._dirty_walk = set()
+        self._dirty_sizes = set()
+        self._seen_walk = set()
+        self._seen_sizes = set()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # Serialises forget() and save()
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")  # Only takes effect on a new file
+        conn.execute("PRAGMA journal_mode = WAL")
+        if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            conn.executescript("DROP TABLE IF EXISTS walk; DROP TABLE IF EXISTS sizes;")
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def load(self, root):
+        """Read cached rows for root and everything below it"""
+        root = os.path.abspath(root)
+        # Rows under root sort between root + sep and root + the next character
+        lower = root.rstrip(os.sep) + os.sep
+        upper = lower[:-1] + chr(ord(os.sep) + 1)
+        try:
+            conn = self._connect()
+        except (OSError, sqlite3.Error):
+            return self
+        try:
+            for table, entries in (('walk', self._walk), ('sizes', self._sizes)):
+                rows = conn.execute(
+                    f"SELECT * FROM {table} WHERE path = ? OR (path >= ? AND path < ?)",
+                    (root, lower, upper))
+                for path, ino, mtime_ns, dirs, *values, _seen in rows:
+                    if table == 'walk':
+                        values = [_split(values[0])]
+                    entries[path] = ((ino, mtime_ns), (_split(dirs), *values))
+        except sqlite3.Error:
+            pass
+        finally:
+            conn.close()
+        return self
+
+    def _lookup(self, entries, dirty, seen, path, loader, stats):
+        if stats is not None:
+            stats.add(syscalls=1)  # The stat below
+        try:
+            st = os.stat(path)
+        except OSError:
+            return loader(path, stats)
+        key = (st.st_ino, st.st_mtime_ns)
+
+        cached = entries.get(path)
+        if cached is not None and cached[0] == key:
+            seen.add(path)
+            with self._lock:
+                self.hits += 1
+            if stats is not None:
+                stats.add(dirs=1)
+            return cached[1]
+
+        # Stat before reading: a change racing the read leaves an older mtime
+        # on the row, so the next scan sees it as dirty
+        value = loader(path, stats)
+        entries[path] = (key, value)
+        dirty.add(path)
+        with self._lock:
+            self.misses += 1
+        return value
+
+    def listdir(self, path, stats=None):
+        """Cached scanner.list_dir"""
+        return self._lookup(self._walk, self._dirty_walk, self._seen_walk, path, list_dir, stats)
+
+    def size_dir(self, path, stats=None):
+        """Cached sizing.size_dir"""
+        return self._lookup(self._sizes, self._dirty_sizes, self._seen_sizes, path, size_dir, stats)
+
+    def forget(self, paths):
+        """Drop rows for deleted paths and everything below them"""
+        exact = {os.path.normpath(path) for path in paths}
+        prefixes = tuple(path.rstrip(os.sep) + os.sep for path in exact)
+        with self._write_lock:
+            for entries, dirty in ((self._walk, self._dirty_walk), (self._sizes, self._dirty_sizes)):
+                # list() snapshots the keys; sizer threads may still be adding rows
+                for cached_path in [p for p in list(entries) if p in exact or p.startswith(prefixes)]:
+                    entries.pop(cached_path, None)
+                    dirty.add(cached_path)
+
+    def save(self):
+        """Write changed rows, refresh last-seen times and evict to fit the cap"""
+        with self._write_lock:
+            now = int(time.time())
+            try:
+                conn = self._connect()
+            except (OSError, sqlite3.Error):
+                return
+            try:
+                with conn:
+                    for table, entries, dirty, seen in (
+                            ('walk', self._walk, self._dirty_walk, self._seen_walk),
+                            ('sizes', self._sizes, self._dirty_sizes, self._seen_sizes)):
+                        changed = set(dirty)
+                        dirty.difference_update(changed)
+                        touched = set(seen)
+                        seen.difference_update(touched)
+                        touched -= changed
+                        rows = [(p, entries.get(p)) for p in changed]
+                        conn.executemany(f"DELETE FROM {table} WHERE path = ?",
+                                         ((p,) for p, entry in rows if entry is None))
+                        conn.executemany(
+                            f"INSERT OR REPLACE INTO {table} VALUES ({', '.join('?' * _COLUMNS[table])})",
+                            (self._row(table, p, entry, now) for p, entry in rows if entry is not None))
+                        conn.executemany(f"UPDATE {table} SET seen = ? WHERE path = ?",
+                                         ((now, p) for p in touched))
+                self._evict(conn, now)
+            except sqlite3.Error:
+                pass
+            finally:
+                conn.close()
+
+    @staticmethod
+    def _row(table, path, entry, now):
+        (ino, mtime_ns), (dirs, *values) = entry
+        if table == 'walk':
+            values = [_join(values[0])]
+        return (path, ino, mtime_ns, _join(dirs), *values, now)
+
+    def _evict(self, conn, now):
+        with conn:
+            for table in ('walk', 'sizes'):
+                conn.execute(f"DELETE FROM {table} WHERE seen < ?", (now - self.max_age,))
+
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        while True:
+            pages, free = (conn.execute(f"PRAGMA {p}").fetchone()[0] for p in ('page_count', 'freelist_count'))
+            if (pages - free) * page_size <= self.max_bytes:
+                break
+            # Drop the least recently seen quarter of each table and re-check
+            with conn:
+                for table in ('walk', 'sizes'):
+                    count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                    conn.execute(
+                        f"DELETE FROM {table} WHERE path IN "
+                        f"(SELECT path FROM {table} ORDER BY seen LIMIT ?)", (max(1, count // 4),))
+            if not any(conn.execute(f"SELECT 1 FROM {t} LIMIT 1").fetchone() for t in ('walk', 'sizes')):
+                break
+        # Frees a page per step; execute() would step once, executescript() runs it to the end
+        conn.executescript("PRAGMA incremental_vacuum;")
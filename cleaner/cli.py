@@ -0,0 +1,438 @@
+"""Headless command line interface
+
+    python -m cleaner scan PATH... [-t TEMPLATE[,TEMPLATE...] | -t auto]
+    python -m cleaner size PATH... [-t TEMPLATE] [--min-size 10MB] [--idle-days 90] [--keep PATTERN]
+    python -m cleaner clean PATH... [-t TEMPLATE] [--free 20GB] (--dry-run | --yes)
+    python -m cleaner watch PATH... [-t TEMPLATE]
+    python -m cleaner dedup PATH... [-t TEMPLATE] [--min-file-size 4KB] [--link]
+    python -m cleaner templates [PATH...] [--config FILE]
+
+Results stream to stdout as NDJSON, one object per line with an "event"
+key ("item", "deleted", "error" or the final "summary"), so little is
+held in memory beyond the folders still being sized. Use --format text for
+a human readable listing. Never imports tkinter.
+
+"size" is the apparent size; sized items also carry "allocated" (blocks on
+disk) and "reclaimable" (what deleting that item alone frees, leaving out
+files hardlinked from elsewhere). Summaries count each inode once across
+all items.
+
+"watch" keeps a live index of the roots up to date and streams "added",
+"removed" and "resized" events until interrupted; scan, size and clean
+given --index answer from the index it saved instead of walking.
+
+size and clean only keep items that pass the policy options (--min-size,
+--idle-days, --keep). With --free they instead plan the fewest, largest
+items that free that much, listed largest first. Planning needs every
+candidate's size, so --free always scans and sizes the whole tree.
+
+Directories reached twice (bind mounts), on another filesystem with
+--one-file-system, or on a network mount that stopped answering within
+--device-timeout come out as "skipped" events with a reason. The same
+timeout applies while sizing; a folder given up on there is skipped too.
+
+"dedup" reports what the found folders store more than once: "package"
+events for a name and version installed in several places, "duplicate"
+events for groups of identical files (hashed in stages, see
+duplicates.py). --link replaces the copies with hard links.
+
+Templates are the built-ins plus those in the user's templates.toml (or
+.json), each root's .cleaner.toml and any --config files; see
+registry.py for the format. "templates" prints the merged result as JSON,
+which also checks the files.
+
+--metrics FILE writes per-phase counters and timings (walk, size, delete)
+as JSON when the command ends, --trace FILE the timed subtrees as Chrome
+trace events and --profile FILE a cProfile dump of the main thread.
+"""
+
+import argparse
+import json
+import os
+import queue
+import sys
+import time
+
+from .cache import ScanCache
+from .deletion import DEFAULT_DELETE_WORKERS, Deleter
+from .duplicates import DEFAULT_HASH_WORKERS, DuplicateFinder, link_duplicates
+from .metrics import SIZE, Metrics, profiled
+from .policy import BudgetPlanner, CleanupPolicy
+from .registry import load_registry
+from .scanner import ProjectScan
+from .sizing import DEFAULT_SIZE_WORKERS, DiskUsage, FolderSizer, format_size
+from .templates import AUTO, TEMPLATES
+from .traversal import DEFAULT_DEVICE_TIMEOUT
+from .watch import DEFAULT_MAX_WATCHES, LiveIndex
+
+EXIT_OK = 0
+EXIT_FOUND = 1  # --check found something to clean
+EXIT_USAGE = 2  # Same code argparse uses
+EXIT_DELETE_ERRORS = 3
+EXIT_INTERRUPTED = 130
+
+_UNITS = {'': 1, 'B': 1, 'K': 1024, 'KB': 1024, 'M': 1024 ** 2, 'MB': 1024 ** 2,
+          'G': 1024 ** 3, 'GB': 1024 ** 3, 'T': 1024 ** 4, 'TB': 1024 ** 4}
+
+
+def parse_size(text):
+    """'512', '10MB', '1.5G' -> bytes"""
+    text = text.strip().upper()
+    number = text.rstrip('KMGTB')
+    try:
+        return int(float(number) * _UNITS[text[len(number):]])
+    except (ValueError, KeyError):
+        raise argparse.ArgumentTypeError(f"invalid size: {text!r}")
+
+
+class Output:
+    """Writes events as NDJSON or as aligned text lines"""
+
+    def __init__(self, fmt, stream=None):
+        self.fmt = fmt
+        self.stream = stream or sys.stdout
+
+    def emit(self, event, item=None, **fields):
+        if item is not None:
+            fields = {'path': item['path'], 'relative_path': item['relative_path'],
+                      'type': item['type'], 'size': item['size'], 'template': item['template'], **fields}
+            usage = item.get('usage')
+            if usage is not None:
+                fields.update(allocated=usage.allocated, reclaimable=usage.reclaimable)
+        if self.fmt == 'ndjson':
+            self.stream.write(json.dumps({'event': event, **fields}) + '\n')
+        elif event == 'summary':
+            self.stream.write('  '.join(f"{k}={v}" for k, v in fields.items()) + '\n')
+        else:
+            size = format_size(fields['size']) if fields.get('size') is not None else '-'
+            reason = fields.get('error', fields.get('reason'))
+            note = f"  ({reason})" if reason else ''
+            self.stream.write(f"{event:8} {size:>10}  {fields.get('type', ''):6} "
+                              f"{fields.get('relative_path', fields.get('path', ''))}{note}\n")
+
+
+def iter_results(args, sized):
+    """Yield scan items, with folder sizes filled in when sized is true
+
+    Files come out as soon as they are found; folders as soon as their
+    sizer worker finishes, interleaved with the walk.
+    """
+    if args.index:
+        index = LiveIndex(args.paths, args.template, registry=args.registry)
+        if index.load():
+            yield from index.items()
+            return
+    scan = ProjectScan(args.paths, args.template, metrics=args.metrics, one_filesystem=args.one_file_system,
+                       device_timeout=args.device_timeout, registry=args.registry)
+    if not args.no_cache:
+        scan.cache = ScanCache()
+        for root in scan.roots:
+            scan.cache.load(root)
+    cache = scan.cache
+    if not sized:
+        try:
+            yield from scan
+        finally:
+            if scan.traversal is not None:
+                args.skipped.extend(scan.traversal.skipped)
+        if cache is not None and not scan.cancelled:
+            cache.save()
+        return
+
+    done = queue.SimpleQueue()
+    sizer = FolderSizer(args.size_workers, args.device_timeout)
+    stats = args.metrics[SIZE] if args.metrics is not None else None
+    if stats is not None:
+        stats.start()
+    pending = 0
+    try:
+        for item in scan:
+            if item['size'] is not None:
+                yield item
+            else:
+                pending += 1
+                sizer.submit(item['path'], lambda path, usage, item=item: done.put((item, usage)), cache, stats)
+            while pending:
+                try:
+                    item, usage = done.get_nowait()
+                except queue.Empty:
+                    break
+                pending -= 1
+                item['size'], item['usage'] = usage.apparent, usage
+                yield item
+        while pending:
+            item, usage = done.get()
+            pending -= 1
+            item['size'], item['usage'] = usage.apparent, usage
+            yield item
+    finally:
+        sizer.shutdown(wait=False)
+        if stats is not None:
+            stats.finish()
+        if scan.traversal is not None:
+            args.skipped.extend(scan.traversal.skipped)
+        args.skipped.extend(sizer.skipped)
+    if cache is not None and not scan.cancelled:
+        cache.save()
+
+
+def emit_skipped(args, out):
+    for path, reason in args.skipped:
+        out.emit('skipped', path=path, reason=reason)
+
+
+def usage_fields(usages):
+    """Summary sizes for items' DiskUsages together, hardlinked files counted once"""
+    usage = DiskUsage.combine(u for u in usages if u is not None)
+    return {'bytes': usage.apparent, 'allocated': usage.allocated, 'reclaimable': usage.reclaimable}
+
+
+def select_items(args):
+    """Sized items passing the policy options, or the --free plan"""
+    policy = CleanupPolicy(args.min_size, args.idle_days, args.keep, registry=args.registry)
+    if not args.free:
+        for item in iter_results(args, sized=True):
+            if policy.accepts(item):
+                yield item
+        return
+    # No early stop: an item still to come may free more than everything chosen so far,
+    # and nothing bounds a folder's size short of reading it. The scan cache's sizes
+    # hold only while each directory's mtime does, and checking that costs the same
+    # one stat per directory as sizing the folder from the cache.
+    planner = BudgetPlanner(args.free)
+    for item in iter_results(args, sized=True):
+        if policy.accepts(item):
+            planner.offer(item)
+    yield from planner.chosen()
+
+
+def run_listing(args, out, sized):
+    count = total = 0
+    usages = []  # Only the compact DiskUsage of each item is kept, for the summary
+    for item in select_items(args) if sized else iter_results(args, sized):
+        count += 1
+        total += item['size'] or 0
+        usages.append(item['usage'])
+        out.emit('item', item)
+    emit_skipped(args, out)
+    if sized:
+        out.emit('summary', items=count, **usage_fields(usages))
+    else:
+        out.emit('summary', items=count, bytes=total)
+    return EXIT_FOUND if args.check and count else EXIT_OK
+
+
+def run_clean(args, out):
+    items = []
+    for item in select_items(args):
+        items.append(item)
+        if args.dry_run:
+            out.emit('item', item, action='would-delete')
+    emit_skipped(args, out)
+    if args.dry_run:
+        out.emit('summary', items=len(items), **usage_fields(item['usage'] for item in items), dry_run=True)
+        return EXIT_FOUND if args.check and items else EXIT_OK
+
+    def on_item(item, error, report):
+        if error is None:
+            out.emit('deleted', item)
+        else:
+            out.emit('error', item, error=str(error))
+
+    report = Deleter(args.delete_workers, fan_out=args.fan_out).delete(items, on_item, args.metrics)
+    removed = set(report.removed)
+    freed = usage_fields(item['usage'] for item in items if item['path'] in removed)
+    out.emit('summary', items=len(removed), **freed, errors=len(report.errors))
+    return EXIT_DELETE_ERRORS if report.errors else EXIT_OK
+
+
+def run_dedup(args, out):
+    folders = [item['path'] for item in iter_results(args, sized=False) if item['type'] == 'Folder']
+    emit_skipped(args, out)
+    report = DuplicateFinder(args.hash_workers, args.min_file_size).find(folders)
+    for package in report.packages[:args.top]:
+        out.emit('package', path=f"{package.name}@{package.version}", size=package.wasted, **package.as_dict())
+    for group in report.groups[:args.top]:
+        out.emit('duplicate', **group.as_dict(), path=group.paths[0])
+    linked = {}
+    errors = []
+    if args.link:
+        result = link_duplicates(report)
+        for path, reason in result.skipped:
+            out.emit('skipped', path=path, reason=reason)
+        for path, message in result.errors:
+            out.emit('error', path=path, error=message)
+        linked = {'linked': len(result.linked), 'bytes_freed': result.bytes_freed}
+        errors = result.errors
+    out.emit('summary', folders=len(folders), **report.summary(), **linked)
+    if errors:
+        return EXIT_DELETE_ERRORS
+    return EXIT_FOUND if args.check and (report.groups or report.packages) else EXIT_OK
+
+
+def run_watch(args, out):
+    def on_change(added, removed, resized):
+        for item in added:
+            out.emit('added', item)
+        for path in removed:
+            out.emit('removed', path=path)
+        for item in resized:
+            out.emit('resized', item)
+        out.stream.flush()
+
+    index = LiveIndex(args.paths, args.template, max_watches=args.max_watches,
+                      poll_interval=args.poll_interval, on_change=on_change, registry=args.registry)
+    if index.load():
+        for item in index.items():
+            out.emit('item', item)
+        out.stream.flush()
+    index.start()
+    try:
+        while index.running:
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass  # The normal way to stop watching
+    finally:
+        index.stop()
+    return EXIT_OK
+
+
+def run_command(args, out):
+    if args.command == 'clean':
+        return run_clean(args, out)
+    if args.command == 'dedup':
+        return run_dedup(args, out)
+    return run_listing(args, out, sized=args.command == 'size')
+
+
+def template_names(text):
+    """'auto', or a comma separated list of template names, looked up once the registry is loaded"""
+    if text.strip().lower() == AUTO:
+        return AUTO
+    return [name.strip() for name in text.split(',') if name.strip()]
+
+
+def resolve_templates(parser, args):
+    """Load the template registry for the roots and look up the -t names in it"""
+    try:
+        args.registry = load_registry(args.paths, args.config)
+    except ValueError as e:
+        parser.error(str(e))
+    except OSError as e:
+        parser.error(f"cannot read {e.filename}: {e.strerror}")
+    if getattr(args, 'template', AUTO) == AUTO:
+        return
+    try:
+        args.template = [args.registry.find(name) for name in args.template]
+    except KeyError as e:
+        parser.error(f"unknown template {e.args[0]!r} (choose from {', '.join(args.registry)} or {AUTO})")
+
+
+def run_templates(args, out):
+    out.stream.write(json.dumps(args.registry.as_dict(), indent=2) + '\n')
+    return EXIT_OK
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='cleaner', description="Find and remove build artifacts and dependency folders.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('paths', nargs='+', metavar='path', help="project folders to scan in one pass")
+    common.add_argument('-t', '--template', type=template_names, default=['Next.js'],
+                        help=f"comma separated list of {', '.join(TEMPLATES)} or configured templates, "
+                             f"or '{AUTO}' to detect each project's type (default: Next.js)")
+    common.add_argument('--config', action='append', default=[], metavar='FILE',
+                        help="read templates from this TOML or JSON file too (repeatable)")
+    common.add_argument('--format', choices=['ndjson', 'text'], default='ndjson')
+    common.add_argument('--no-cache', action='store_true', help="ignore and do not update the scan cache")
+    common.add_argument('--check', action='store_true', help=f"exit with {EXIT_FOUND} if anything was found")
+
+    sizing = argparse.ArgumentParser(add_help=False)
+    sizing.add_argument('--min-size', type=parse_size, default=0, help="skip items smaller than this (e.g. 10MB)")
+    sizing.add_argument('--idle-days', type=float, metavar='DAYS',
+                        help="only items whose project has no source file changed in this many days")
+    sizing.add_argument('--keep', action='append', default=[], metavar='PATTERN',
+                        help="never select items at or below paths matching this pattern (repeatable)")
+    sizing.add_argument('--free', type=parse_size, metavar='SIZE',
+                        help="pick the fewest, largest items that free this much (e.g. 20GB)")
+    sizing.add_argument('--size-workers', type=int, default=DEFAULT_SIZE_WORKERS)
+
+    indexed = argparse.ArgumentParser(add_help=False)
+    indexed.add_argument('--index', action='store_true',
+                         help="answer from the live index kept by 'watch' when there is one")
+    indexed.add_argument('-x', '--one-file-system', action='store_true',
+                         help="do not cross into other filesystems below the roots")
+    indexed.add_argument('--device-timeout', type=float, default=DEFAULT_DEVICE_TIMEOUT, metavar='SECONDS',
+                         help="give up on a network mount that does not answer for this long")
+    indexed.add_argument('--metrics', dest='metrics_path', metavar='FILE',
+                         help="write per-phase counters and timings here as JSON")
+    indexed.add_argument('--trace', dest='trace_path', metavar='FILE',
+                         help="write timed subtrees here as Chrome trace events")
+    indexed.add_argument('--profile', dest='profile_path', metavar='FILE',
+                         help="write a cProfile dump of the main thread here")
+
+    commands.add_parser('scan', parents=[common, indexed], help="list matching items without sizing folders")
+    commands.add_parser('size', parents=[common, sizing, indexed], help="list matching items with their sizes")
+    clean = commands.add_parser('clean', parents=[common, sizing, indexed], help="delete matching items")
+    mode = clean.add_mutually_exclusive_group(required=True)
+    mode.add_argument('--dry-run', action='store_true', help="only report what would be deleted")
+    mode.add_argument('--yes', action='store_true', help="delete without asking")
+    clean.add_argument('--delete-workers', type=int, default=DEFAULT_DELETE_WORKERS)
+    clean.add_argument('--fan-out', action='store_true', help="split very large folders across delete workers")
+    dedup = commands.add_parser('dedup', parents=[common, indexed],
+                                help="report packages and files duplicated across the found folders")
+    dedup.add_argument('--min-file-size', type=parse_size, default=1, metavar='SIZE',
+                       help="leave out files smaller than this (e.g. 4KB)")
+    dedup.add_argument('--hash-workers', type=int, default=DEFAULT_HASH_WORKERS,
+                       help="processes hashing whole files")
+    dedup.add_argument('--top', type=int, metavar='N', help="only list the N most wasteful packages and groups")
+    dedup.add_argument('--link', action='store_true', help="replace duplicate files with hard links to one copy")
+    watch = commands.add_parser('watch', parents=[common], help="keep a live index up to date and stream changes")
+    watch.add_argument('--max-watches', type=int, default=DEFAULT_MAX_WATCHES,
+                       help="inotify watches to use at most; the rest is polled")
+    watch.add_argument('--poll-interval', type=float, default=60, help="seconds between polls")
+    templates = commands.add_parser('templates', help="print the templates in effect for some folders as JSON")
+    templates.add_argument('paths', nargs='*', metavar='path', help="folders whose .cleaner.toml to include")
+    templates.add_argument('--config', action='append', default=[], metavar='FILE',
+                           help="read templates from this TOML or JSON file too (repeatable)")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    for path in args.paths:
+        if not os.path.isdir(path):
+            parser.error(f"not a folder: {path}")
+    resolve_templates(parser, args)
+    if args.command == 'templates':
+        return run_templates(args, Output('ndjson'))
+    out = Output(args.format)
+    args.skipped = []  # (path, reason) the traversal left out
+    if args.command == 'watch':
+        args.metrics = None
+    else:
+        args.metrics = Metrics(trace=bool(args.trace_path)) if args.metrics_path or args.trace_path else None
+    try:
+        if args.command == 'watch':
+            return run_watch(args, out)
+        if args.profile_path:
+            with profiled(args.profile_path):
+                return run_command(args, out)
+        return run_command(args, out)
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
+    except BrokenPipeError:
+        sys.stderr.close()  # Reader went away (e.g. `| head`); stay quiet
+        return EXIT_OK
+    finally:
+        if args.metrics is not None:
+            if args.metrics_path:
+                args.metrics.save(args.metrics_path)
+            if args.trace_path:
+                args.metrics.save_trace(args.trace_path)
+        try:
+            sys.stdout.flush()
+        except BrokenPipeError:
+            pass
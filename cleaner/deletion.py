@@ -0,0 +1,235 @@
+"""Deletion of scan results on a bounded worker pool"""
+
+import os
+import shutil
+import stat
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .metrics import DELETE
+from .sizing import DiskUsage
+
+# Deleting is bound by unlink/rmdir latency rather than CPU, more so on
+# network and overlay filesystems, so oversubscribe the cores.
+DEFAULT_DELETE_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# Folders at least this large are split across workers when fan_out is on
+FAN_OUT_MIN_BYTES = 64 * 1024 * 1024
+
+_DIR_FLAGS = os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0) | getattr(os, 'O_NOFOLLOW', 0)
+
+# fd-relative removal needs openat/unlinkat and scandir on a descriptor (POSIX)
+HAVE_FD_REMOVAL = (os.unlink in os.supports_dir_fd and os.rmdir in os.supports_dir_fd
+                   and os.open in os.supports_dir_fd and os.scandir in os.supports_fd)
+
+
+def _clear_readonly(func, path, _exc):
+    """rmtree error hook: Windows refuses to delete read-only files"""
+    os.chmod(path, stat.S_IWRITE)
+    func(path)
+
+
+def _rmtree_fd(path, stats=None):
+    """Remove a tree with unlinkat/rmdir relative to open directory descriptors
+
+    One openat per directory and no path re-resolution per file, which also
+    means a directory swapped for a symlink mid-delete is never followed.
+    Keeps going past errors and raises the first one at the end.
+    """
+    errors = []
+    dirs = entries_seen = 0
+    stack = [[os.open(path, _DIR_FLAGS), path, None, None, None]]  # fd, path, subdirs, parent fd, name
+    try:
+        while stack:
+            frame = stack[-1]
+            fd, dir_path, subdirs = frame[0], frame[1], frame[2]
+            if subdirs is None:
+                subdirs = frame[2] = []
+                dirs += 1
+                try:
+                    with os.scandir(fd) as entries:
+                        for entry in entries:
+                            entries_seen += 1
+                            try:
+                                if entry.is_dir(follow_symlinks=False):
+                                    subdirs.append(entry.name)
+                                else:
+                                    os.unlink(entry.name, dir_fd=fd)
+                            except FileNotFoundError:
+                                pass
+                            except OSError as e:
+                                errors.append(e)
+                except OSError as e:
+                    errors.append(e)
+
+            if subdirs:
+                name = subdirs.pop()
+                try:
+                    child_fd = os.open(name, _DIR_FLAGS, dir_fd=fd)
+                except FileNotFoundError:
+                    continue
+                except OSError as e:
+                    errors.append(e)
+                    continue
+                stack.append([child_fd, os.path.join(dir_path, name), None, fd, name])
+                continue
+
+            stack.pop()
+            os.close(fd)
+            parent_fd, name = frame[3], frame[4]
+            try:
+                if parent_fd is None:
+                    os.rmdir(dir_path)
+                else:
+                    os.rmdir(name, dir_fd=parent_fd)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                errors.append(e)
+    finally:
+        for frame in stack:
+            os.close(frame[0])
+        if stats is not None:
+            # Per directory: open, scandir, rmdir, close; per file: unlink
+            files = entries_seen - (dirs - 1)
+            stats.add(dirs=dirs, entries=entries_seen, syscalls=4 * dirs + files, errors=len(errors))
+    if errors:
+        raise errors[0]
+
+
+def remove_tree(path, stats=None):
+    """Delete a folder, using fd-relative calls where the platform has them
+
+    stats is an optional metrics.PhaseStats; only the fd-relative path
+    counts directories and syscalls.
+    """
+    if os.path.islink(path):
+        os.unlink(path)  # A symlinked artifact folder: drop the link, not its target
+    elif HAVE_FD_REMOVAL:
+        _rmtree_fd(path, stats)
+    elif sys.version_info >= (3, 12):
+        shutil.rmtree(path, onexc=_clear_readonly)
+    else:
+        shutil.rmtree(path, onerror=_clear_readonly)
+
+
+class DeletionReport:
+    """Outcome of a Deleter run; updated live while it runs
+
+    bytes_freed is reclaimable space, as the size summary shows it. While
+    the run goes it adds up each item on its own; at the end it is redone
+    over the removed items together, so files hardlinked only between
+    them count as well. add_removed() and finish() return the bytes they
+    add, so metrics can count the same figure.
+    """
+
+    def __init__(self, total):
+        self.total = total
+        self.removed = []  # Paths that no longer exist
+        self.errors = []  # (item, message) pairs; those items may be partly deleted
+        self.bytes_freed = 0
+        self._usages = []
+
+    @property
+    def done(self):
+        return len(self.removed) + len(self.errors)
+
+    def add_removed(self, item):
+        usage = item.get('usage')
+        if usage is None:
+            usage = DiskUsage(item['size'] or 0, item['size'] or 0)
+        self.removed.append(item['path'])
+        self._usages.append(usage)
+        self.bytes_freed += usage.reclaimable
+        return usage.reclaimable
+
+    def finish(self):
+        if not any(usage.linked for usage in self._usages):
+            return 0
+        counted = self.bytes_freed
+        self.bytes_freed = DiskUsage.combine(self._usages).reclaimable
+        return self.bytes_freed - counted
+
+
+class Deleter:
+    """Delete independent items concurrently with a fixed number of workers
+
+    With fan_out, folders of at least FAN_OUT_MIN_BYTES are themselves split:
+    their subfolders are removed as separate tasks on a second pool, so one
+    huge node_modules does not leave the other workers idle.
+    """
+
+    def __init__(self, workers=DEFAULT_DELETE_WORKERS, fan_out=False):
+        self.workers = max(1, int(workers))
+        self.fan_out = fan_out and self.workers > 1
+
+    def delete(self, items, on_item=None, metrics=None):
+        """Delete result items, calling on_item(item, error, report) as each finishes
+
+        Errors are collected, never raised. Returns the DeletionReport.
+        With metrics, the work is counted in its DELETE phase, each item
+        timed as a subtree.
+        """
+        report = DeletionReport(len(items))
+        lock = threading.Lock()
+        stats = metrics[DELETE] if metrics is not None else None
+        if stats is not None:
+            stats.start()
+        subtree_pool = ThreadPoolExecutor(self.workers, thread_name_prefix='delete-subtree') if self.fan_out else None
+        try:
+            with ThreadPoolExecutor(self.workers, thread_name_prefix='delete') as pool:
+                futures = {pool.submit(self._delete_item, item, subtree_pool, stats): item for item in items}
+                for future in as_completed(futures):
+                    item = futures[future]
+                    error = future.exception()
+                    freed = 0
+                    with lock:
+                        if error is None or isinstance(error, FileNotFoundError):
+                            error = None
+                            freed = report.add_removed(item)
+                        else:
+                            report.errors.append((item, str(error)))
+                    if stats is not None:
+                        stats.add(bytes=freed, errors=int(error is not None))
+                    if on_item is not None:
+                        on_item(item, error, report)
+            freed = report.finish()
+            if stats is not None:
+                stats.add(bytes=freed)
+        finally:
+            if subtree_pool is not None:
+                subtree_pool.shutdown()
+            if stats is not None:
+                stats.finish()
+        return report
+
+    def _delete_item(self, item, subtree_pool, stats=None):
+        began = time.perf_counter()
+        try:
+            if item['type'] != 'Folder':
+                if stats is not None:
+                    stats.add(entries=1, syscalls=1)
+                os.remove(item['path'])
+            elif subtree_pool is not None and (item['size'] or 0) >= FAN_OUT_MIN_BYTES:
+                self._delete_fanned_out(item['path'], subtree_pool, stats)
+            else:
+                remove_tree(item['path'], stats)
+        finally:
+            if stats is not None:
+                stats.subtree(item['path'], time.perf_counter() - began, began)
+
+    def _delete_fanned_out(self, path, subtree_pool, stats=None):
+        """Remove each subfolder as its own task, then what is left at the top"""
+        if os.path.islink(path):
+            os.unlink(path)
+            return
+        with os.scandir(path) as entries:
+            subdirs = [entry.path for entry in entries if entry.is_dir(follow_symlinks=False)]
+        futures = [subtree_pool.submit(remove_tree, subdir, stats) for subdir in subdirs]
+        errors = [f.exception() for f in futures]
+        remove_tree(path, stats)  # Top-level files and anything a subtree task left behind
+        for error in errors:
+            if error is not None and not isinstance(error, FileNotFoundError):
+                raise error
@@ -0,0 +1,403 @@
+"""Content duplicated across found dependency folders
+
+DuplicateFinder looks inside the node_modules, .venv and other folders a
+scan found and reports what is stored more than once:
+
+- packages: the same name and version installed in several places, from
+  node_modules/<name>/package.json and site-packages/*.dist-info
+- files: identical content, found in stages so most files are never read.
+  Files are grouped by device and size; files sharing both get a hash of
+  their first PARTIAL_BYTES, and only those still colliding are hashed in
+  full, from mmap'd reads in a process pool.
+
+Hard links of one file count as one copy, in packages too: a package
+linked from one store into several projects wastes nothing, and a file
+wastes space only when every link to it is in a copy that could go.
+link_duplicates() then turns the copies of each group into hard links of
+the first, which frees what the report calls wasted.
+"""
+
+import csv
+import hashlib
+import json
+import mmap
+import multiprocessing
+import os
+import stat
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+PARTIAL_BYTES = 16 * 1024  # Read from each same-size file before deciding whether to hash all of it
+DEFAULT_HASH_WORKERS = os.cpu_count() or 1
+PROCESS_POOL_MIN_BYTES = 64 * 1024 ** 2  # Less than this to hash in full is not worth starting processes
+HASH_BATCH_BYTES = 32 * 1024 ** 2  # Work handed to a hashing process at a time
+
+NODE = 'npm'
+PYTHON = 'pypi'
+
+
+def _hasher():
+    return hashlib.blake2b(digest_size=20)
+
+
+def partial_hash(path):
+    """Hex digest of the first PARTIAL_BYTES of a file; None if it cannot be read"""
+    try:
+        with open(path, 'rb') as fh:
+            hasher = _hasher()
+            hasher.update(fh.read(PARTIAL_BYTES))
+            return hasher.hexdigest()
+    except OSError:
+        return None
+
+
+def full_hash(path):
+    """Hex digest of a whole (non-empty) file, read through mmap; None if it cannot be read"""
+    try:
+        with open(path, 'rb') as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            hasher = _hasher()
+            hasher.update(data)
+            return hasher.hexdigest()
+    except (OSError, ValueError):
+        return None
+
+
+def _full_digests(paths):
+    """Process pool task: digests for a batch of paths"""
+    return [full_hash(path) for path in paths]
+
+
+class DuplicateGroup:
+    """Files with identical content on one device, one path per inode"""
+
+    __slots__ = ('size', 'digest', 'paths')
+
+    def __init__(self, size, digest, paths):
+        self.size = size
+        self.digest = digest
+        self.paths = paths
+
+    @property
+    def wasted(self):
+        """Bytes freed by keeping a single copy"""
+        return self.size * (len(self.paths) - 1)
+
+    def as_dict(self):
+        return {'size': self.size, 'digest': self.digest, 'copies': len(self.paths),
+                'wasted': self.wasted, 'paths': self.paths}
+
+
+class PackageCopies:
+    """One package version installed in several places
+
+    wasted is what deleting every copy but the largest would free: the
+    single-link files of the others, and linked files whose links are all
+    in the others. Each copy's bytes count its inodes once.
+    """
+
+    __slots__ = ('ecosystem', 'name', 'version', 'copies', 'wasted', '_linked')
+
+    def __init__(self, ecosystem, name, version):
+        self.ecosystem = ecosystem
+        self.name = name
+        self.version = version
+        # (path, bytes); while the walk is on, bytes is a [total, single-link bytes] counter
+        self.copies = []
+        self.wasted = 0
+        self._linked = {}  # (st_dev, st_ino) -> [nlink, size, links seen, counters of copies holding it]
+
+    def add_file(self, counter, st):
+        """Count a file found in the copy that counter belongs to"""
+        if st.st_nlink == 1:
+            counter[0] += st.st_size
+            counter[1] += st.st_size
+            return
+        entry = self._linked.get((st.st_dev, st.st_ino))
+        if entry is None:
+            entry = self._linked[(st.st_dev, st.st_ino)] = [st.st_nlink, st.st_size, 0, []]
+        entry[2] += 1
+        if not any(holder is counter for holder in entry[3]):
+            entry[3].append(counter)
+            counter[0] += st.st_size
+
+    def finish(self):
+        """Settle wasted once the walk is over and turn the counters into byte totals"""
+        if self.copies:
+            kept = max((counter for _path, counter in self.copies), key=lambda counter: counter[0])
+            self.wasted = sum(counter[1] for _path, counter in self.copies if counter is not kept)
+            self.wasted += sum(size for nlink, size, links, holders in self._linked.values()
+                               if links >= nlink and not any(holder is kept for holder in holders))
+        self.copies = [(path, counter[0]) for path, counter in self.copies]
+        self._linked = {}
+
+    def as_dict(self):
+        return {'ecosystem': self.ecosystem, 'name': self.name, 'version': self.version,
+                'copies': len(self.copies), 'wasted': self.wasted,
+                'paths': [path for path, _size in self.copies]}
+
+
+class DuplicateReport:
+    """What DuplicateFinder.find() found; groups and packages are sorted by bytes wasted"""
+
+    def __init__(self, started):
+        self.started = started  # time.time_ns() when the walk began; link_duplicates() skips newer files
+        self.files = 0  # Distinct inodes of at least min_size looked at
+        self.bytes = 0
+        self.errors = 0
+        self.groups = []
+        self.packages = []
+
+    @property
+    def wasted(self):
+        return sum(group.wasted for group in self.groups)
+
+    @property
+    def package_wasted(self):
+        return sum(package.wasted for package in self.packages)
+
+    def summary(self):
+        return {'files': self.files, 'bytes': self.bytes, 'duplicate_groups': len(self.groups),
+                'wasted': self.wasted, 'duplicate_packages': len(self.packages),
+                'package_wasted': self.package_wasted, 'errors': self.errors}
+
+
+def _node_package(path):
+    """(name, version) from a node_modules package folder, or None"""
+    try:
+        with open(os.path.join(path, 'package.json'), encoding='utf-8') as fh:
+            manifest = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict):
+        return None
+    name, version = manifest.get('name'), manifest.get('version')
+    if isinstance(name, str) and isinstance(version, str):
+        return name, version
+    return None
+
+
+def _dist_info(path):
+    """(name, version, installed file paths) from a .dist-info folder, or None"""
+    stem = os.path.basename(path)[:-len('.dist-info')]
+    name, _, version = stem.partition('-')
+    if not name or not version:
+        return None
+    site_packages = os.path.dirname(path)
+    files = []
+    try:
+        with open(os.path.join(path, 'RECORD'), encoding='utf-8', newline='') as fh:
+            files = [os.path.join(site_packages, row[0]) for row in csv.reader(fh) if row and row[0]]
+    except OSError:
+        pass
+    return name.replace('_', '-').lower(), version, files
+
+
+class DuplicateFinder:
+    """Find duplicated packages and files under a set of folders
+
+    min_size leaves out smaller files: their duplicates rarely free more
+    than the filesystem block they occupy. workers sizes the pool hashing
+    whole files; partial hashes are read on a thread pool.
+    """
+
+    def __init__(self, workers=DEFAULT_HASH_WORKERS, min_size=1, read_workers=None):
+        self.workers = max(1, int(workers))
+        self.min_size = max(1, min_size)
+        self.read_workers = read_workers or min(32, (os.cpu_count() or 1) * 4)
+
+    def find(self, folders):
+        report = DuplicateReport(time.time_ns())
+        by_size = {}  # (st_dev, st_size) -> {st_ino: path}
+        packages = {}  # (ecosystem, name, version) -> PackageCopies
+        for folder in folders:
+            self._walk(folder, by_size, packages, report)
+        for package in packages.values():
+            package.finish()
+
+        candidates = [list(inodes.values()) for inodes in by_size.values() if len(inodes) > 1]
+        sizes = [key[1] for key, inodes in by_size.items() if len(inodes) > 1]
+        del by_size
+        report.groups = self._hash_groups(candidates, sizes)
+        report.groups.sort(key=lambda group: group.wasted, reverse=True)
+        report.packages = sorted((package for package in packages.values() if package.wasted),
+                                 key=lambda package: package.wasted, reverse=True)
+        return report
+
+    def _walk(self, folder, by_size, packages, report):
+        """Record every file under folder; package folders add up the bytes below them"""
+        stack = [(folder, None)]  # (directory, (PackageCopies, counter) of the package it belongs to)
+        while stack:
+            path, package = stack.pop()
+            parent_dir = os.path.dirname(path)
+            parent = os.path.basename(parent_dir)
+            name = os.path.basename(path)
+            if parent == 'node_modules' or (parent.startswith('@') and
+                                            os.path.basename(os.path.dirname(parent_dir)) == 'node_modules'):
+                found = _node_package(path)
+                if found is not None:
+                    package = self._add_package(packages, NODE, *found, path)
+            elif name.endswith('.dist-info') and parent == 'site-packages':
+                found = _dist_info(path)
+                if found is not None:
+                    copies, counter = self._add_package(packages, PYTHON, *found[:2], path)
+                    for file_path in found[2]:
+                        try:
+                            st = os.lstat(file_path)
+                        except OSError:
+                            continue  # Listed but not installed, or removed since
+                        if stat.S_ISREG(st.st_mode):
+                            copies.add_file(counter, st)
+            elif name == 'node_modules':
+                package = None  # Nested dependencies are packages of their own
+
+            try:
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append((entry.path, package))
+                                continue
+                            if not entry.is_file(follow_symlinks=False):
+                                continue
+                            st = entry.stat(follow_symlinks=False)
+                        except OSError:
+                            report.errors += 1
+                            continue
+                        if package is not None:
+                            package[0].add_file(package[1], st)
+                        if st.st_size < self.min_size:
+                            continue
+                        inodes = by_size.setdefault((st.st_dev, st.st_size), {})
+                        if st.st_ino in inodes:
+                            continue  # Another link of a file already seen
+                        inodes[st.st_ino] = entry.path
+                        report.files += 1
+                        report.bytes += st.st_size
+            except OSError:
+                report.errors += 1
+
+    @staticmethod
+    def _add_package(packages, ecosystem, name, version, path):
+        """Note one installed copy; returns (PackageCopies, the copy's byte counter)"""
+        key = (ecosystem, name, version)
+        copies = packages.get(key)
+        if copies is None:
+            copies = packages[key] = PackageCopies(ecosystem, name, version)
+        counter = [0, 0]
+        copies.copies.append((path, counter))
+        return copies, counter
+
+    def _hash_groups(self, candidates, sizes):
+        """DuplicateGroups from same-size path lists: partial hash, then full hash where needed"""
+        with ThreadPoolExecutor(max_workers=self.read_workers, thread_name_prefix='dedup-read') as pool:
+            partials = list(pool.map(lambda paths: [partial_hash(path) for path in paths], candidates))
+
+        groups = []
+        full = []  # (size, [paths]) still to hash in full
+        for size, paths, digests in zip(sizes, candidates, partials):
+            matching = {}
+            for path, digest in zip(paths, digests):
+                if digest is not None:
+                    matching.setdefault(digest, []).append(path)
+            for digest, same in matching.items():
+                if len(same) < 2:
+                    continue
+                if size <= PARTIAL_BYTES:
+                    groups.append(DuplicateGroup(size, digest, same))  # The partial hash covered it all
+                else:
+                    full.append((size, same))
+        if full:
+            paths = [path for _size, same in full for path in same]
+            digests = iter(self._full_digests(paths, [size for size, same in full for _path in same]))
+            for size, same in full:
+                matching = {}
+                for path in same:
+                    digest = next(digests)
+                    if digest is not None:
+                        matching.setdefault(digest, []).append(path)
+                groups.extend(DuplicateGroup(size, digest, paths) for digest, paths in matching.items()
+                              if len(paths) > 1)
+        for group in groups:
+            group.paths.sort()
+        return groups
+
+    def _full_digests(self, paths, sizes):
+        """Digests in the order of paths; on a process pool when there is enough to read"""
+        if self.workers == 1 or sum(sizes) < PROCESS_POOL_MIN_BYTES:
+            with ThreadPoolExecutor(max_workers=self.read_workers, thread_name_prefix='dedup-hash') as pool:
+                return list(pool.map(full_hash, paths))
+        batches = []
+        batch, batch_bytes = [], 0
+        for path, size in zip(paths, sizes):
+            batch.append(path)
+            batch_bytes += size
+            if batch_bytes >= HASH_BATCH_BYTES:
+                batches.append(batch)
+                batch, batch_bytes = [], 0
+        if batch:
+            batches.append(batch)
+        # spawn, not fork: the GUI and the scan leave threads running in this process
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(batches)),
+                                 mp_context=multiprocessing.get_context('spawn')) as pool:
+            return [digest for digests in pool.map(_full_digests, batches) for digest in digests]
+
+
+class LinkReport:
+    """Outcome of link_duplicates()"""
+
+    def __init__(self):
+        self.linked = []  # Paths now hard links of their group's first path
+        self.skipped = []  # (path, reason)
+        self.errors = []  # (path, message)
+        self.bytes_freed = 0
+
+
+def link_duplicates(report, dry_run=False):
+    """Replace every duplicate in report.groups with a hard link to the group's first path
+
+    A copy is left alone when it or the first path changed since the
+    report was made, or when its permissions or owner differ (a link
+    shares them). Each copy is swapped in one rename, so it is never
+    missing. With dry_run only the checks run.
+    """
+    result = LinkReport()
+    for group in report.groups:
+        keep = group.paths[0]
+        try:
+            kept = os.lstat(keep)
+        except OSError as e:
+            result.errors.append((keep, str(e)))
+            continue
+        if kept.st_size != group.size or kept.st_mtime_ns > report.started:
+            result.skipped.extend((path, 'changed') for path in group.paths[1:])
+            continue
+        for path in group.paths[1:]:
+            try:
+                st = os.lstat(path)
+            except OSError as e:
+                result.errors.append((path, str(e)))
+                continue
+            if (st.st_dev, st.st_ino) == (kept.st_dev, kept.st_ino):
+                continue  # Linked already
+            if st.st_size != group.size or st.st_mtime_ns > report.started:
+                result.skipped.append((path, 'changed'))
+                continue
+            if (st.st_mode, st.st_uid, st.st_gid) != (kept.st_mode, kept.st_uid, kept.st_gid):
+                result.skipped.append((path, 'different permissions'))
+                continue
+            if not dry_run:
+                temp = os.path.join(os.path.dirname(path), f'.{os.path.basename(path)}.{os.getpid()}.link')
+                try:
+                    os.link(keep, temp)
+                    os.replace(temp, path)
+                except OSError as e:
+                    result.errors.append((path, str(e)))
+                    try:
+                        os.remove(temp)
+                    except OSError:
+                        pass
+                    continue
+            result.linked.append(path)
+            if st.st_nlink == 1:
+                result.bytes_freed += group.size  # Other links keep the old copy's blocks
+    return result
@@ -0,0 +1,162 @@
+"""Counters and timings for the scan, size and delete phases
+
+A Metrics object is handed to ProjectScan, FolderSizer and Deleter. Each
+phase counts directories visited, entries looked at, syscalls (scandir,
+stat, open, unlink, rmdir), bytes and errors, adds up the time spent in
+it and keeps the slowest subtrees. Counters are updated once per directory
+under a lock, so the cost stays far below that of the syscalls counted.
+
+report() gives all of it as a dict for a JSON file or the stats panel.
+With trace=True every timed subtree is also kept as a Chrome trace event
+(save_trace(), open in chrome://tracing or Perfetto), one lane per thread.
+"""
+
+import heapq
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+WALK = 'walk'
+SIZE = 'size'
+DELETE = 'delete'
+UI = 'ui'  # Tk updates: moving results into the tree and redrawing it
+
+DEFAULT_SLOWEST = 10
+
+
+class PhaseStats:
+    """Counters, time and slowest subtrees of one phase; safe to update from any thread"""
+
+    def __init__(self, name, metrics):
+        self.name = name
+        self.metrics = metrics
+        self.dirs = 0
+        self.entries = 0
+        self.syscalls = 0
+        self.bytes = 0
+        self.errors = 0
+        self.busy = 0.0  # Seconds spent in timed spans, summed over threads
+        self.started = None
+        self.finished = None
+        self._slowest = []  # Min-heap of (seconds, path)
+        self._lock = threading.Lock()
+
+    def add(self, dirs=0, entries=0, syscalls=0, bytes=0, errors=0):
+        with self._lock:
+            self.dirs += dirs
+            self.entries += entries
+            self.syscalls += syscalls
+            self.bytes += bytes
+            self.errors += errors
+
+    def start(self):
+        with self._lock:
+            if self.started is None:
+                self.started = time.perf_counter()
+            self.finished = None
+
+    def finish(self):
+        with self._lock:
+            self.finished = time.perf_counter()
+
+    @property
+    def wall(self):
+        """Seconds from start() to finish(), or until now while running"""
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    def subtree(self, path, seconds, began=None):
+        """Record the time one subtree took; began (perf_counter) also makes it a trace event"""
+        with self._lock:
+            self.busy += seconds
+            entry = (seconds, path)
+            if len(self._slowest) < self.metrics.slowest:
+                heapq.heappush(self._slowest, entry)
+            elif entry > self._slowest[0]:
+                heapq.heapreplace(self._slowest, entry)
+        if began is not None and self.metrics.trace:
+            self.metrics.trace_event(self.name, path, began, seconds)
+
+    @contextmanager
+    def span(self, path):
+        """Time the body as one subtree"""
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.subtree(path, time.perf_counter() - began, began)
+
+    def slowest(self):
+        """(seconds, path) pairs, slowest first"""
+        with self._lock:
+            return sorted(self._slowest, reverse=True)
+
+    def as_dict(self):
+        return {
+            'dirs': self.dirs, 'entries': self.entries, 'syscalls': self.syscalls,
+            'bytes': self.bytes, 'errors': self.errors,
+            'wall_seconds': round(self.wall, 6), 'busy_seconds': round(self.busy, 6),
+            'slowest': [{'path': path, 'seconds': round(seconds, 6)} for seconds, path in self.slowest()],
+        }
+
+
+class Metrics:
+    """PhaseStats by name, created on first use"""
+
+    def __init__(self, slowest=DEFAULT_SLOWEST, trace=False):
+        self.slowest = slowest
+        self.trace = trace
+        self.created = time.time()
+        self._origin = time.perf_counter()
+        self._phases = {}
+        self._events = []
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name):
+        phase = self._phases.get(name)
+        if phase is None:
+            with self._lock:
+                phase = self._phases.setdefault(name, PhaseStats(name, self))
+        return phase
+
+    def __iter__(self):
+        return iter(list(self._phases.values()))
+
+    def trace_event(self, phase, path, began, seconds):
+        event = {'name': path, 'cat': phase, 'ph': 'X', 'pid': os.getpid(), 'tid': threading.get_ident(),
+                 'ts': round((began - self._origin) * 1e6), 'dur': round(seconds * 1e6)}
+        with self._lock:
+            self._events.append(event)
+
+    def report(self):
+        return {'created': time.strftime('%Y-%m-%dT%H:%M:%S%z', time.localtime(self.created)),
+                'phases': {phase.name: phase.as_dict() for phase in self}}
+
+    def save(self, path):
+        """Write report() as JSON"""
+        with open(path, 'w') as fh:
+            json.dump(self.report(), fh, indent=2)
+            fh.write('\n')
+
+    def save_trace(self, path):
+        """Write the trace events in Chrome's trace event format"""
+        with self._lock:
+            events = list(self._events)
+        with open(path, 'w') as fh:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, fh)
+
+
+@contextmanager
+def profiled(path):
+    """Run the body under cProfile and dump the stats to path (the calling thread only)"""
+    import cProfile
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield profile
+    finally:
+        profile.disable()
+        profile.dump_stats(path)
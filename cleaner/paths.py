@@ -0,0 +1,32 @@
+"""Per-user cache and config folders
+
+Only needs os and sys, so the GUI can find its files before the scan
+engine is imported.
+"""
+
+import os
+import sys
+
+APP_DIR_NAME = 'ProjectCleanerPro'
+
+
+def default_cache_dir():
+    """Per-user cache directory for the current platform"""
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~\\AppData\\Local')
+    elif sys.platform == 'darwin':
+        base = os.path.expanduser('~/Library/Caches')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(base, APP_DIR_NAME)
+
+
+def default_config_dir():
+    """Per-user config directory for the current platform"""
+    if sys.platform == 'win32':
+        base = os.environ.get('APPDATA') or os.path.expanduser('~\\AppData\\Roaming')
+    elif sys.platform == 'darwin':
+        base = os.path.expanduser('~/Library/Application Support')
+    else:
+        base = os.environ.get('XDG_CONFIG_HOME') or os.path.expanduser('~/.config')
+    return os.path.join(base, APP_DIR_NAME)
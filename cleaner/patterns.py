@@ -0,0 +1,127 @@
+"""Cleanup patterns compiled once per scan
+
+Templates list plain names (``node_modules``), simple globs (``*.pyc``,
+``npm-debug.log*``), full gitignore-style globs (``*.py[co]``,
+``packages/*/dist``, ``**/coverage``) and negations (``!keep.log``).
+PatternMatcher sorts them by the cheapest check that can decide them:
+
+- exact names go into a set
+- ``*suffix`` and ``prefix*`` globs become one tuple each for str.endswith /
+  str.startswith, which test every entry of the tuple in C
+- everything else is compiled into a single alternation regex
+
+Patterns containing a ``/`` are anchored to the scan root and matched
+against the entry's path relative to it (always with ``/`` separators);
+all others match the entry name at any depth, as in .gitignore.
+"""
+
+import functools
+import re
+
+_GLOB_CHARS = frozenset('*?[')
+
+
+def glob_to_regex(pattern):
+    """Translate a gitignore-style glob into a regex source string"""
+    out = []
+    i = 0
+    n = len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern.startswith('**', i):
+                i += 2
+                if i < n and pattern[i] == '/':
+                    out.append('(?:.*/)?')  # '**/' spans zero or more directories
+                    i += 1
+                else:
+                    out.append('.*')
+                continue
+            out.append('[^/]*')
+        elif c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            end = pattern.find(']', i + 2)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                out.append('[' + body.replace('\\', '\\\\') + ']')
+                i = end
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return ''.join(out)
+
+
+class _Rules:
+    """One polarity (include or exclude) of a pattern list"""
+
+    def __init__(self, patterns):
+        self.names = set()
+        suffixes = []
+        prefixes = []
+        name_globs = []
+        path_globs = []
+        for pattern in patterns:
+            if '/' in pattern:
+                path_globs.append(glob_to_regex(pattern.strip('/')))
+            elif not _GLOB_CHARS.intersection(pattern):
+                self.names.add(pattern)
+            elif pattern.startswith('*') and not _GLOB_CHARS.intersection(pattern[1:]):
+                suffixes.append(pattern[1:])
+            elif pattern.endswith('*') and not _GLOB_CHARS.intersection(pattern[:-1]):
+                prefixes.append(pattern[:-1])
+            else:
+                name_globs.append(glob_to_regex(pattern))
+
+        self.suffixes = tuple(suffixes)
+        self.prefixes = tuple(prefixes)
+        self.name_regex = re.compile('(?:%s)\\Z' % '|'.join(name_globs)).match if name_globs else None
+        self.path_regex = re.compile('(?:%s)\\Z' % '|'.join(path_globs)).match if path_globs else None
+
+    def __bool__(self):
+        return bool(self.names or self.suffixes or self.prefixes or self.name_regex or self.path_regex)
+
+    def matches(self, name, rel_path):
+        if name in self.names:
+            return True
+        if self.suffixes and name.endswith(self.suffixes):
+            return True
+        if self.prefixes and name.startswith(self.prefixes):
+            return True
+        if self.name_regex is not None and self.name_regex(name):
+            return True
+        return self.path_regex is not None and rel_path is not None and bool(self.path_regex(rel_path))
+
+
+class PatternMatcher:
+    """Decide whether a file or folder name matches a template's patterns
+
+    Build once per scan; matches() is then a set lookup for most entries.
+    """
+
+    def __init__(self, patterns):
+        patterns = [p.strip() for p in patterns if p.strip() and not p.startswith('#')]
+        self.patterns = tuple(patterns)
+        self._include = _Rules(p for p in patterns if not p.startswith('!'))
+        self._exclude = _Rules(p[1:] for p in patterns if p.startswith('!'))
+        # Callers skip building relative paths when no rule looks at them
+        self.needs_path = self._include.path_regex is not None or self._exclude.path_regex is not None
+
+    def __contains__(self, name):
+        return self.matches(name)
+
+    def matches(self, name, rel_path=None):
+        """rel_path is the '/'-separated path from the scan root, needed for anchored patterns"""
+        if not self._include.matches(name, rel_path):
+            return False
+        return not (self._exclude and self._exclude.matches(name, rel_path))
+
+
+@functools.lru_cache(maxsize=256)
+def compile_patterns(patterns):
+    """Shared PatternMatcher for a tuple of patterns"""
+    return PatternMatcher(patterns)
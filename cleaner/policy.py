@@ -0,0 +1,158 @@
+"""Cleanup policies: which found items to preselect
+
+CleanupPolicy keeps items that are big enough, whose project has not been
+touched for a while and that no keep-list pattern protects. BudgetPlanner
+then picks the fewest, largest of them that free a given number of bytes.
+"""
+
+import heapq
+import itertools
+import os
+import time
+
+from .patterns import PatternMatcher, compile_patterns
+from .registry import BUILTIN_REGISTRY
+from .sizing import DiskUsage
+from .templates import SKIP_FOLDERS
+
+DAY = 24 * 3600
+MAX_IDLE_CHECK_ENTRIES = 50000  # Projects bigger than this count as recently touched
+
+
+def modified_since(project_dir, cutoff, skip=None, max_entries=MAX_IDLE_CHECK_ENTRIES, skip_names=SKIP_FOLDERS):
+    """Whether any file under project_dir has an mtime after cutoff
+
+    Folders in skip_names or matching skip (artifacts, not sources) are
+    not looked into. Stops at the first recent file, so active projects
+    cost a handful of stats.
+    """
+    stack = [project_dir]
+    seen = 0
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    seen += 1
+                    if seen > max_entries:
+                        return True
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in skip_names and not (skip is not None and skip.matches(entry.name)):
+                                stack.append(entry.path)
+                        elif entry.stat(follow_symlinks=False).st_mtime > cutoff:
+                            return True
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+    return False
+
+
+class CleanupPolicy:
+    """Decide whether a sized result should be preselected
+
+    min_size is in bytes. With idle_days, an item only qualifies when no
+    source file beside it (in its parent folder and below, artifact folders
+    aside) changed in that many days. keep is a list of gitignore-style
+    patterns; an item is kept when it or any folder above it matches,
+    e.g. ``important-app`` or ``clients/acme/**``. Artifact folders and
+    folders never scanned come from registry (see registry.py).
+    """
+
+    def __init__(self, min_size=0, idle_days=None, keep=(), now=None, registry=BUILTIN_REGISTRY):
+        self.min_size = min_size
+        self.idle_days = idle_days
+        self.keep = PatternMatcher(keep) if keep else None
+        self.cutoff = None if idle_days is None else (now or time.time()) - idle_days * DAY
+        self._artifacts = compile_patterns(tuple(sorted(
+            {pattern.partition(':')[0] for config in registry.templates.values() for pattern in config["folders"]})))
+        self._skip_names = frozenset(registry.skip)
+        self._idle = {}  # Project dir -> bool
+
+    def accepts(self, item):
+        if (item['size'] or 0) < self.min_size:
+            return False
+        if self.keep is not None and self.kept(item['relative_path']):
+            return False
+        return self.cutoff is None or self.project_idle(os.path.dirname(item['path']))
+
+    def kept(self, relative_path):
+        parts = relative_path.replace(os.sep, '/').split('/')
+        return any(self.keep.matches(parts[i - 1], '/'.join(parts[:i])) for i in range(1, len(parts) + 1))
+
+    def project_idle(self, project_dir):
+        idle = self._idle.get(project_dir)
+        if idle is None:
+            recent = modified_since(project_dir, self.cutoff, self._artifacts, skip_names=self._skip_names)
+            idle = self._idle[project_dir] = not recent
+        return idle
+
+
+class BudgetPlanner:
+    """Pick the fewest, largest items that free at least target bytes
+
+    Items are ranked by what deleting each would free on its own
+    (DiskUsage.reclaimable), and the plan is enough once the chosen items
+    together free target bytes, hardlinked files counted across them with
+    DiskUsage.combine. A pnpm or uv store whose files are all linked from
+    elsewhere frees nothing and is never chosen.
+
+    offer() items as their sizes become known. The chosen items are a
+    min-heap by reclaimable bytes: an item freeing less than all of them
+    is turned away once the target is met, and the smallest chosen ones
+    drop out as long as the rest still meet it.
+    """
+
+    def __init__(self, target):
+        self.target = target
+        self.total = 0  # Bytes the chosen items free together
+        self._heap = []  # (reclaimable bytes, tie breaker, item)
+        self._counter = itertools.count()
+
+    @property
+    def met(self):
+        return self.total >= self.target
+
+    def offer(self, item):
+        """Consider an item; returns True if it is part of the plan for now"""
+        size = _usage(item).reclaimable
+        if size <= 0 or (self.met and size <= self._heap[0][0]):
+            return False
+        heapq.heappush(self._heap, (size, next(self._counter), item))
+        self.total = _freed(self._heap)
+        while len(self._heap) > 1:
+            rest = _freed(self._heap[1:])
+            if rest < self.target:
+                break
+            heapq.heappop(self._heap)
+            self.total = rest
+        return True
+
+    def chosen(self):
+        """The planned items, largest first"""
+        return [item for _size, _n, item in sorted(self._heap, reverse=True)]
+
+
+def _usage(item):
+    """An item's DiskUsage; items sized before usage was tracked count their size as allocated"""
+    usage = item.get('usage')
+    if usage is None:
+        size = item['size'] or 0
+        usage = DiskUsage(size, size)
+    return usage
+
+
+def _freed(entries):
+    """Reclaimable bytes of planner heap entries together"""
+    usages = [_usage(item) for _size, _n, item in entries]
+    if not any(usage.linked for usage in usages):
+        return sum(size for size, _n, _item in entries)  # Nothing to count once
+    return DiskUsage.combine(usages).reclaimable
+
+
+def plan_budget(items, target):
+    """The fewest, largest sized items that add up to at least target bytes"""
+    planner = BudgetPlanner(target)
+    for item in items:
+        planner.offer(item)
+    return planner.chosen()
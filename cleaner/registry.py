@@ -0,0 +1,287 @@
+"""Template registry: the built-in templates plus user and project config
+
+Templates come from these layers, each overriding the one before by name:
+
+1. TEMPLATES (templates.py)
+2. templates.toml, then templates.json, in default_config_dir()
+3. .cleaner.toml, then .cleaner.json, at the top of each scanned root
+4. files given explicitly (``--config FILE``)
+
+A file holds a "templates" table and optionally a top-level "skip" list,
+the folder names no scan descends into (default SKIP_FOLDERS)::
+
+    skip = [".git", ".venv", "node_modules", ".terraform"]
+
+    [templates.Remix]
+    extends = "Node.js"
+    folders = ["public/build"]
+    markers = ["remix.config.*", "app/"]
+    skip = ["fixtures"]
+
+    [templates.CMake]
+    folders = ["build:CMakeCache.txt", "cmake-build-*"]
+    markers = ["CMakeLists.txt"]
+
+"extends" names one or more templates whose lists the template starts
+from (parent entries first; ``!pattern`` takes one back out). Its parents
+are superseded by it, and it inherits their markers only when it has
+none of its own. A template extending its own name builds on the previous
+layer's version of it.
+
+Besides file markers, "markers" takes ``name/`` for a subdirectory. A
+folder pattern ``name:pattern`` only matches folders holding an entry
+that matches pattern, so ``build:CMakeCache.txt`` leaves other folders
+called build alone. Patterns with a slash are matched against the path
+from the project, the nearest folder holding one of the markers. A
+template's "skip" folders are not descended into within its projects.
+
+Files are validated as they are read (ValueError naming the file and
+template). The resolved registry is kept per process and in a small JSON
+cache keyed by each file's mtime and size, so later runs neither parse
+nor resolve unchanged config.
+"""
+
+import hashlib
+import json
+import os
+
+from .paths import default_cache_dir, default_config_dir
+from .templates import SKIP_FOLDERS, TEMPLATES, find_template
+
+USER_CONFIG_NAMES = ('templates.toml', 'templates.json')
+PROJECT_CONFIG_NAMES = ('.cleaner.toml', '.cleaner.json')
+LIST_KEYS = ('folders', 'files', 'markers', 'supersedes', 'skip')
+MAX_CACHED = 32  # Resolved registries kept in the cache file
+
+# Cached registries are only valid for these built-ins and this format
+_BUILTIN_KEY = hashlib.sha1(json.dumps([1, TEMPLATES, SKIP_FOLDERS], sort_keys=True).encode()).hexdigest()
+_loaded = {}  # Cache key -> Registry, for this process
+
+
+class Registry:
+    """Resolved templates by name and the global skip list
+
+    Every template config has all of LIST_KEYS as lists; "extends" has
+    been applied. Iterating gives the template names.
+    """
+
+    def __init__(self, templates, skip=SKIP_FOLDERS, sources=()):
+        self.templates = templates
+        self.skip = tuple(skip)
+        self.sources = tuple(sources)  # Config files read, in the order applied
+
+    def __iter__(self):
+        return iter(self.templates)
+
+    def __contains__(self, name):
+        return name in self.templates
+
+    def __getitem__(self, name):
+        return self.templates[name]
+
+    def find(self, name):
+        """Template name matching name loosely ('nextjs' finds 'Next.js'); KeyError if none"""
+        return find_template(name, self.templates)
+
+    def as_dict(self):
+        return {'skip': list(self.skip), 'templates': self.templates, 'sources': list(self.sources)}
+
+
+BUILTIN_REGISTRY = Registry({name: {key: list(config.get(key, ())) for key in LIST_KEYS}
+                    for name, config in TEMPLATES.items()})
+
+
+def _toml(path):
+    """The TOML parser, imported only when a TOML file has to be read (not on cache hits)"""
+    try:
+        import tomllib
+    except ImportError:  # Python < 3.11
+        try:
+            import tomli as tomllib
+        except ImportError:
+            raise ValueError(f"{path}: reading TOML needs Python 3.11 or the tomli package") from None
+    return tomllib
+
+
+def read_config(path):
+    """Parse one config file (TOML or JSON by extension) and validate it
+
+    Returns (templates, skip); skip is None when the file sets none.
+    """
+    if path.endswith('.toml'):
+        tomllib = _toml(path)
+        with open(path, 'rb') as fh:
+            try:
+                data = tomllib.load(fh)
+            except tomllib.TOMLDecodeError as e:
+                raise ValueError(f"{path}: {e}")
+    else:
+        with open(path, encoding='utf-8') as fh:
+            try:
+                data = json.load(fh)
+            except ValueError as e:
+                raise ValueError(f"{path}: {e}")
+    return validate(data, path)
+
+
+def _strings(value, where, allow_empty=True):
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list) or not all(isinstance(v, str) and v.strip() for v in value):
+        raise ValueError(f"{where} must be a string or a list of non-empty strings")
+    if not value and not allow_empty:
+        raise ValueError(f"{where} must not be empty")
+    return [v.strip() for v in value]
+
+
+def validate(data, source):
+    """Check a parsed config file; returns (templates, skip) with every list normalized"""
+    if not isinstance(data, dict):
+        raise ValueError(f"{source}: expected a table of settings at the top level")
+    unknown = sorted(set(data) - {'templates', 'skip'})
+    if unknown:
+        raise ValueError(f"{source}: unknown setting {unknown[0]!r} (expected 'templates' or 'skip')")
+    skip = _strings(data['skip'], f"{source}: skip") if 'skip' in data else None
+    if skip is not None and any('/' in name for name in skip):
+        raise ValueError(f"{source}: skip takes folder names, not paths")
+
+    templates = data.get('templates', {})
+    if not isinstance(templates, dict):
+        raise ValueError(f"{source}: 'templates' must be a table of templates by name")
+    checked = {}
+    for name, config in templates.items():
+        where = f"{source}: template {name!r}"
+        if not name.strip():
+            raise ValueError(f"{source}: template names must not be empty")
+        if not isinstance(config, dict):
+            raise ValueError(f"{where} must be a table")
+        unknown = sorted(set(config) - set(LIST_KEYS) - {'extends'})
+        if unknown:
+            raise ValueError(f"{where}: unknown key {unknown[0]!r} (expected extends, {', '.join(LIST_KEYS)})")
+        entry = {key: _strings(config[key], f"{where}: {key}") for key in LIST_KEYS if key in config}
+        if 'extends' in config:
+            entry['extends'] = _strings(config['extends'], f"{where}: extends", allow_empty=False)
+        for pattern in entry.get('folders', ()):
+            folder, colon, content = pattern.partition(':')
+            if colon and (not folder or not content or '/' in content):
+                raise ValueError(f"{where}: folder pattern {pattern!r} should be 'name:entry pattern'")
+        for marker in entry.get('markers', ()):
+            if marker.endswith('/') and '/' in marker[:-1]:
+                raise ValueError(f"{where}: folder marker {marker!r} must be a single name")
+        checked[name] = entry
+    return checked, skip
+
+
+def resolve(layer, resolved, source):
+    """Merge one file's templates into resolved (name -> config), applying extends"""
+    done = {}
+
+    def build(name, chain):
+        if name in done:
+            return done[name]
+        if name in chain:
+            raise ValueError(f"{source}: templates extend each other: {' -> '.join(chain + (name,))}")
+        config = layer[name]
+        merged = {key: [] for key in LIST_KEYS}
+        for parent in config.get('extends', ()):
+            if parent != name and parent in layer:
+                base = build(parent, chain + (name,))
+            elif parent in resolved:
+                base = resolved[parent]  # From an earlier layer
+            else:
+                raise ValueError(f"{source}: template {name!r} extends unknown template {parent!r}")
+            for key in LIST_KEYS:
+                if key != 'markers' or not config.get('markers'):
+                    merged[key].extend(base[key])
+            if parent != name:
+                merged['supersedes'].append(parent)
+        for key in LIST_KEYS:
+            merged[key].extend(config.get(key, ()))
+        merged = {key: list(dict.fromkeys(values)) for key, values in merged.items()}
+        if not merged['folders'] and not merged['files']:
+            raise ValueError(f"{source}: template {name!r} has no folders or files to clean")
+        done[name] = merged
+        return merged
+
+    for name in layer:
+        build(name, ())
+    resolved.update(done)
+
+
+def config_files(roots=(), files=()):
+    """User and project config files that exist, then files, in the order they apply"""
+    found = [os.path.join(default_config_dir(), name) for name in USER_CONFIG_NAMES]
+    for root in roots:
+        found.extend(os.path.join(root, name) for name in PROJECT_CONFIG_NAMES)
+    found = [path for path in found if os.path.isfile(path)]
+    return found + [os.path.abspath(path) for path in files]
+
+
+def build_registry(paths):
+    """Registry from the built-ins and the config files in paths, read and resolved"""
+    templates = dict(BUILTIN_REGISTRY.templates)
+    skip = BUILTIN_REGISTRY.skip
+    for path in paths:
+        layer, layer_skip = read_config(path)
+        resolve(layer, templates, path)
+        if layer_skip is not None:
+            skip = layer_skip
+    return Registry(templates, skip, paths)
+
+
+def load_registry(roots=(), files=(), cache_path=None):
+    """Registry for scanning roots: built-ins, user config, each root's project config, files
+
+    Without any config files this is BUILTIN_REGISTRY. OSError if one of
+    files cannot be read, ValueError if a config file is invalid.
+    """
+    paths = config_files([os.path.abspath(root) for root in roots], files)
+    if not paths:
+        return BUILTIN_REGISTRY
+    stamps = []
+    for path in paths:
+        st = os.stat(path)
+        stamps.append([path, st.st_mtime_ns, st.st_size])
+    key = json.dumps([_BUILTIN_KEY, stamps])
+    registry = _loaded.get(key)
+    if registry is not None:
+        return registry
+
+    cache_path = cache_path or os.path.join(default_cache_dir(), 'templates.json')
+    cached = _read_cache(cache_path)
+    try:
+        entry = cached[key]
+        registry = Registry(entry['templates'], entry['skip'], entry['sources'])
+    except (KeyError, TypeError):
+        registry = build_registry(paths)
+        cached.pop(key, None)
+        cached[key] = registry.as_dict()
+        while len(cached) > MAX_CACHED:
+            del cached[next(iter(cached))]
+        _write_cache(cache_path, cached)
+    _loaded[key] = registry
+    return registry
+
+
+def _read_cache(path):
+    try:
+        with open(path, encoding='utf-8') as fh:
+            cached = json.load(fh)
+    except (OSError, ValueError):
+        return {}
+    return cached if isinstance(cached, dict) else {}
+
+
+def _write_cache(path, cached):
+    """Best effort: a registry that cannot be cached is just resolved again next run"""
+    temp = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(temp, 'w', encoding='utf-8') as fh:
+            json.dump(cached, fh)
+        os.replace(temp, path)
+    except OSError:
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
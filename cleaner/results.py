@@ -0,0 +1,347 @@
+"""Compact, columnar store for scan results
+
+A dict per result costs several hundred bytes, most of it the path string
+repeated in path and relative_path. ResultStore keeps one row per result
+in typed arrays instead: the parent directory and the project folder are
+interned and stored as ids, names go into one SpooledTemporaryFile that moves to disk once it
+outgrows memory_budget, sizes are an array and the selected flag is one
+bit. Totals are kept running, so selection stats never need a pass over
+the rows. Rows are numbered in insertion order and keep their number when
+others are removed.
+
+save() writes the columns as they are to one file and load() reads them
+back with a few array.frombytes calls, so the GUI can show the last
+results at startup without rebuilding a dict per row.
+"""
+
+import json
+import os
+import tempfile
+import threading
+from array import array
+
+from .sizing import DiskUsage
+
+DEFAULT_MEMORY_BUDGET = 64 * 1024 * 1024  # Bytes of names kept in memory before spilling
+
+_FOLDER = 1
+_REMOVED = 2
+_STALE = 4  # Changed on disk since it was measured
+_UNKNOWN = -1  # Size not measured yet
+_REMOVED_BYTES = bytes(1 if flags & _REMOVED else 0 for flags in range(256))  # translate() table
+
+SNAPSHOT_MAGIC = b'cleaner-results 3\n'
+# Columns in the order save() writes them
+_COLUMNS = ('_dir', '_project', '_name_offset', '_name_length', '_flags', '_template', '_size', '_allocated',
+            '_selected')
+_HEADER_KEYS = {'meta', 'base_path', 'dirs', 'templates', 'rows', 'names', 'itemsizes', 'totals'}
+
+
+class ResultStore:
+    """Scan results as columns, with running totals"""
+
+    def __init__(self, base_path=None, memory_budget=DEFAULT_MEMORY_BUDGET):
+        self.base_path = base_path
+        self._dirs = []  # id -> parent directory or project folder
+        self._dir_ids = {}
+        self._templates = [None]
+        self._template_ids = {None: 0}
+        self._dir = array('I')
+        self._project = array('I')  # Directory id of the project; the parent directory if not known
+        self._name_offset = array('Q')
+        self._name_length = array('I')
+        self._flags = bytearray()
+        self._template = array('H')  # Ids of templates; config files can define hundreds
+        self._size = array('q')
+        self._allocated = array('q')
+        self._linked_usage = {}  # row -> DiskUsage, only for rows holding hardlinked files
+        self._selected = bytearray()  # One bit per row
+        self._names = tempfile.SpooledTemporaryFile(max_size=memory_budget)
+        self._names_end = 0
+        self._names_lock = threading.Lock()
+        self.count = 0
+        self.total_size = 0
+        self.selected_count = 0
+        self.selected_size = 0
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self._names.close()
+
+    @property
+    def spilled(self):
+        """Whether the names have moved to a file on disk"""
+        return getattr(self._names, '_rolled', False)
+
+    # Adding and reading rows
+
+    def add(self, item):
+        """Append a result (a mapping as make_item() returns it); returns its row"""
+        row = len(self._dir)
+        parent, name = os.path.split(item['path'])
+        dir_id = self._intern_dir(parent)
+        project = item.get('project')
+        project_id = dir_id if project is None else self._intern_dir(project)
+        template = item.get('template')
+        template_id = self._template_ids.get(template)
+        if template_id is None:
+            template_id = self._template_ids[template] = len(self._templates)
+            self._templates.append(template)
+
+        encoded = os.fsencode(name)
+        with self._names_lock:
+            self._names.seek(self._names_end)
+            self._names.write(encoded)
+        self._name_offset.append(self._names_end)
+        self._name_length.append(len(encoded))
+        self._names_end += len(encoded)
+
+        self._dir.append(dir_id)
+        self._project.append(project_id)
+        self._flags.append(_FOLDER if item['type'] == 'Folder' else 0)
+        self._template.append(template_id)
+        self._size.append(_UNKNOWN)
+        self._allocated.append(0)
+        if row % 8 == 0:
+            self._selected.append(0)
+        self.count += 1
+        if item.get('usage') is not None:
+            self.set_usage(row, item['usage'])
+        elif item['size'] is not None:
+            self.set_size(row, item['size'])
+        self.set_selected(row, item.get('selected', True))
+        return row
+
+    def _intern_dir(self, directory):
+        dir_id = self._dir_ids.get(directory)
+        if dir_id is None:
+            dir_id = self._dir_ids[directory] = len(self._dirs)
+            self._dirs.append(directory)
+        return dir_id
+
+    def name(self, row):
+        with self._names_lock:
+            self._names.seek(self._name_offset[row])
+            return os.fsdecode(self._names.read(self._name_length[row]))
+
+    def dir_id(self, row):
+        return self._dir[row]
+
+    def project_id(self, row):
+        return self._project[row]
+
+    def directory(self, dir_id):
+        return self._dirs[dir_id]
+
+    def path(self, row):
+        return os.path.join(self._dirs[self._dir[row]], self.name(row))
+
+    def relative_path(self, row):
+        path = self.path(row)
+        return os.path.relpath(path, self.base_path) if self.base_path else path
+
+    def type(self, row):
+        return 'Folder' if self._flags[row] & _FOLDER else 'File'
+
+    def template(self, row):
+        return self._templates[self._template[row]]
+
+    def size(self, row):
+        size = self._size[row]
+        return None if size == _UNKNOWN else size
+
+    def usage(self, row):
+        usage = self._linked_usage.get(row)
+        if usage is None and self._size[row] != _UNKNOWN:
+            usage = DiskUsage(self._size[row], self._allocated[row])
+        return usage
+
+    def is_removed(self, row):
+        return bool(self._flags[row] & _REMOVED)
+
+    def is_stale(self, row):
+        return bool(self._flags[row] & _STALE)
+
+    def is_selected(self, row):
+        return bool(self._selected[row >> 3] & (1 << (row & 7)))
+
+    def item(self, row):
+        """The row as a standalone result dict"""
+        return {
+            'path': self.path(row),
+            'relative_path': self.relative_path(row),
+            'type': self.type(row),
+            'size': self.size(row),
+            'selected': self.is_selected(row),
+            'template': self.template(row),
+            'usage': self.usage(row),
+            'project': self._dirs[self._project[row]]
+        }
+
+    def rows(self):
+        """Live rows in insertion order"""
+        flags = self._flags
+        return (row for row in range(len(flags)) if not flags[row] & _REMOVED)
+
+    def selected_rows(self):
+        return [row for row in self.rows() if self.is_selected(row)]
+
+    def find(self, paths):
+        """{path: row} for the given paths that are in the store, in one pass over the names"""
+        wanted = {}
+        for path in paths:
+            parent, name = os.path.split(path)
+            dir_id = self._dir_ids.get(parent)
+            if dir_id is not None:
+                wanted[(dir_id, os.fsencode(name))] = path
+        found = {}
+        if not wanted:
+            return found
+        with self._names_lock:
+            self._names.seek(0)
+            for row in range(len(self._dir)):
+                name = self._names.read(self._name_length[row])
+                path = wanted.get((self._dir[row], name))
+                if path is not None and not self._flags[row] & _REMOVED:
+                    found[path] = row
+        return found
+
+    # Updates, each adjusting the running totals
+
+    def set_size(self, row, size, allocated=None):
+        """Record a size; returns the change"""
+        old = self._size[row]
+        delta = size - (0 if old == _UNKNOWN else old)
+        self._size[row] = size
+        self._allocated[row] = size if allocated is None else allocated
+        self.total_size += delta
+        if self.is_selected(row):
+            self.selected_size += delta
+        return delta
+
+    def set_usage(self, row, usage):
+        """Record a DiskUsage; returns the change in apparent size"""
+        if usage.linked:
+            self._linked_usage[row] = usage
+        else:
+            self._linked_usage.pop(row, None)
+        return self.set_size(row, usage.apparent, usage.allocated)
+
+    def set_selected(self, row, selected):
+        """Returns True if the flag changed"""
+        if self.is_selected(row) == bool(selected) or self._flags[row] & _REMOVED:
+            return False
+        self._selected[row >> 3] ^= 1 << (row & 7)
+        sign = 1 if selected else -1
+        self.selected_count += sign
+        self.selected_size += sign * (self.size(row) or 0)
+        return True
+
+    def select_all(self, selected):
+        """Set every live row's bit with one bitmap assignment; totals follow from count and total_size"""
+        length = len(self._selected)
+        if not selected:
+            self._selected[:] = bytes(length)
+            self.selected_count = self.selected_size = 0
+            return
+        self._selected[:] = b'\xff' * length
+        rows = len(self._flags)
+        if rows % 8:
+            self._selected[-1] = (1 << (rows % 8)) - 1  # No bits past the last row
+        if self.count < rows:
+            removed = self._flags.translate(_REMOVED_BYTES)
+            row = removed.find(1)
+            while row != -1:
+                self._selected[row >> 3] &= ~(1 << (row & 7))
+                row = removed.find(1, row + 1)
+        self.selected_count = self.count
+        self.selected_size = self.total_size
+
+    def mark_stale(self, rows):
+        for row in rows:
+            self._flags[row] |= _STALE
+
+    def remove(self, rows):
+        """Drop rows; their numbers are not reused"""
+        for row in rows:
+            if self._flags[row] & _REMOVED:
+                continue
+            self.set_selected(row, False)
+            self.total_size -= self.size(row) or 0
+            self._flags[row] |= _REMOVED
+            self._linked_usage.pop(row, None)
+            self.count -= 1
+
+    # Snapshots
+
+    def save(self, path, meta=None):
+        """Write every row, removed ones included, to path along with the JSON-able meta dict
+
+        Sizes of hardlinked files are saved as plain apparent and
+        allocated bytes, so reclaimable space reads as allocated after a
+        load. Replaces path in one rename.
+        """
+        with self._names_lock:
+            self._names.seek(0)
+            names = self._names.read(self._names_end)
+        columns = [memoryview(getattr(self, column)) for column in _COLUMNS]
+        header = {
+            'meta': meta or {}, 'base_path': self.base_path, 'dirs': self._dirs, 'templates': self._templates,
+            'rows': len(self._dir), 'names': len(names), 'itemsizes': [column.itemsize for column in columns],
+            'totals': [self.count, self.total_size, self.selected_count, self.selected_size],
+        }
+        temp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temp, 'wb') as fh:
+                fh.write(SNAPSHOT_MAGIC)
+                fh.write(json.dumps(header).encode() + b'\n')
+                for column in columns:
+                    fh.write(column)
+                fh.write(names)
+            os.replace(temp, path)
+        except OSError:
+            try:
+                os.remove(temp)
+            except OSError:
+                pass
+            raise
+
+    @classmethod
+    def load(cls, path, memory_budget=DEFAULT_MEMORY_BUDGET):
+        """(ResultStore, meta) from a file written by save(); ValueError if it is not one"""
+        with open(path, 'rb') as fh:
+            if fh.readline() != SNAPSHOT_MAGIC:
+                raise ValueError(f"{path}: not a results snapshot")
+            try:
+                header = json.loads(fh.readline())
+            except ValueError:
+                header = None
+            if not isinstance(header, dict) or not _HEADER_KEYS <= header.keys():
+                raise ValueError(f"{path}: damaged header")
+            store = cls(header['base_path'], memory_budget)
+            rows = header['rows']
+            for column, itemsize in zip(_COLUMNS, header['itemsizes']):
+                data = getattr(store, column)
+                if memoryview(data).itemsize != itemsize:
+                    raise ValueError(f"{path}: saved where array items have other sizes")
+                length = ((rows + 7) // 8 if column == '_selected' else rows) * itemsize
+                chunk = fh.read(length)
+                if len(chunk) != length:
+                    raise ValueError(f"{path}: truncated")
+                if isinstance(data, bytearray):
+                    data.extend(chunk)
+                else:
+                    data.frombytes(chunk)
+            names = fh.read(header['names'])
+            if len(names) != header['names']:
+                raise ValueError(f"{path}: truncated")
+        store._names.write(names)
+        store._names_end = len(names)
+        store._dirs = header['dirs']
+        store._dir_ids = {directory: i for i, directory in enumerate(store._dirs)}
+        store._templates = header['templates']
+        store._template_ids = {template: i for i, template in enumerate(store._templates)}
+        store.count, store.total_size, store.selected_count, store.selected_size = header['totals']
+        return store, header['meta']
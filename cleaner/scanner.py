@@ -0,0 +1,435 @@
+"""Directory walk used by project scans"""
+
+import os
+import queue
+import threading
+import time
+
+from .metrics import WALK
+from .patterns import PatternMatcher, compile_patterns
+from .registry import load_registry
+from .sizing import DiskUsage, file_usage
+from .templates import AUTO, SKIP_FOLDERS
+from .traversal import DEFAULT_DEVICE_TIMEOUT, DirVisit, Traversal
+
+
+def list_dir(path, stats=None):
+    """Split a directory into (subdirectory names, other entry names)
+
+    Symlinks are listed with the files so the walk never follows them.
+    stats is an optional metrics.PhaseStats to count the work in.
+    """
+    dirs, files = [], []
+    errors = 0
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    is_dir = False
+                    errors += 1
+                (dirs if is_dir else files).append(entry.name)
+    except OSError:
+        errors += 1
+    if stats is not None:
+        stats.add(dirs=1, entries=len(dirs) + len(files), syscalls=1, errors=errors)
+    return tuple(dirs), tuple(files)
+
+
+def walk_tree(base_path, cache=None, progress=None, context=None, stats=None, skip_names=SKIP_FOLDERS,
+              one_filesystem=False, device_timeout=DEFAULT_DEVICE_TIMEOUT):
+    """Yield a DirVisit for each directory under base_path, top-down
+
+    The walk ProjectScan does, on a Traversal of its own: each directory
+    once, network mounts given up on after device_timeout seconds. Names
+    in skip_names are not descended into. With a ScanCache, listings of
+    directories whose mtime is unchanged come from the cache.
+    progress(visited, pending) is called after each directory.
+    """
+    traversal = Traversal(one_filesystem, device_timeout)
+    lister = cache.listdir if cache is not None else list_dir
+    try:
+        yield from traversal.walk(base_path, lister, progress, context, stats, skip_names)
+    finally:
+        traversal.close()
+
+
+def walk_project(base_path, folders_to_find, cache=None, progress=None, skip_names=SKIP_FOLDERS):
+    """Yield (root_dir, rel_dir, matched_folders, files) for each directory under base_path
+
+    folders_to_find is a PatternMatcher or a list of patterns. Matched
+    folders and skip_names are not descended into.
+    """
+    if not isinstance(folders_to_find, PatternMatcher):
+        folders_to_find = compile_patterns(tuple(folders_to_find))
+    for visit in walk_tree(base_path, cache, progress, skip_names=skip_names):
+        matched = [name for name in visit.dirs
+                   if folders_to_find.matches(name, f"{visit.rel}/{name}" if visit.rel else name)]
+        for name in matched:
+            visit.dirs.remove(name)
+        yield visit.path, visit.rel, matched, visit.files
+
+
+def dedupe_roots(roots):
+    """Resolve roots, dropping duplicates and roots nested inside another root"""
+    unique = []
+    seen = set()
+    for root in sorted({os.path.realpath(root) for root in roots}, key=len):
+        try:
+            st = os.stat(root)
+        except OSError:
+            continue
+        if (st.st_dev, st.st_ino) in seen:
+            continue  # Same directory reached through another mount or alias
+        if any(root.startswith(parent.rstrip(os.sep) + os.sep) for parent in unique):
+            continue
+        seen.add((st.st_dev, st.st_ino))
+        unique.append(root)
+    return unique
+
+
+class TemplateRules:
+    """A template's folder, file and skip matchers
+
+    Matchers come from compile_patterns, so they are compiled once per
+    process however many scans use the template. A folder pattern
+    ``name:pattern`` goes into guarded: such folders only match when they
+    hold an entry matching pattern.
+    """
+
+    def __init__(self, name, config):
+        self.name = name
+        folders = []
+        guarded = {}  # Folder pattern -> entry patterns
+        for pattern in config["folders"]:
+            folder, _, content = pattern.partition(':')
+            if content:
+                guarded.setdefault(folder, []).append(content)
+            else:
+                folders.append(pattern)
+        self.folders = compile_patterns(tuple(folders))
+        self.guarded = [(compile_patterns((folder,)), compile_patterns(tuple(contents)))
+                        for folder, contents in guarded.items()]
+        self.files = compile_patterns(tuple(config["files"]))
+        skip = config.get("skip")
+        self.skip = compile_patterns(tuple(skip)) if skip else None
+        self.needs_path = (self.folders.needs_path or self.files.needs_path or
+                           any(matcher.needs_path for matcher, _content in self.guarded) or
+                           (self.skip is not None and self.skip.needs_path))
+
+    def matches_folder(self, dir_path, name, rel_path=None):
+        """Whether folder name in dir_path is one of the template's artifacts"""
+        if self.folders.matches(name, rel_path):
+            return True
+        for matcher, content in self.guarded:
+            if matcher.matches(name, rel_path) and self._holds(os.path.join(dir_path, name), content):
+                return True
+        return False
+
+    @staticmethod
+    def _holds(path, content):
+        try:
+            with os.scandir(path) as entries:
+                return any(content.matches(entry.name) for entry in entries)
+        except OSError:
+            return False
+
+
+class TemplateDetector:
+    """Pick templates for a directory from the marker files it contains
+
+    Markers are file name patterns (``next.config.*``); ``name:text`` also
+    requires the file to contain text and ``name/`` matches a subdirectory
+    instead. A detected template drops any it supersedes, so a Next.js
+    project is not also reported as Node.js.
+    """
+
+    def __init__(self, templates):
+        self.markers = []  # (template name, matcher, required text, matches folders)
+        self.supersedes = {name: set(config.get("supersedes", ())) for name, config in templates.items()}
+        patterns = []
+        folder_patterns = []
+        for name, config in templates.items():
+            for marker in config.get("markers", ()):
+                if marker.endswith('/'):
+                    pattern, needle, is_folder = marker[:-1], '', True
+                    folder_patterns.append(pattern)
+                else:
+                    pattern, _, needle = marker.partition(':')
+                    is_folder = False
+                    patterns.append(pattern)
+                self.markers.append((name, compile_patterns((pattern,)), needle, is_folder))
+        self.any_marker = PatternMatcher(patterns)
+        self.any_folder_marker = PatternMatcher(folder_patterns) if folder_patterns else None
+
+    def detect(self, dir_path, files, dirs=()):
+        """Template names for dir_path, or None if it has no markers"""
+        marker_files = [name for name in files if self.any_marker.matches(name)]
+        marker_dirs = ([name for name in dirs if self.any_folder_marker.matches(name)]
+                       if self.any_folder_marker is not None else [])
+        if not marker_files and not marker_dirs:
+            return None
+        found = []
+        for template, matcher, needle, is_folder in self.markers:
+            if template in found:
+                continue
+            if is_folder:
+                if any(matcher.matches(name) for name in marker_dirs):
+                    found.append(template)
+                continue
+            for file_name in marker_files:
+                if matcher.matches(file_name) and (not needle or self._contains(dir_path, file_name, needle)):
+                    found.append(template)
+                    break
+        superseded = set().union(*(self.supersedes[name] for name in found))
+        return tuple(name for name in found if name not in superseded) or None
+
+    @staticmethod
+    def _contains(dir_path, file_name, needle):
+        try:
+            with open(os.path.join(dir_path, file_name), encoding='utf-8', errors='replace') as fh:
+                return needle in fh.read(256 * 1024)
+        except OSError:
+            return False
+
+
+def match_file(filename, patterns):
+    """Check if file matches any of the cleanup patterns"""
+    return compile_patterns(tuple(patterns)).matches(filename)
+
+
+def make_item(path, base_path, item_type, size, template=None, usage=None, project=None):
+    """Result record shared by the scanner and the UI
+
+    usage is the item's DiskUsage once known; size is its apparent bytes.
+    project is the folder of the project the item was found in.
+    """
+    return {
+        'path': path,
+        'relative_path': os.path.relpath(path, base_path) if base_path else path,
+        'type': item_type,
+        'size': size,
+        'selected': True,
+        'template': template,
+        'usage': usage,
+        'project': project
+    }
+
+
+class ProjectScan:
+    """A cancellable scan that yields result items as they are found
+
+    Takes one or more roots and one or more templates in a single walk of
+    each root. templates is a template name, a list of names, a template
+    config dict, or AUTO to pick templates per project from marker files.
+    Each item is tagged with the template that matched it. Several roots
+    are walked in parallel after overlapping ones are merged.
+
+    Folder items come out with size None; size them with a FolderSizer.
+    on_dir(path) is called for every directory walked outside the found
+    folders. With metrics, the walk is counted and timed in its WALK phase,
+    time split by the top-level folders of each root. Iterate on a worker
+    thread; cancel() and progress are safe to use from any other thread.
+
+    Each iteration walks with a fresh Traversal (see traversal.py): every
+    directory once however many bind mounts lead to it, optionally only
+    on each root's filesystem, and network mounts in their own lanes given
+    up on after device_timeout seconds. traversal.skipped then lists what
+    was left out and why.
+
+    Anchored patterns (``public/build``) are matched against the path
+    from the project: the nearest directory with one of the templates'
+    markers, or the root when there is none.
+
+    Template names are looked up in registry, by default the one
+    load_registry() gives for the roots: the built-ins plus user and
+    project config. Its skip list replaces SKIP_FOLDERS.
+    """
+
+    def __init__(self, roots, templates, cache=None, on_dir=None, metrics=None, one_filesystem=False,
+                 device_timeout=DEFAULT_DEVICE_TIMEOUT, registry=None):
+        if isinstance(roots, (str, os.PathLike)):
+            roots = [roots]
+        self.roots = dedupe_roots(os.path.abspath(root) for root in roots)
+        if len(self.roots) == 1:
+            self.base_path = self.roots[0]
+        else:
+            try:
+                self.base_path = os.path.commonpath(self.roots)
+            except ValueError:
+                self.base_path = None  # Different drives: relative paths stay absolute
+
+        self.registry = registry if registry is not None else load_registry(self.roots)
+        self.skip_names = frozenset(self.registry.skip)
+        self.auto = templates == AUTO
+        if self.auto:
+            templates = self.registry.templates
+        elif isinstance(templates, dict) and "folders" in templates:
+            templates = {"Custom": templates}
+        elif isinstance(templates, str):
+            templates = {templates: self.registry[templates]}
+        elif not isinstance(templates, dict):
+            templates = {name: self.registry[name] for name in templates}
+        self.rules = {name: TemplateRules(name, config) for name, config in templates.items()}
+        # Relative paths are only built when an anchored pattern needs them
+        self.needs_path = any(rules.needs_path for rules in self.rules.values())
+        # Picks templates with AUTO; either way marks where projects start, which anchored patterns are relative to
+        self.detector = TemplateDetector(templates) if self.auto or self.needs_path else None
+
+        self.cache = cache
+        self.on_dir = on_dir
+        self.metrics = metrics
+        self.one_filesystem = one_filesystem
+        self.device_timeout = device_timeout
+        self.traversal = None
+        self._counts = {root: (0, 1) for root in self.roots}  # root -> (visited, pending)
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    @property
+    def dirs_visited(self):
+        return sum(visited for visited, _pending in self._counts.values())
+
+    @property
+    def progress(self):
+        """Fraction of known directories visited so far (grows as the walk discovers more)"""
+        visited = pending = 0
+        for root_visited, root_pending in list(self._counts.values()):
+            visited += root_visited
+            pending += root_pending
+        return visited / (visited + pending) if visited + pending else 1.0
+
+    def __iter__(self):
+        stats = self.metrics[WALK] if self.metrics is not None else None
+        if stats is not None:
+            stats.start()
+        self.traversal = Traversal(self.one_filesystem, self.device_timeout)
+        try:
+            yield from self._scan_roots()
+        finally:
+            self.traversal.close()
+            if stats is not None:
+                stats.finish()
+
+    def _scan_roots(self):
+        if len(self.roots) <= 1:
+            for root in self.roots:
+                yield from self._scan_root(root)
+            return
+
+        results = queue.SimpleQueue()
+        done = object()
+        failed = object()  # Followed by the exception, which is raised here as the single-root path would
+
+        def run(root):
+            try:
+                for item in self._scan_root(root):
+                    results.put(item)
+            except BaseException as e:
+                results.put(failed)
+                results.put(e)
+            finally:
+                results.put(done)
+
+        threads = [threading.Thread(target=run, args=(root,), daemon=True) for root in self.roots]
+        for thread in threads:
+            thread.start()
+        running = len(threads)
+        error = None
+        while running:
+            item = results.get()
+            if item is done:
+                running -= 1
+            elif item is failed:
+                error = error or results.get()
+                self.cancel()  # Stop the other roots, then wait for them before raising
+            elif error is None:
+                yield item
+        if error is not None:
+            raise error
+
+    def _scan_root(self, root):
+        def on_dir(visited, pending):
+            self._counts[root] = (visited, pending)
+
+        # Context: the rules that apply, and the relative and full path of the project they apply in
+        context = ((), '', None) if self.auto else (tuple(self.rules.values()), '', root)
+        needs_path = self.needs_path
+        stats = self.metrics[WALK] if self.metrics is not None else None
+        lister = self.cache.listdir if self.cache is not None else list_dir
+        visits = self.traversal.walk(root, lister, on_dir, context, stats, self.skip_names)
+        if stats is not None:
+            visits = self._timed(visits, root, stats)
+        for visit in visits:
+            if self.cancelled:
+                return
+            if self.on_dir is not None:
+                self.on_dir(visit.path)
+            if self.detector is not None:
+                detected = self.detector.detect(visit.path, visit.files, visit.dirs)
+                if detected is not None:
+                    rules = tuple(self.rules[name] for name in detected) if self.auto else visit.context[0]
+                    visit.context = (rules, visit.rel, visit.path)
+            context_rules, project, project_path = visit.context
+            if not context_rules:
+                continue
+            in_project = visit.rel[len(project) + 1:] if project else visit.rel
+
+            for folder_name in list(visit.dirs):
+                rel_path = (f"{in_project}/{folder_name}" if in_project else folder_name) if needs_path else None
+                for rules in context_rules:
+                    if rules.matches_folder(visit.path, folder_name, rel_path):
+                        visit.dirs.remove(folder_name)  # Don't recurse into found folders
+                        yield make_item(os.path.join(visit.path, folder_name), self.base_path, 'Folder', None,
+                                        rules.name, project=project_path)
+                        break
+                else:
+                    if any(rules.skip is not None and rules.skip.matches(folder_name, rel_path)
+                           for rules in context_rules):
+                        visit.dirs.remove(folder_name)
+
+            for file_name in visit.files:
+                rel_path = (f"{in_project}/{file_name}" if in_project else file_name) if needs_path else None
+                for rules in context_rules:
+                    if rules.files.matches(file_name, rel_path):
+                        file_path = os.path.join(visit.path, file_name)
+                        try:
+                            usage = file_usage(file_path)
+                        except OSError:
+                            usage = DiskUsage()
+                            if stats is not None:
+                                stats.add(errors=1)
+                        if stats is not None:
+                            stats.add(syscalls=1, bytes=usage.apparent)
+                        yield make_item(file_path, self.base_path, 'File', usage.apparent, rules.name, usage,
+                                        project_path)
+                        break
+
+    @staticmethod
+    def _timed(visits, root, stats):
+        """Pass visits through, adding the time taken to list each to its top-level folder
+
+        Only the walk itself is timed: whatever the consumer does with the
+        items happens while this generator is suspended.
+        """
+        subtrees = {}
+        try:
+            while True:
+                began = time.perf_counter()
+                try:
+                    visit = next(visits)
+                except StopIteration:
+                    return
+                top = visit.rel.split('/', 1)[0]
+                subtrees[top] = subtrees.get(top, 0.0) + time.perf_counter() - began
+                yield visit
+        finally:
+            for top, seconds in subtrees.items():
+                stats.subtree(os.path.join(root, top) if top else root, seconds)
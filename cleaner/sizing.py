@@ -0,0 +1,263 @@
+"""Folder size calculation on a bounded worker pool
+
+Sizes come in three flavours (see DiskUsage): apparent bytes (st_size),
+allocated bytes (st_blocks, so sparse files and block rounding count as
+they do on disk) and reclaimable bytes. Files with more than one hard link,
+which pnpm's store and uv/pip caches leave all over node_modules and .venv
+folders, are counted once per (st_dev, st_ino) and only free their blocks
+when every one of their links is inside what gets deleted.
+"""
+
+import heapq
+import os
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .traversal import DEFAULT_DEVICE_TIMEOUT, Traversal
+
+# Sizing is dominated by scandir/stat syscalls, which release the GIL,
+# so a few threads per core keep the disk queue busy.
+DEFAULT_SIZE_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# One hardlinked file: st_dev, st_ino, st_nlink, links seen, st_size, allocated bytes.
+# Big-endian, so packed records sort by (st_dev, st_ino) as plain bytes too.
+LINK_RECORD = struct.Struct('>QQIIQQ')
+
+
+def _allocated(st):
+    blocks = getattr(st, 'st_blocks', None)  # Not reported on Windows
+    return st.st_size if blocks is None else blocks * 512
+
+
+def size_dir(path, stats=None):
+    """Return (subdirectory names, apparent bytes, allocated bytes, linked records) for a directory
+
+    The byte counts cover the files directly inside that have a single
+    link; files with more come back as packed LINK_RECORDs so the caller
+    can count each inode once. stats is an optional metrics.PhaseStats.
+    """
+    subdirs = []
+    file_bytes = allocated = 0
+    linked = []
+    seen = stat_calls = errors = 0
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                seen += 1
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                    elif entry.is_file(follow_symlinks=False):
+                        stat_calls += 1
+                        st = entry.stat(follow_symlinks=False)
+                        if st.st_nlink > 1:
+                            linked.append(LINK_RECORD.pack(st.st_dev, st.st_ino, st.st_nlink, 1,
+                                                           st.st_size, _allocated(st)))
+                        else:
+                            file_bytes += st.st_size
+                            allocated += _allocated(st)
+                except OSError:
+                    errors += 1
+    except OSError:
+        errors += 1
+    if stats is not None:
+        stats.add(dirs=1, entries=seen, syscalls=1 + stat_calls, errors=errors)
+    return tuple(subdirs), file_bytes, allocated, b''.join(linked)
+
+
+def _merge_links(streams):
+    """Merge record tuples sorted by inode, adding up the links seen of repeats"""
+    dev = ino = None
+    for record in heapq.merge(*streams):
+        if record[0] == dev and record[1] == ino:
+            nlink = max(nlink, record[2])
+            links += record[3]
+            continue
+        if dev is not None:
+            yield dev, ino, nlink, links, size, allocated
+        dev, ino, nlink, links, size, allocated = record
+    if dev is not None:
+        yield dev, ino, nlink, links, size, allocated
+
+
+class LinkedFiles:
+    """Hardlinked files, one sorted LINK_RECORD per inode in a single bytes object
+
+    40 bytes per inode however many links it has, against several hundred
+    for a dict of tuples, so millions of linked files stay affordable.
+    """
+
+    __slots__ = ('records',)
+
+    def __init__(self, records=b''):
+        self.records = records
+
+    @classmethod
+    def collect(cls, chunks):
+        """Build from packed records in any order, such as size_dir results"""
+        return cls._pack(_merge_links([sorted(LINK_RECORD.iter_unpack(b''.join(chunks)))]))
+
+    @classmethod
+    def union(cls, sets):
+        """Merge several sets, streaming over their sorted records"""
+        return cls._pack(_merge_links([iter(linked) for linked in sets]))
+
+    @classmethod
+    def _pack(cls, records):
+        return cls(b''.join(LINK_RECORD.pack(*record) for record in records))
+
+    def __iter__(self):
+        return LINK_RECORD.iter_unpack(self.records)
+
+    def __len__(self):
+        return len(self.records) // LINK_RECORD.size
+
+
+_NO_LINKS = LinkedFiles()
+
+
+class DiskUsage:
+    """Apparent, allocated and reclaimable bytes of a folder, file or selection
+
+    reclaimable counts single-link files plus the hardlinked ones whose
+    links are all inside; the other linked files stay on disk after a delete.
+    """
+
+    __slots__ = ('unique_apparent', 'unique_allocated', 'linked', 'apparent', 'allocated', 'reclaimable')
+
+    def __init__(self, unique_apparent=0, unique_allocated=0, linked=None):
+        self.unique_apparent = unique_apparent
+        self.unique_allocated = unique_allocated
+        self.linked = linked if linked else _NO_LINKS
+        self.apparent = unique_apparent
+        self.allocated = self.reclaimable = unique_allocated
+        for _dev, _ino, nlink, links, size, allocated in self.linked:
+            self.apparent += size
+            self.allocated += allocated
+            if links >= nlink:
+                self.reclaimable += allocated
+
+    @classmethod
+    def combine(cls, usages):
+        """Usage of several non-overlapping folders and files together, each inode once"""
+        usages = list(usages)
+        return cls(sum(usage.unique_apparent for usage in usages),
+                   sum(usage.unique_allocated for usage in usages),
+                   LinkedFiles.union(usage.linked for usage in usages if usage.linked))
+
+
+def folder_usage(folder_path, cache=None, stats=None, read=None):
+    """DiskUsage of a folder from an iterative scandir walk
+
+    With a ScanCache, directories whose mtime is unchanged are not re-read.
+    With a metrics.PhaseStats the folder is counted and timed as one subtree.
+    read(path, stats), if given, reads each directory instead of size_dir
+    or the cache, which it is handed as its first argument.
+    """
+    began = time.perf_counter()
+    apparent = allocated = 0
+    linked = []
+    stack = [folder_path]
+    plain = cache.size_dir if cache is not None else size_dir
+    while stack:
+        path = stack.pop()
+        if read is not None:
+            subdirs, file_bytes, file_allocated, links = read(plain, path, stats)
+        else:
+            subdirs, file_bytes, file_allocated, links = plain(path, stats)
+        apparent += file_bytes
+        allocated += file_allocated
+        if links:
+            linked.append(links)
+        stack.extend(os.path.join(path, name) for name in subdirs)
+    usage = DiskUsage(apparent, allocated, LinkedFiles.collect(linked) if linked else None)
+    if stats is not None:
+        stats.add(bytes=usage.apparent)
+        stats.subtree(folder_path, time.perf_counter() - began, began)
+    return usage
+
+
+def folder_size(folder_path, cache=None):
+    """Calculate total size of folder, counting hardlinked files once"""
+    return folder_usage(folder_path, cache).apparent
+
+
+def format_size(size_bytes):
+    """Format bytes to human readable string"""
+    if size_bytes == 0:
+        return "0 B"
+    for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
+        if size_bytes < 1024.0:
+            return f"{size_bytes:.1f} {unit}"
+        size_bytes /= 1024.0
+    return f"{size_bytes:.1f} PB"
+
+
+def file_usage(path):
+    """DiskUsage of a single file, without following symlinks"""
+    st = os.lstat(path)
+    if st.st_nlink > 1:
+        record = LINK_RECORD.pack(st.st_dev, st.st_ino, st.st_nlink, 1, st.st_size, _allocated(st))
+        return DiskUsage(linked=LinkedFiles(record))
+    return DiskUsage(st.st_size, _allocated(st))
+
+
+class FolderSizer:
+    """Measure many folders concurrently with a fixed number of workers
+
+    Folders on network and FUSE mounts are read in that device's lane of
+    a Traversal, at most device_timeout seconds per directory, as the walk
+    does. A folder whose device stops answering comes back as an empty
+    DiskUsage and is listed in skipped as (path, reason), so one hung
+    mount cannot keep sizing from finishing.
+    """
+
+    def __init__(self, workers=DEFAULT_SIZE_WORKERS, device_timeout=DEFAULT_DEVICE_TIMEOUT, mounts=None):
+        self.workers = max(1, int(workers))
+        self.device_timeout = device_timeout
+        self.mounts = mounts  # None: read the mount table, again on each reset()
+        self.traversal = Traversal(timeout=device_timeout, mounts=mounts)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='sizer')
+
+    @property
+    def skipped(self):
+        return self.traversal.skipped
+
+    def reset(self):
+        """Start over with the current mount table, no stalled devices and nothing skipped"""
+        old, self.traversal = self.traversal, Traversal(timeout=self.device_timeout, mounts=self.mounts)
+        old.close()
+
+    def usage(self, folder_path, cache=None, stats=None):
+        """folder_usage, through a lane when the folder is on a slow device"""
+        traversal = self.traversal
+        dev = traversal.device_of(folder_path) if traversal.slow_devices else None
+        if dev not in traversal.slow_devices:
+            return folder_usage(folder_path, cache, stats)
+
+        def read(plain, path, stats):
+            return traversal.call(dev, plain, path, stats)
+
+        try:
+            return folder_usage(folder_path, cache, stats, read)
+        except TimeoutError as e:
+            traversal.skip(folder_path, str(e), stats)
+            return DiskUsage()
+
+    def submit(self, folder_path, callback=None, cache=None, stats=None):
+        """Queue a folder for sizing; callback(path, usage) runs on a worker thread"""
+        future = self._executor.submit(self.usage, folder_path, cache, stats)
+        if callback is not None:
+            future.add_done_callback(lambda f: callback(folder_path, f.result()))
+        return future
+
+    def size_all(self, folder_paths, cache=None, stats=None):
+        """Yield (path, DiskUsage) pairs in completion order"""
+        futures = {self._executor.submit(self.usage, path, cache, stats): path for path in folder_paths}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        self.traversal.close()
@@ -0,0 +1,53 @@
+"""Built-in cleanup templates
+
+"markers" are the files that identify a project of that type when
+scanning with AUTO; "name:text" also requires the file to contain text.
+A detected template drops the ones it "supersedes" in the same folder.
+User and project config can add to and override these, see registry.py.
+"""
+
+AUTO = "auto"  # Pseudo template: detect each project's type from its markers
+
+# Large folders whose contents are never worth scanning into
+SKIP_FOLDERS = ('node_modules', '.git', '.venv')
+
+TEMPLATES = {
+    "Next.js": {
+        "folders": [".next", "node_modules", "dist", "build", ".cache"],
+        "files": ["package-lock.json", "yarn.lock", ".env.local", ".env.development.local"],
+        "markers": ["next.config.*"],
+        "supersedes": ["Node.js", "React"]
+    },
+    "React": {
+        "folders": ["build", "node_modules", "dist", ".cache"],
+        "files": ["package-lock.json", "yarn.lock", ".env.local"],
+        "markers": ["package.json:react-scripts"],
+        "supersedes": ["Node.js"]
+    },
+    "Vite": {
+        "folders": ["dist", "node_modules", ".vite", "build"],
+        "files": ["package-lock.json", "yarn.lock", ".env.local"],
+        "markers": ["vite.config.*"],
+        "supersedes": ["Node.js", "React"]
+    },
+    "Python": {
+        "folders": ["__pycache__", ".venv", "venv", "env", ".pytest_cache", "dist", "build"],
+        "files": ["poetry.lock", "Pipfile.lock", ".coverage", "*.pyc", "*.pyo"],
+        "markers": ["pyproject.toml", "setup.py", "setup.cfg", "requirements*.txt", "Pipfile"]
+    },
+    "Node.js": {
+        "folders": ["node_modules", "dist", "build", ".cache", ".npm"],
+        "files": ["package-lock.json", "yarn.lock", "npm-debug.log", "*.log"],
+        "markers": ["package.json"]
+    }
+}
+
+
+def find_template(name, templates=TEMPLATES):
+    """Look up a template by name, ignoring case and punctuation ('nextjs' finds 'Next.js')"""
+    def key(text):
+        return ''.join(c for c in text.lower() if c.isalnum())
+    for template_name in templates:
+        if key(template_name) == key(name):
+            return template_name
+    raise KeyError(name)
@@ -0,0 +1,212 @@
+"""Rename-then-delete staging for instant, undoable deletes
+
+stage() renames an item into a trash directory on the same filesystem, so
+it vanishes from the project in one rename() no matter how large it is. A
+low-priority reaper thread deletes staged items once their undo grace
+period has passed. Every staging directory is recorded in the user's cache
+dir, so items left behind by an interrupted run are reaped on next launch.
+
+Each staged item is a directory holding ``manifest.json`` (written first)
+and ``payload`` (the renamed item).
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+
+from .deletion import remove_tree
+from .paths import default_cache_dir
+
+UNDO_GRACE_SECONDS = 60
+TRASH_DIR_NAME = '.project-cleaner-trash'
+
+
+def _mount_root(path):
+    """Topmost directory above path on the same device"""
+    path = os.path.abspath(path)
+    dev = os.lstat(path).st_dev
+    while True:
+        parent = os.path.dirname(path)
+        if parent == path or os.lstat(parent).st_dev != dev:
+            return path
+        path = parent
+
+
+def _lower_thread_priority():
+    """Run the calling thread below every other one, where that can be done per thread
+
+    Only Linux schedules threads individually and takes a thread id as
+    the "process" of setpriority(); elsewhere it would renice the process
+    or whatever process has that id.
+    """
+    if not sys.platform.startswith('linux'):
+        return
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+    except OSError:
+        pass
+
+
+class StagedItem:
+    """An item renamed into a trash directory, waiting for the reaper"""
+
+    def __init__(self, entry_dir, original_path, staged_at, size=None):
+        self.entry_dir = entry_dir
+        self.original_path = original_path
+        self.staged_at = staged_at
+        self.size = size
+
+    @property
+    def payload(self):
+        return os.path.join(self.entry_dir, 'payload')
+
+
+class Trash:
+    """Per-volume staging directories plus the background reaper"""
+
+    def __init__(self, grace=UNDO_GRACE_SECONDS, cache_dir=None):
+        self.grace = grace
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.registry_path = os.path.join(self.cache_dir, 'trash-dirs.json')
+        self._staging_dirs = {}  # st_dev -> staging dir on that device
+        self._pending = {}  # entry_dir -> StagedItem
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._reaper = None
+
+    # Staging
+
+    def _staging_dir_for(self, path):
+        dev = os.lstat(path).st_dev
+        staging = self._staging_dirs.get(dev)
+        if staging is not None:
+            return staging
+
+        # Prefer the user's cache dir; otherwise the top of the item's volume
+        candidates = [os.path.join(self.cache_dir, 'trash'), os.path.join(_mount_root(path), TRASH_DIR_NAME)]
+        for candidate in candidates:
+            try:
+                os.makedirs(candidate, mode=0o700, exist_ok=True)
+                if os.stat(candidate).st_dev == dev:
+                    self._staging_dirs[dev] = candidate
+                    self._register(candidate)
+                    return candidate
+            except OSError:
+                continue
+        raise OSError(f"No writable trash directory on the same volume as {path}")
+
+    def _register(self, staging):
+        known = set(self._registered())
+        if staging not in known:
+            known.add(staging)
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(self.registry_path, 'w', encoding='utf-8') as fh:
+                json.dump(sorted(known), fh)
+
+    def _registered(self):
+        try:
+            with open(self.registry_path, encoding='utf-8') as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return []
+
+    def stage(self, path, size=None):
+        """Move path into trash; raises OSError if it cannot be renamed there"""
+        staging = self._staging_dir_for(path)
+        entry_dir = os.path.join(staging, f"{int(time.time())}-{uuid.uuid4().hex[:12]}")
+        staged = StagedItem(entry_dir, os.path.abspath(path), time.time(), size)
+
+        os.mkdir(entry_dir)
+        with open(os.path.join(entry_dir, 'manifest.json'), 'w', encoding='utf-8') as fh:
+            json.dump({'original_path': staged.original_path, 'staged_at': staged.staged_at, 'size': size}, fh)
+        try:
+            os.rename(path, staged.payload)
+        except OSError:
+            remove_tree(entry_dir)
+            raise
+
+        with self._lock:
+            self._pending[entry_dir] = staged
+        self._wake.set()
+        return staged
+
+    def restore(self, staged):
+        """Put a staged item back; returns False if it was already reaped or cannot go back
+
+        An item that cannot go back (path taken, parent gone, no permission)
+        stays staged and is reaped when its grace period is over.
+        """
+        with self._lock:
+            if self._pending.pop(staged.entry_dir, None) is None:
+                return False
+        try:
+            if os.path.lexists(staged.original_path):
+                raise FileExistsError(staged.original_path)
+            os.rename(staged.payload, staged.original_path)
+        except OSError:
+            with self._lock:
+                self._pending[staged.entry_dir] = staged
+            self._wake.set()
+            return False
+        try:
+            remove_tree(staged.entry_dir)
+        except OSError:
+            pass  # Only the manifest is left; resume() reaps it next launch
+        return True
+
+    # Reaping
+
+    def resume(self):
+        """Queue items left in any known staging directory by an earlier run"""
+        for staging in self._registered():
+            try:
+                entries = os.listdir(staging)
+            except OSError:
+                continue
+            for name in entries:
+                entry_dir = os.path.join(staging, name)
+                try:
+                    with open(os.path.join(entry_dir, 'manifest.json'), encoding='utf-8') as fh:
+                        manifest = json.load(fh)
+                    staged = StagedItem(entry_dir, manifest['original_path'], manifest['staged_at'],
+                                        manifest.get('size'))
+                except (OSError, ValueError, KeyError):
+                    staged = StagedItem(entry_dir, None, 0)  # Torn entry: reap right away
+                with self._lock:
+                    self._pending.setdefault(entry_dir, staged)
+        self._wake.set()
+
+    def start(self, resume=True):
+        """Run the reaper on a daemon thread, first picking up leftovers unless resume is False"""
+        if self._reaper is None:
+            self._reaper = threading.Thread(target=self._reap_loop, args=(resume,), name='trash-reaper',
+                                            daemon=True)
+            self._reaper.start()
+
+    def reap_due(self, now=None):
+        """Delete every staged item whose grace period is over; returns the next due time"""
+        now = time.time() if now is None else now
+        while True:
+            with self._lock:
+                due = [s for s in self._pending.values() if s.staged_at + self.grace <= now]
+                if not due:
+                    return min((s.staged_at + self.grace for s in self._pending.values()), default=None)
+                staged = due[0]
+                del self._pending[staged.entry_dir]  # From here on restore() reports it gone
+            try:
+                remove_tree(staged.entry_dir)
+            except OSError:
+                pass  # Left on disk; picked up again by resume() next launch
+
+    def _reap_loop(self, resume):
+        _lower_thread_priority()
+        if resume:
+            self.resume()
+        while True:
+            self._wake.clear()  # Before reaping, so a stage() during the pass is not missed
+            next_due = self.reap_due()
+            timeout = None if next_due is None else max(0.5, next_due - time.time())
+            self._wake.wait(timeout)
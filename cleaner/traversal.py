@@ -0,0 +1,293 @@
+"""Loop-, mount- and slow-device-aware directory traversal
+
+Traversal.walk() is the walk ProjectScan and scanner.walk_tree use.
+Compared to a plain scandir loop it:
+
+- remembers every (st_dev, st_ino) it listed, so bind mounts and other
+  aliases of a directory are walked once and cannot loop
+- with one_filesystem, stays on the device of the root, like ``du -x``
+- lists directories on network and FUSE filesystems (from the mount
+  table) in per-device lanes of worker threads. The walk carries on with
+  local directories while those listings run, and only waits for them,
+  at most timeout seconds at a time, once nothing local is left. A device
+  that does not answer in time is marked stalled and the rest of it
+  skipped, so one hung NFS mount cannot hold up the scan.
+
+Every directory left out is recorded in skipped as (path, reason).
+call() runs other per-directory work, such as FolderSizer's listings, in
+the same lanes under the same timeout.
+"""
+
+import os
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError as ResultTimeout
+
+DEFAULT_DEVICE_TIMEOUT = 10.0  # Seconds to wait for a remote listing before giving up on its device
+DEFAULT_LANE_WORKERS = 4  # Listings in flight per remote device
+
+# Filesystem types whose listings can take seconds or hang
+SLOW_FILESYSTEMS = frozenset([
+    'nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', 'ncpfs', 'afs', '9p', 'ceph', 'glusterfs', 'lustre', 'gpfs',
+    'davfs', 'sshfs', 'autofs',
+])
+
+LOOP = 'loop'
+OTHER_FILESYSTEM = 'other filesystem'
+TIMEOUT = 'timeout'
+STALLED = 'stalled device'
+
+
+class DirVisit:
+    """One directory reached by walk_tree
+
+    Remove names from dirs to keep the walk out of them, as with os.walk.
+    Subdirectories inherit whatever context holds once the caller is done.
+    """
+
+    __slots__ = ('path', 'rel', 'dirs', 'files', 'context')
+
+    def __init__(self, path, rel, dirs, files, context):
+        self.path = path
+        self.rel = rel  # '/'-separated path from the walk root, '' for the root
+        self.dirs = dirs
+        self.files = files
+        self.context = context
+
+
+def _unescape(field):
+    """mountinfo writes space, tab, newline and backslash as octal escapes"""
+    if '\\' not in field:
+        return field
+    return field.encode().decode('unicode_escape').encode('latin-1').decode('utf-8', 'replace')
+
+
+def mount_table(path='/proc/self/mountinfo'):
+    """{mount point: (st_dev, filesystem type)}, read without touching the mounts themselves
+
+    Empty where there is no mountinfo (macOS, Windows); walks then only
+    rely on st_dev and treat every device as local.
+    """
+    mounts = {}
+    try:
+        with open(path, encoding='utf-8', errors='replace') as fh:
+            for line in fh:
+                fields = line.split()
+                try:
+                    separator = fields.index('-')
+                    major, minor = fields[2].split(':')
+                    mounts[_unescape(fields[4])] = (os.makedev(int(major), int(minor)), fields[separator + 1])
+                except (ValueError, IndexError):
+                    continue
+    except OSError:
+        pass
+    return mounts
+
+
+class _Lane:
+    """Daemon threads listing directories of one device
+
+    Plain daemon threads rather than a ThreadPoolExecutor: a thread stuck
+    in a hung syscall must not keep the process from exiting.
+    """
+
+    def __init__(self, name, workers):
+        self.jobs = queue.SimpleQueue()
+        self.futures = set()
+        self.lock = threading.Lock()
+        self.stalled = False
+        for i in range(workers):
+            threading.Thread(target=self._work, name=f'{name}-{i}', daemon=True).start()
+
+    def submit(self, fn, *args):
+        future = Future()
+        with self.lock:
+            self.futures.add(future)
+        self.jobs.put((future, fn, args))
+        return future
+
+    def _work(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            future, fn, args = job
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args))
+                except BaseException as e:
+                    future.set_exception(e)
+            with self.lock:
+                self.futures.discard(future)
+
+    def stall(self):
+        """Give up on the device: queued listings are cancelled, running ones abandoned"""
+        self.stalled = True
+        with self.lock:
+            futures = list(self.futures)
+        for future in futures:
+            future.cancel()
+
+    def close(self, workers):
+        """Let idle workers exit; one stuck in a syscall exits whenever that returns"""
+        for _ in range(workers):
+            self.jobs.put(None)
+
+
+class Traversal:
+    """Shared walk state for one scan: visited directories, lanes and what was skipped
+
+    One Traversal can walk several roots, also from several threads; a
+    directory reachable from two roots is only listed once.
+    """
+
+    def __init__(self, one_filesystem=False, timeout=DEFAULT_DEVICE_TIMEOUT, lane_workers=DEFAULT_LANE_WORKERS,
+                 mounts=None):
+        self.one_filesystem = one_filesystem
+        self.timeout = timeout
+        self.lane_workers = lane_workers
+        self.mounts = mount_table() if mounts is None else mounts
+        self.slow_devices = {dev for dev, fstype in self.mounts.values()
+                             if fstype in SLOW_FILESYSTEMS or fstype.startswith('fuse')}
+        self.skipped = []  # (path, reason)
+        self._visited = set()
+        self._lanes = {}
+        self._lock = threading.Lock()
+
+    def skip(self, path, reason, stats=None):
+        with self._lock:
+            self.skipped.append((path, reason))
+        if stats is not None and reason in (TIMEOUT, STALLED):
+            stats.add(errors=1)
+
+    def close(self):
+        """Stop the lane threads; walking again starts new ones"""
+        with self._lock:
+            lanes, self._lanes = list(self._lanes.values()), {}
+        for lane in lanes:
+            lane.stall()
+            lane.close(self.lane_workers)
+
+    def _lane(self, dev):
+        with self._lock:
+            lane = self._lanes.get(dev)
+            if lane is None:
+                lane = self._lanes[dev] = _Lane(f'lane-{os.major(dev)}:{os.minor(dev)}', self.lane_workers)
+        return lane
+
+    def call(self, dev, fn, *args):
+        """fn(*args) in the lane of slow device dev, waiting at most timeout seconds
+
+        TimeoutError (with TIMEOUT or STALLED as message) when the device
+        does not answer in time; it is then stalled and later calls fail
+        at once.
+        """
+        lane = self._lane(dev)
+        if lane.stalled:
+            raise TimeoutError(STALLED)
+        future = lane.submit(fn, *args)
+        try:
+            return future.result(self.timeout)
+        except ResultTimeout:
+            lane.stall()
+            raise TimeoutError(TIMEOUT) from None
+
+    def _read(self, path, lister, stats):
+        """(dirs, files, st_dev) for a directory not listed before, else None"""
+        if stats is not None:
+            stats.add(syscalls=1)
+        try:
+            st = os.lstat(path)
+        except OSError:
+            if stats is not None:
+                stats.add(errors=1)
+            return None
+        key = (st.st_dev, st.st_ino)
+        with self._lock:
+            if key in self._visited:
+                self.skipped.append((path, LOOP))
+                return None
+            self._visited.add(key)
+        dirs, files = lister(path, stats)
+        return dirs, files, st.st_dev
+
+    def walk(self, base_path, lister, progress=None, context=None, stats=None, skip_names=()):
+        """Yield a DirVisit for each directory under base_path, top-down
+
+        lister(path, stats) returns (subdirectory names, other names), e.g.
+        scanner.list_dir or ScanCache.listdir. Names in skip_names are not
+        descended into. progress(visited, pending) follows each directory.
+        """
+        root_dev = None
+        # path, rel, context, device the directory should be on, listing once read
+        stack = [(base_path, '', context, self.device_of(base_path), None)]
+        in_flight = {}  # Future -> stack entry, for listings running in a lane
+        finished = queue.SimpleQueue()
+        visited = 0
+        while stack or in_flight:
+            if not stack:
+                try:
+                    future = finished.get(timeout=self.timeout)
+                except queue.Empty:
+                    self._give_up(in_flight, stats)
+                    continue
+                entry = in_flight.pop(future, None)
+                if entry is None:
+                    continue  # Given up on already
+                if future.cancelled() or future.exception() is not None or future.result() is None:
+                    continue
+                stack.append(entry[:4] + (future.result(),))
+
+            path, rel, context, dev, listing = stack.pop()
+            if listing is None:
+                if self.one_filesystem and root_dev is not None and dev != root_dev:
+                    self.skip(path, OTHER_FILESYSTEM)
+                    continue
+                if dev in self.slow_devices:
+                    lane = self._lane(dev)
+                    if lane.stalled:
+                        self.skip(path, STALLED, stats)
+                        continue
+                    future = lane.submit(self._read, path, lister, stats)
+                    in_flight[future] = (path, rel, context, dev)
+                    future.add_done_callback(finished.put)
+                    continue
+                listing = self._read(path, lister, stats)
+                if listing is None:
+                    continue
+            dirs, files, dev = listing
+            if root_dev is None:
+                root_dev = dev
+            elif self.one_filesystem and dev != root_dev:
+                self.skip(path, OTHER_FILESYSTEM)
+                continue
+
+            visit = DirVisit(path, rel, list(dirs), files, context)
+            yield visit
+
+            # Reverse so directories come off the stack in listing order, like os.walk
+            for name in reversed(visit.dirs):
+                if name not in skip_names:
+                    child = os.path.join(path, name)
+                    child_dev = self.mounts[child][0] if child in self.mounts else dev
+                    stack.append((child, f"{rel}/{name}" if rel else name, visit.context, child_dev, None))
+            visited += 1
+            if progress is not None:
+                progress(visited, len(stack) + len(in_flight))
+
+    def _give_up(self, in_flight, stats):
+        """Nothing came back for timeout seconds: stall the devices still being waited on"""
+        for future, (path, _rel, _context, dev) in list(in_flight.items()):
+            self._lane(dev).stall()
+            self.skip(path, TIMEOUT, stats)
+        in_flight.clear()
+
+    def device_of(self, path):
+        """Device path is on, from the longest mount point above it; None without a mount table"""
+        path = os.path.realpath(path)
+        best = None
+        for point, (dev, _fstype) in self.mounts.items():
+            if (path == point or path.startswith(point.rstrip(os.sep) + os.sep)) and (
+                    best is None or len(point) > len(best[0])):
+                best = (point, dev)
+        return None if best is None else best[1]
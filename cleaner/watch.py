@@ -0,0 +1,501 @@
+"""Live index of cleanable items, kept current by a filesystem watcher
+
+LiveIndex walks its roots once (or loads the snapshot a previous run
+saved) and from then on follows changes instead of walking again. On
+Linux it uses inotify through ctypes; elsewhere, or when inotify is not
+available, it polls, which the ScanCache keeps to a stat per directory.
+
+Watches go on the project directories first, so new and removed artifact
+folders are noticed, then breadth-first into the artifact folders until
+max_watches is used up. A change under a watched artifact re-sizes only
+that artifact, and the ScanCache re-reads only directories whose mtime
+moved, so applying the delta costs about as much as the change itself.
+Artifacts that did not fit in the watch budget are re-sized on each poll.
+"""
+
+import collections
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import sqlite3
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import CancelledError
+
+from .cache import CACHE_MAX_AGE, ScanCache
+from .paths import default_cache_dir
+from .scanner import ProjectScan, dedupe_roots, list_dir, make_item
+from .sizing import DEFAULT_SIZE_WORKERS, DiskUsage, FolderSizer, LinkedFiles
+
+DEFAULT_MAX_WATCHES = 8192
+POLL_INTERVAL = 60  # Seconds between polls of whatever the watches do not cover
+SETTLE_SECONDS = 1.0  # Quiet time before a burst of events (an npm install) is applied
+MAX_SETTLE_SECONDS = 10.0  # Apply anyway when events never stop
+
+# inotify(7)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_ISDIR = 0x40000000
+
+_EVENT = struct.Struct('iIII')  # wd, mask, cookie, name length
+
+SCHEMA_VERSION = 2  # Bump when a table changes; older tables are dropped and rebuilt
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scopes (
+    scope TEXT PRIMARY KEY,
+    updated INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    scope TEXT NOT NULL,
+    path TEXT NOT NULL,
+    type TEXT NOT NULL,
+    template TEXT,
+    unique_apparent INTEGER NOT NULL,
+    unique_allocated INTEGER NOT NULL,
+    links BLOB NOT NULL,
+    project TEXT,
+    PRIMARY KEY (scope, path)
+);
+"""
+
+
+class Inotify:
+    """Minimal inotify binding: directory watches and non-blocking reads"""
+
+    MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+            | IN_MOVE_SELF | IN_ONLYDIR | IN_DONT_FOLLOW)
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self._rm_watch = libc.inotify_rm_watch
+        self._rm_watch.argtypes = (ctypes.c_int, ctypes.c_int)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+    def add(self, path):
+        """Watch a directory; returns the watch descriptor"""
+        wd = self._add_watch(self.fd, os.fsencode(path), self.MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def remove(self, wd):
+        self._rm_watch(self.fd, wd)
+
+    def read(self, timeout):
+        """(wd, mask, name) events, waiting at most timeout seconds for the first"""
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return []
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                events.append((wd, mask, os.fsdecode(data[offset:offset + length].rstrip(b'\0'))))
+                offset += length
+
+    def close(self):
+        os.close(self.fd)
+
+
+def watch_limit(max_watches=DEFAULT_MAX_WATCHES):
+    """max_watches, capped at half the per-user inotify limit so other programs keep theirs"""
+    try:
+        with open('/proc/sys/fs/inotify/max_user_watches') as fh:
+            return min(max_watches, int(fh.read()) // 2)
+    except (OSError, ValueError):
+        return max_watches
+
+
+class LiveIndex:
+    """Found items and their sizes under some roots, kept up to date in the background
+
+    load() restores what the last run saved so results can be shown at once;
+    start() then checks them against the disk and keeps watching.
+    on_change(added, removed, resized) runs on the watcher thread with
+    lists of items, removed paths and re-sized items. Items handed out are
+    copies, free to be changed by the caller.
+    """
+
+    def __init__(self, roots, templates, cache=None, path=None, max_watches=DEFAULT_MAX_WATCHES,
+                 poll_interval=POLL_INTERVAL, size_workers=DEFAULT_SIZE_WORKERS, on_change=None, registry=None):
+        config = ProjectScan(roots, templates, registry=registry)
+        self.roots = config.roots
+        self.base_path = config.base_path
+        self.templates = templates
+        self.registry = config.registry
+        self.rules = list(config.rules.values())
+        self.detector = config.detector
+        self.scope = self.scope_for(roots, templates)
+        self.cache = cache if cache is not None else ScanCache()
+        self.path = path or os.path.join(default_cache_dir(), 'live-index.sqlite3')
+        self.max_watches = max_watches
+        self.poll_interval = poll_interval
+        self.on_change = on_change
+        self.updated = None  # When the items were last checked against the disk
+        self.ready = threading.Event()  # Set after the first refresh
+        self._items = {}  # path -> item; replaced, never changed in place
+        self._stale = set()  # Loaded folder sizes still to be checked
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._scan = None
+        self._sizer = FolderSizer(size_workers)
+        self._watcher = None
+        self._watches = {}  # wd -> directory
+        self._watched = {}  # directory -> wd
+        self._artifact_dirs = {}  # artifact folder -> watched directories inside it
+        self._unwatched = set()  # Artifacts not fully covered by watches
+        self._written = set()  # Directories with events since the last resize, whose cached sizes may be stale
+        self._partial = False  # Some project directories are not watched either
+
+    @staticmethod
+    def scope_for(roots, templates):
+        """Key that saved indexes are stored under"""
+        if isinstance(roots, (str, os.PathLike)):
+            roots = [roots]
+        roots = dedupe_roots(os.path.abspath(root) for root in roots)
+        return json.dumps({'roots': roots, 'templates': templates}, sort_keys=True)
+
+    def covers(self, roots, templates):
+        return self.scope_for(roots, templates) == self.scope
+
+    def items(self):
+        with self._lock:
+            return [dict(item) for item in self._items.values()]
+
+    # Persistence
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            conn.executescript("DROP TABLE IF EXISTS scopes; DROP TABLE IF EXISTS items;")
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def load(self):
+        """Restore the items saved for these roots and templates; False if there are none"""
+        try:
+            conn = self._connect()
+        except (OSError, sqlite3.Error):
+            return False
+        try:
+            row = conn.execute("SELECT updated FROM scopes WHERE scope = ?", (self.scope,)).fetchone()
+            if row is None:
+                return False
+            items = {}
+            for path, item_type, template, unique_apparent, unique_allocated, links, project in conn.execute(
+                    "SELECT path, type, template, unique_apparent, unique_allocated, links, project FROM items "
+                    "WHERE scope = ?", (self.scope,)):
+                usage = DiskUsage(unique_apparent, unique_allocated, LinkedFiles(links))
+                items[path] = make_item(path, self.base_path, item_type, usage.apparent, template, usage, project)
+        except sqlite3.Error:
+            return False
+        finally:
+            conn.close()
+        with self._lock:
+            self._items = items
+            self._stale = {path for path, item in items.items() if item['type'] == 'Folder'}
+        self.updated = row[0]
+        return True
+
+    def seed(self, items):
+        """Take fully sized items from a scan that just finished instead of sizing again"""
+        items = {item['path']: make_item(item['path'], self.base_path, item['type'], item['size'],
+                                         item['template'], item['usage'], item.get('project'))
+                 for item in items if item['usage'] is not None}
+        with self._lock:
+            self._items = items
+            self._stale = set()
+
+    def save(self):
+        with self._lock:
+            items = list(self._items.values())
+        try:
+            conn = self._connect()
+        except (OSError, sqlite3.Error):
+            return
+        try:
+            with conn:
+                conn.execute("DELETE FROM items WHERE scope = ?", (self.scope,))
+                conn.executemany(
+                    "INSERT INTO items VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    ((self.scope, item['path'], item['type'], item['template'], item['usage'].unique_apparent,
+                      item['usage'].unique_allocated, item['usage'].linked.records, item.get('project'))
+                     for item in items))
+                conn.execute("INSERT OR REPLACE INTO scopes VALUES (?, ?)", (self.scope, int(self.updated or 0)))
+                # Indexes of roots nobody has watched for a while
+                old = [scope for scope, in conn.execute("SELECT scope FROM scopes WHERE updated < ?",
+                                                         (int(time.time()) - CACHE_MAX_AGE,))]
+                conn.executemany("DELETE FROM items WHERE scope = ?", ((scope,) for scope in old))
+                conn.executemany("DELETE FROM scopes WHERE scope = ?", ((scope,) for scope in old))
+        except sqlite3.Error:
+            pass
+        finally:
+            conn.close()
+
+    def forget(self, paths):
+        """Drop deleted items now rather than when their events arrive"""
+        paths = set(paths)
+        with self._lock:
+            self._items = {path: item for path, item in self._items.items() if path not in paths}
+
+    # Updating
+
+    def _publish(self, items, resized_paths=()):
+        """Swap in a new item map, report the differences and save"""
+        with self._lock:
+            old, self._items = self._items, items
+            self._stale -= set(resized_paths)
+        added = [item for path, item in items.items() if path not in old]
+        removed = [path for path in old if path not in items]
+        resized = [item for path, item in items.items()
+                   if path in old and item['usage'] is not old[path]['usage']
+                   and (item['size'], item['usage'].allocated) != (old[path]['size'], old[path]['usage'].allocated)]
+        self.updated = time.time()
+        if added or removed or resized or not self.ready.is_set():
+            self.save()
+        if self.on_change is not None and (added or removed or resized):
+            self.on_change([dict(item) for item in added], removed, [dict(item) for item in resized])
+        return added, removed
+
+    def _size(self, items):
+        """Size folder items in place; False if stop() interrupted it"""
+        by_path = {item['path']: item for item in items}
+        try:
+            for path, usage in self._sizer.size_all(list(by_path), self.cache):
+                by_path[path]['usage'], by_path[path]['size'] = usage, usage.apparent
+        except (CancelledError, RuntimeError):
+            return False
+        return True
+
+    def refresh(self, resize=()):
+        """Walk the roots again, sizing new folders and those in resize; False if stopped midway"""
+        project_dirs = []
+        self._scan = scan = ProjectScan(self.roots, self.templates, self.cache, on_dir=project_dirs.append,
+                                        registry=self.registry)
+        with self._lock:
+            old = self._items
+        found = {}
+        to_size = []
+        for item in scan:
+            previous = old.get(item['path'])
+            if item['type'] == 'Folder':
+                if previous is not None and item['path'] not in resize:
+                    item['usage'], item['size'] = previous['usage'], previous['size']
+                else:
+                    to_size.append(item)
+            found[item['path']] = item
+        if scan.cancelled or not self._size(to_size):
+            return False
+        self.cache.save()
+        added, _removed = self._publish(found, [item['path'] for item in to_size])
+        self._rewatch(project_dirs, {item['path'] for item in added} | set(resize))
+        return True
+
+    def resize(self, paths):
+        """Re-size some folders without walking the roots"""
+        with self._lock:
+            items = dict(self._items)
+        changed = [dict(items[path]) for path in paths if path in items]
+        if not self._size(changed):
+            return
+        items.update((item['path'], item) for item in changed)
+        self.cache.save()
+        self._publish(items, [item['path'] for item in changed])
+
+    # Watching
+
+    def _rewatch(self, project_dirs, changed):
+        """Point the watches at the current project directories and artifacts"""
+        if self._watcher is None:
+            with self._lock:
+                self._unwatched = {path for path, item in self._items.items() if item['type'] == 'Folder'}
+            return
+        budget = watch_limit(self.max_watches)
+        wanted = project_dirs[:budget]
+        self._partial = len(project_dirs) > budget
+
+        with self._lock:
+            artifacts = sorted((item for item in self._items.values() if item['type'] == 'Folder'),
+                               key=lambda item: item['size'] or 0, reverse=True)  # Biggest first
+        self._artifact_dirs = {path: dirs for path, dirs in self._artifact_dirs.items()
+                               if path in self._items and path not in changed}
+        self._unwatched = set()
+        for item in artifacts:
+            dirs = self._artifact_dirs.get(item['path'])
+            if dirs is None:
+                dirs = self._artifact_dirs[item['path']] = []
+                queue = collections.deque([item['path']])
+                while queue and len(wanted) + len(dirs) < budget:
+                    path = queue.popleft()
+                    dirs.append(path)
+                    queue.extend(os.path.join(path, name) for name in list_dir(path)[0])
+                if queue:
+                    self._unwatched.add(item['path'])
+            if len(wanted) + len(dirs) > budget:
+                self._unwatched.add(item['path'])
+                dirs = dirs[:max(0, budget - len(wanted))]
+            wanted.extend(dirs)
+
+        wanted = set(wanted)
+        for path in [path for path in self._watched if path not in wanted]:
+            self._watcher.remove(self._watched.pop(path))
+        for path in wanted:
+            if path not in self._watched:
+                self._add_watch(path)
+
+    def _add_watch(self, path):
+        try:
+            wd = self._watcher.add(path)
+        except OSError:
+            return False  # Gone already, or the system-wide limit was hit
+        self._watches[wd] = path
+        self._watched[path] = wd
+        return True
+
+    def _artifact_for(self, dir_path):
+        """The indexed folder dir_path is in, or None for a project directory"""
+        path = dir_path
+        while path not in self._items:
+            parent = os.path.dirname(path)
+            if parent == path or path in self.roots:
+                return None
+            path = parent
+        return path
+
+    def _could_match(self, name):
+        """Whether a file appearing in a project directory could change the results"""
+        if self.detector is not None and self.detector.any_marker.matches(name):
+            return True
+        return any(rules.files.needs_path or rules.files.matches(name) for rules in self.rules)
+
+    def _classify(self, wd, mask, name, pending):
+        """Note what an event means; True when the roots need walking again"""
+        if mask & IN_Q_OVERFLOW:
+            pending.update(self._items)
+            self._written.update(self._items)
+            return True
+        dir_path = self._watches.get(wd)
+        if dir_path is None:
+            return False
+        if mask & IN_IGNORED:
+            del self._watches[wd]
+            self._watched.pop(dir_path, None)
+            return False
+
+        artifact = self._artifact_for(dir_path)
+        if artifact is None:
+            return bool(mask & (IN_ISDIR | IN_DELETE_SELF | IN_MOVE_SELF)) or self._could_match(name)
+        if mask & (IN_DELETE_SELF | IN_MOVE_SELF) and dir_path == artifact:
+            return True
+        pending.add(artifact)
+        self._written.add(dir_path)
+        if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+            if len(self._watched) >= watch_limit(self.max_watches) or not self._add_watch(
+                    os.path.join(dir_path, name)):
+                self._unwatched.add(artifact)
+        return False
+
+    def start(self):
+        """Check the items against the disk, then keep them current, on a daemon thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='live-index', daemon=True)
+            self._thread.start()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def stop(self):
+        self._stop.set()
+        if self._scan is not None:
+            self._scan.cancel()
+        if self._thread is not None:
+            self._thread.join()
+        self._sizer.shutdown(wait=False)
+
+    def _run(self):
+        for root in self.roots:
+            self.cache.load(root)
+        if sys.platform.startswith('linux'):
+            try:
+                self._watcher = Inotify()
+            except (OSError, AttributeError):
+                self._watcher = None  # Polling only
+        try:
+            with self._lock:
+                stale = set(self._stale)
+            if self.refresh(stale):
+                self.ready.set()
+                self._watch_loop()
+        finally:
+            if self._watcher is not None:
+                self._watcher.close()
+
+    def _watch_loop(self):
+        pending = set()  # Artifacts to re-size
+        rescan = False
+        burst_start = None
+        next_poll = time.monotonic() + self.poll_interval
+        while not self._stop.is_set():
+            now = time.monotonic()
+            # Never block for long, so stop() is noticed
+            timeout = min(max(0.0, next_poll - now), SETTLE_SECONDS)
+            if self._watcher is not None:
+                events = self._watcher.read(timeout)
+            else:
+                events = []
+                self._stop.wait(timeout)
+            if self._stop.is_set():
+                return
+
+            for wd, mask, name in events:
+                rescan = self._classify(wd, mask, name, pending) or rescan
+            if events:
+                burst_start = burst_start or now
+                if now - burst_start < MAX_SETTLE_SECONDS:
+                    continue  # Let the burst settle first
+            burst_start = None
+
+            if time.monotonic() >= next_poll:
+                next_poll = time.monotonic() + self.poll_interval
+                pending |= self._unwatched
+                rescan = rescan or self._watcher is None or self._partial
+            if self._written:
+                # Writing to a file leaves its directory's mtime alone, so the cache would not notice
+                self.cache.forget(self._written)
+                self._written = set()
+            if rescan:
+                if not self.refresh(pending):
+                    return
+            elif pending:
+                self.resize(pending)
+            pending = set()
+            rescan = False
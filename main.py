@@ -1,37 +1,326 @@
 import os
-import shutil
+import sys
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 import threading
-from pathlib import Path
+import queue
+import bisect
+from array import array
 import time
 
+# Only what the window and the restored results need; the scan engine is
+# imported on a background thread once the window is up (see warm_up)
+import cleaner
+from cleaner import (AUTO, BUILTIN_REGISTRY, DELETE, SIZE, UI, DiskUsage, Metrics, ResultStore, default_cache_dir,
+                     format_size, load_registry, profiled)
+
+SCAN_DRAIN_INTERVAL = 50  # ms between moving found items into the tree
+SCAN_ROWS_PER_TICK = 500  # Keeps each tick short so the window stays responsive
+SCAN_DONE = object()  # Queue sentinel pushed when the walk finishes
+ROW_HEIGHT = 22  # Results rows, fixed so the visible row count can be computed
+AUTO_DETECT = "Auto-detect"  # Combobox entry that scans with templates.AUTO
+STATS_REFRESH_INTERVAL = 500  # ms between stats panel updates while it is open
+METRICS_REPORT = 'last-run-metrics.json'  # Written to the cache folder after each scan and delete
+SESSION_FILE = 'last-results.bin'  # ResultStore snapshot shown at the next start, in the cache folder
+WARM_UP_DELAY = 100  # ms after the first paint before the scan engine is imported
+
+
+class ResultGroup:
+    """Results found in one project, shown as one expandable row"""
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = array('L')  # ResultStore rows
+        self.expanded = False
+        self.size = 0
+        self.selected_count = 0
+
+
+class ResultsView:
+    """Windowed model behind the results Treeview
+
+    Only the rows that fit in the widget exist in Tk; scrolling rewrites
+    their values from the model instead of inserting or deleting rows, so
+    selection changes and scrolling cost the same for 100 or 100,000
+    results. With grouping on, items are listed under the project they
+    were found in and a group's rows are only laid out once it is expanded.
+    
+    Results live in a ResultStore; the view refers to them by row number.
+    """
+
+    def __init__(self, tree, scrollbar):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.grouped = False
+        self.offset = 0  # First model row shown
+        self.visible = 20  # Rows that fit in the widget
+        self.row_targets = {}  # Tree iid -> store row or ResultGroup
+        self._render_pending = False
+        self.stats = None  # metrics.PhaseStats that redraw times go to
+        self.store = None
+        self.clear()
+        
+        self.tree.tag_configure('stale', foreground='#95a5a6')
+        self.scrollbar.configure(command=self.on_scrollbar)
+        self.tree.bind('<Configure>', self.on_resize)
+        self.tree.bind('<MouseWheel>', lambda e: self.scroll(-3 if e.delta > 0 else 3, 'units'))
+        self.tree.bind('<Button-4>', lambda e: self.scroll(-3, 'units'))
+        self.tree.bind('<Button-5>', lambda e: self.scroll(3, 'units'))
+        self.tree.bind('<Prior>', lambda e: self.scroll(-1, 'pages'))
+        self.tree.bind('<Next>', lambda e: self.scroll(1, 'pages'))
+
+    def clear(self, base_path=None, store=None):
+        """Start over empty, or with the rows of store (a loaded snapshot)"""
+        if self.store is not None:
+            self.store.close()
+        self.store = store if store is not None else ResultStore(base_path)
+        self.order = array('L')  # Live store rows in the order found
+        self.groups = {}  # Store project id -> ResultGroup
+        self.group_list = []  # In discovery order
+        self.group_starts = []  # First model row of each group when grouped
+        self.row_count = 0
+        self.layout_dirty = store is not None
+        self.offset = 0
+        if store is not None:
+            for row in store.rows():
+                self.place(row)
+        self.request_render()
+
+    def __len__(self):
+        return len(self.store)
+
+    # Totals, kept running by the store
+
+    @property
+    def total_size(self):
+        return self.store.total_size
+
+    @property
+    def selected_count(self):
+        return self.store.selected_count
+
+    @property
+    def selected_size(self):
+        return self.store.selected_size
+
+    # Model updates
+
+    def add(self, item):
+        """Add a result dict; returns its store row"""
+        row = self.store.add(item)
+        self.place(row)
+        self.layout_dirty = True
+        self.request_render()
+        return row
+
+    def place(self, row):
+        """List a store row last, under its project's group"""
+        self.order.append(row)
+        project_id = self.store.project_id(row)
+        group = self.groups.get(project_id)
+        if group is None:
+            directory = self.store.directory(project_id)
+            base_path = self.store.base_path
+            name = os.path.relpath(directory, base_path) if base_path else directory
+            group = self.groups[project_id] = ResultGroup('' if name == os.curdir else name)
+            self.group_list.append(group)
+        group.rows.append(row)
+        
+        group.size += self.store.size(row) or 0
+        if self.store.is_selected(row):
+            group.selected_count += 1
+
+    def group_of(self, row):
+        return self.groups[self.store.project_id(row)]
+
+    def set_usage(self, row, usage):
+        """Record a folder size that arrived after the item was added"""
+        self.group_of(row).size += self.store.set_usage(row, usage)
+        self.request_render()
+
+    def set_selected(self, row, selected):
+        if self.store.set_selected(row, selected):
+            self.group_of(row).selected_count += 1 if selected else -1
+
+    def toggle(self, row):
+        self.set_selected(row, not self.store.is_selected(row))
+        self.request_render()
+
+    def select_all(self, selected):
+        """Select or clear every item; only the visible rows are redrawn"""
+        self.store.select_all(selected)
+        for group in self.group_list:
+            group.selected_count = len(group.rows) if selected else 0
+        self.request_render()
+
+    def select_only(self, rows):
+        """Select exactly the given rows"""
+        rows = set(rows)
+        for row in self.order:
+            self.set_selected(row, row in rows)
+        self.request_render()
+
+    def select_group(self, group, selected):
+        for row in group.rows:
+            self.set_selected(row, selected)
+        self.request_render()
+
+    def mark_stale(self, rows):
+        """Grey out rows that changed on disk since they were measured"""
+        self.store.mark_stale(rows)
+        self.request_render()
+
+    def find(self, paths):
+        """{path: row} for the paths currently listed"""
+        return self.store.find(paths)
+
+    def remove(self, paths):
+        """Drop items by path, adjusting totals instead of recounting"""
+        rows = set(self.find(paths).values())
+        if not rows:
+            return
+        for row in rows:
+            self.set_selected(row, False)
+            self.group_of(row).size -= self.store.size(row) or 0
+        self.store.remove(rows)
+        self.order = array('L', (row for row in self.order if row not in rows))
+        for group in self.group_list:
+            group.rows = array('L', (row for row in group.rows if row not in rows))
+        self.group_list = [group for group in self.group_list if group.rows]
+        self.groups = {project_id: group for project_id, group in self.groups.items() if group.rows}
+        self.layout_dirty = True
+        self.request_render()
+
+    def items(self):
+        """Every listed result as a dict, with its row"""
+        return [dict(self.store.item(row), row=row) for row in self.order]
+
+    def selected_items(self):
+        return [self.store.item(row) for row in self.order if self.store.is_selected(row)]
+
+    def set_grouped(self, grouped):
+        self.grouped = grouped
+        self.offset = 0
+        self.layout_dirty = True
+        self.request_render()
+
+    def toggle_group(self, group):
+        group.expanded = not group.expanded
+        self.layout_dirty = True
+        self.request_render()
+
+    # Layout and rendering
+
+    def relayout(self):
+        """Recompute where each group starts; O(groups), only after structural changes"""
+        if self.grouped:
+            self.group_starts = []
+            row = 0
+            for group in self.group_list:
+                self.group_starts.append(row)
+                row += 1 + (len(group.rows) if group.expanded else 0)
+            self.row_count = row
+        else:
+            self.row_count = len(self.order)
+        self.layout_dirty = False
+
+    def row_target(self, row):
+        """Store row or ResultGroup shown at a model row"""
+        if not self.grouped:
+            return self.order[row]
+        index = bisect.bisect_right(self.group_starts, row) - 1
+        group = self.group_list[index]
+        within = row - self.group_starts[index]
+        return group if within == 0 else group.rows[within - 1]
+
+    def row_values(self, target):
+        if isinstance(target, ResultGroup):
+            if target.selected_count == len(target.rows):
+                check = "✅"
+            elif target.selected_count:
+                check = "➖"
+            else:
+                check = "⬜"
+            arrow = "▾" if target.expanded else "▸"
+            return (check, format_size(target.size), f"{len(target.rows)} items", "",
+                    f"{arrow} 📦 {target.name or '(project root)'}")
+        
+        store = self.store
+        item_type = store.type(target)
+        size = store.size(target)
+        icon = "📁" if item_type == 'Folder' else "📄"
+        selected_icon = "✅" if store.is_selected(target) else "⬜"
+        indent = "      " if self.grouped else ""
+        return (
+            selected_icon,
+            format_size(size) if size is not None else "…",
+            item_type,
+            store.template(target) or "",
+            f"{indent}{icon} {store.relative_path(target)}"
+        )
+
+    def request_render(self):
+        """Coalesce redraws from many model changes into one idle callback"""
+        if not self._render_pending:
+            self._render_pending = True
+            self.tree.after_idle(self.render)
+
+    def render(self):
+        began = time.perf_counter()
+        self._render_pending = False
+        if self.layout_dirty:
+            self.relayout()
+        self.offset = max(0, min(self.offset, self.row_count - self.visible))
+        
+        shown = min(self.visible, self.row_count - self.offset)
+        self.row_targets = {}
+        for i in range(shown):
+            iid = f"row{i}"
+            target = self.row_target(self.offset + i)
+            self.row_targets[iid] = target
+            values = self.row_values(target)
+            tags = ('stale',) if not isinstance(target, ResultGroup) and self.store.is_stale(target) else ()
+            if self.tree.exists(iid):
+                self.tree.item(iid, values=values, tags=tags)
+            else:
+                self.tree.insert('', 'end', iid=iid, values=values, tags=tags)
+        # Drop rows left over from a longer list or a taller window
+        i = shown
+        while self.tree.exists(f"row{i}"):
+            self.tree.delete(f"row{i}")
+            i += 1
+        
+        if self.row_count:
+            self.scrollbar.set(self.offset / self.row_count, (self.offset + shown) / self.row_count)
+        else:
+            self.scrollbar.set(0, 1)
+        if self.stats is not None:
+            self.stats.subtree('render', time.perf_counter() - began)
+
+    def scroll(self, amount, what):
+        step = self.visible if what == 'pages' else 1
+        self.offset += int(amount) * step
+        self.request_render()
+        return 'break'
+
+    def on_scrollbar(self, action, *args):
+        if action == 'moveto':
+            self.offset = int(float(args[0]) * self.row_count)
+            self.request_render()
+        else:
+            self.scroll(args[0], args[1])
+
+    def on_resize(self, event):
+        first = self.tree.bbox('row0')
+        header = first[1] if first else 25
+        visible = max(1, (event.height - header) // ROW_HEIGHT)
+        if visible != self.visible:
+            self.visible = visible
+            self.request_render()
 
-TEMPLATES = {
-    "Next.js": {
-        "folders": [".next", "node_modules", "dist", "build", ".cache"],
-        "files": ["package-lock.json", "yarn.lock", ".env.local", ".env.development.local"]
-    },
-    "React": {
-        "folders": ["build", "node_modules", "dist", ".cache"],
-        "files": ["package-lock.json", "yarn.lock", ".env.local"]
-    },
-    "Vite": {
-        "folders": ["dist", "node_modules", ".vite", "build"],
-        "files": ["package-lock.json", "yarn.lock", ".env.local"]
-    },
-    "Python": {
-        "folders": ["__pycache__", ".venv", "venv", "env", ".pytest_cache", "dist", "build"],
-        "files": ["poetry.lock", "Pipfile.lock", ".coverage", "*.pyc", "*.pyo"]
-    },
-    "Node.js": {
-        "folders": ["node_modules", "dist", "build", ".cache", ".npm"],
-        "files": ["package-lock.json", "yarn.lock", "npm-debug.log", "*.log"]
-    }
-}
 
 class ImprovedCleanerApp:
-    def __init__(self, root):
+    def __init__(self, root, size_workers=None, use_cache=True, delete_workers=None, fan_out_delete=False):
         self.root = root
         self.root.title("🧹 Project Cleaner Pro")
         self.root.geometry("1000x700")
@@ -40,12 +329,67 @@ class ImprovedCleanerApp:
         # Variables
         self.base_path = tk.StringVar()
         self.template = tk.StringVar(value="Next.js")
-        self.scan_results = []  # List of dictionaries with item info
+        self.group_results = tk.BooleanVar(value=False)
+        self.rescan_after_delete = tk.BooleanVar(value=False)
+        self.fast_delete = tk.BooleanVar(value=False)
+        self.use_index = tk.BooleanVar(value=False)
+        self.one_filesystem = tk.BooleanVar(value=False)
+        self.policy_min_mb = tk.StringVar()
+        self.policy_idle_days = tk.StringVar()
+        self.policy_keep = tk.StringVar()
+        self.policy_free_gb = tk.StringVar()
         self.is_scanning = False
+        self.scan_generation = 0  # Bumped per scan so late size results are dropped
+        self.pending_sizes = 0
+        self.size_workers = size_workers  # None: the engine's defaults
+        self.delete_workers = delete_workers
+        self.fan_out_delete = fan_out_delete
+        self.sizer = None  # FolderSizer, Deleter and Trash are created by ensure_engine
+        self.deleter = None
+        self.trash = None
+        self.last_trashed = []  # (item, StagedItem) pairs the Undo button can restore
+        self.trash_batch = 0
+        self.use_cache = use_cache
+        self.scan_cache = None  # ScanCache for the current scan
+        self.current_scan = None
+        self.scan_queue = None
+        self.scan_progress = 0
+        self.live_index = None  # LiveIndex for the last roots scanned with the option on
+        self.showing_index = None  # The LiveIndex the results came from, if any
+        self.pending_index = None  # LiveIndex to seed once the current scan is sized
+        self.metrics = None  # Metrics of the last scan and the deletes that followed it
+        self.trace_path = os.environ.get('CLEANER_TRACE')  # Also save timed subtrees as Chrome trace events
+        self.stats_window = None
+        self.registry = self.load_templates()  # Templates from the built-ins and config files
+        self.results_time = None  # When the listed results were scanned (time.time())
         
         # Configure styles
         self.setup_styles()
         self.build_ui()
+        self.root.protocol('WM_DELETE_WINDOW', self.on_close)
+        
+        self.restore_session()
+        self.root.after(WARM_UP_DELAY, self.warm_up)
+
+    def warm_up(self):
+        """Import the scan engine off the Tk thread, then create the workers"""
+        def load():
+            # Spelled out rather than left to cleaner.__getattr__ so PyInstaller bundles them
+            import cleaner.cache, cleaner.deletion, cleaner.duplicates, cleaner.policy
+            import cleaner.scanner, cleaner.sizing, cleaner.trash, cleaner.watch
+            self.root.after(0, self.ensure_engine)
+        
+        threading.Thread(target=load, daemon=True).start()
+
+    def ensure_engine(self):
+        """Create the sizing and delete workers and the trash; done by warm_up or the first scan"""
+        if self.sizer is not None:
+            return
+        self.sizer = cleaner.FolderSizer(self.size_workers or cleaner.DEFAULT_SIZE_WORKERS)
+        self.deleter = cleaner.Deleter(self.delete_workers or cleaner.DEFAULT_DELETE_WORKERS,
+                                       fan_out=self.fan_out_delete)
+        self.trash = cleaner.Trash()
+        self.trash.start()  # Also reaps anything an interrupted run left staged
 
     def setup_styles(self):
         style = ttk.Style()
@@ -59,6 +403,7 @@ class ImprovedCleanerApp:
         style.configure('Primary.TButton', font=('Segoe UI', 10, 'bold'))
         style.configure('Success.TButton', font=('Segoe UI', 10, 'bold'))
         style.configure('Danger.TButton', font=('Segoe UI', 10, 'bold'))
+        style.configure('Treeview', rowheight=ROW_HEIGHT)
 
     def build_ui(self):
         # Main container with padding
@@ -98,7 +443,8 @@ class ImprovedCleanerApp:
         path_frame = tk.Frame(config_card, bg='#f8f9fa')
         path_frame.pack(fill='x', pady=(0, 10))
         
-        ttk.Label(path_frame, text="Project Folder:", background='#f8f9fa').pack(anchor='w')
+        ttk.Label(path_frame, text=f"Project Folders (separate several with '{os.pathsep}'):",
+                  background='#f8f9fa').pack(anchor='w')
         
         path_input_frame = tk.Frame(path_frame, bg='#f8f9fa')
         path_input_frame.pack(fill='x', pady=(5, 0))
@@ -106,6 +452,9 @@ class ImprovedCleanerApp:
         self.path_entry = ttk.Entry(path_input_frame, textvariable=self.base_path, font=('Segoe UI', 10))
         self.path_entry.pack(side='left', fill='x', expand=True, padx=(0, 10))
         
+        add_btn = ttk.Button(path_input_frame, text="➕ Add", command=self.add_folder)
+        add_btn.pack(side='right', padx=(5, 0))
+        
         browse_btn = ttk.Button(path_input_frame, text="📂 Browse", command=self.browse_folder)
         browse_btn.pack(side='right')
         
@@ -116,9 +465,30 @@ class ImprovedCleanerApp:
         ttk.Label(template_frame, text="Project Type:", background='#f8f9fa').pack(anchor='w')
         
         self.template_combo = ttk.Combobox(template_frame, textvariable=self.template, 
-                                         values=list(TEMPLATES.keys()), state='readonly', 
+                                         values=list(self.registry) + [AUTO_DETECT], state='readonly', 
                                          font=('Segoe UI', 10))
         self.template_combo.pack(fill='x', pady=(5, 0))
+        
+        # Preselection policy
+        policy_frame = tk.Frame(config_card, bg='#f8f9fa')
+        policy_frame.pack(fill='x', pady=(10, 0))
+        
+        ttk.Label(policy_frame, text="Preselect (leave empty to ignore):", background='#f8f9fa').pack(anchor='w')
+        
+        policy_input_frame = tk.Frame(policy_frame, bg='#f8f9fa')
+        policy_input_frame.pack(fill='x', pady=(5, 0))
+        
+        for label, variable, width in (("Min size (MB)", self.policy_min_mb, 8),
+                                       ("Untouched for (days)", self.policy_idle_days, 6),
+                                       ("Keep (patterns, comma separated)", self.policy_keep, 24),
+                                       ("Free up (GB)", self.policy_free_gb, 6)):
+            ttk.Label(policy_input_frame, text=label, background='#f8f9fa').pack(side='left', padx=(0, 5))
+            ttk.Entry(policy_input_frame, textvariable=variable, width=width,
+                      font=('Segoe UI', 10)).pack(side='left', padx=(0, 10))
+        
+        self.apply_policy_btn = ttk.Button(policy_input_frame, text="🎯 Apply", command=self.apply_policy,
+                                           state='disabled')
+        self.apply_policy_btn.pack(side='right')
 
     def create_action_section(self, parent):
         action_frame = tk.Frame(parent, bg='#ffffff')
@@ -131,6 +501,12 @@ class ImprovedCleanerApp:
         self.scan_btn = ttk.Button(left_frame, text="🔍 Scan Project", command=self.start_scan, style='Primary.TButton')
         self.scan_btn.pack(side='left', padx=(0, 15))
         
+        stats_btn = ttk.Button(left_frame, text="📊 Stats", command=self.show_stats)
+        stats_btn.pack(side='left', padx=(0, 15))
+        
+        self.dedup_btn = ttk.Button(left_frame, text="♻ Duplicates", command=self.find_duplicates, state='disabled')
+        self.dedup_btn.pack(side='left', padx=(0, 15))
+        
         self.status_label = tk.Label(left_frame, text="Ready to scan", bg='#ffffff', fg='#7f8c8d', font=('Segoe UI', 9))
         self.status_label.pack(side='left', anchor='w')
         
@@ -147,6 +523,26 @@ class ImprovedCleanerApp:
         self.delete_btn = ttk.Button(right_frame, text="🗑️ Delete Selected", command=self.confirm_delete, 
                                    style='Danger.TButton', state='disabled')
         self.delete_btn.pack(side='left')
+        
+        self.undo_btn = ttk.Button(right_frame, text="↩️ Undo", command=self.undo_delete, state='disabled')
+        self.undo_btn.pack(side='left', padx=(5, 0))
+        
+        options_frame = tk.Frame(right_frame, bg='#ffffff')
+        options_frame.pack(side='left', padx=(10, 0))
+        
+        fast_check = ttk.Checkbutton(options_frame, text=f"Fast delete (undo for {cleaner.UNDO_GRACE_SECONDS}s)",
+                                     variable=self.fast_delete)
+        fast_check.pack(anchor='w')
+        
+        rescan_check = ttk.Checkbutton(options_frame, text="Rescan after delete", variable=self.rescan_after_delete)
+        rescan_check.pack(anchor='w')
+        
+        index_check = ttk.Checkbutton(options_frame, text="Live index (watch for changes)", variable=self.use_index,
+                                      command=self.toggle_live_index)
+        index_check.pack(anchor='w')
+        
+        filesystem_check = ttk.Checkbutton(options_frame, text="Stay on one filesystem", variable=self.one_filesystem)
+        filesystem_check.pack(anchor='w')
 
     def create_results_section(self, parent):
         # Results card
@@ -162,8 +558,12 @@ class ImprovedCleanerApp:
         self.info_label = tk.Label(results_header, text="", bg='#f8f9fa', fg='#7f8c8d', font=('Segoe UI', 9, 'bold'))
         self.info_label.pack(side='right')
         
+        group_check = ttk.Checkbutton(results_header, text="Group by project", variable=self.group_results,
+                                      command=lambda: self.results.set_grouped(self.group_results.get()))
+        group_check.pack(side='right', padx=(0, 15))
+        
         # Progress bar
-        self.progress = ttk.Progressbar(results_card, mode='indeterminate')
+        self.progress = ttk.Progressbar(results_card, mode='indeterminate', maximum=100)
         self.progress.pack(fill='x', pady=(0, 10))
         self.progress.pack_forget()  # Hide initially
         
@@ -172,24 +572,27 @@ class ImprovedCleanerApp:
         tree_frame.pack(fill='both', expand=True)
         
         # Create treeview with columns
-        columns = ('Selected', 'Size', 'Type', 'Path')
+        columns = ('Selected', 'Size', 'Type', 'Template', 'Path')
         self.tree = ttk.Treeview(tree_frame, columns=columns, show='headings', height=20)
         
         # Configure columns
         self.tree.heading('Selected', text='✓', anchor='center')
         self.tree.heading('Size', text='Size', anchor='center')
         self.tree.heading('Type', text='Type', anchor='center')
+        self.tree.heading('Template', text='Template', anchor='center')
         self.tree.heading('Path', text='Path', anchor='w')
         
         self.tree.column('Selected', width=50, minwidth=50, anchor='center')
         self.tree.column('Size', width=100, minwidth=80, anchor='center')
         self.tree.column('Type', width=80, minwidth=60, anchor='center')
+        self.tree.column('Template', width=80, minwidth=60, anchor='center')
         self.tree.column('Path', width=600, minwidth=300, anchor='w')
         
-        # Scrollbars
-        v_scrollbar = ttk.Scrollbar(tree_frame, orient='vertical', command=self.tree.yview)
+        # Scrollbars; the vertical one is driven by ResultsView, not the tree
+        v_scrollbar = ttk.Scrollbar(tree_frame, orient='vertical')
         h_scrollbar = ttk.Scrollbar(tree_frame, orient='horizontal', command=self.tree.xview)
-        self.tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+        self.tree.configure(xscrollcommand=h_scrollbar.set)
+        self.results = ResultsView(self.tree, v_scrollbar)
         
         # Pack treeview and scrollbars
         self.tree.pack(side='left', fill='both', expand=True)
@@ -205,168 +608,279 @@ class ImprovedCleanerApp:
         if path:
             self.base_path.set(path)
 
+    def add_folder(self):
+        """Append another root to scan in the same pass"""
+        path = filedialog.askdirectory(title="Add Project Folder")
+        if path:
+            roots = self.scan_roots()
+            if path not in roots:
+                self.base_path.set(os.pathsep.join(roots + [path]))
+
+    def scan_roots(self):
+        return [p.strip() for p in self.base_path.get().split(os.pathsep) if p.strip()]
+
     def start_scan(self):
         if self.is_scanning:
+            self.cancel_scan()
             return
             
-        base_path = self.base_path.get().strip()
-        if not base_path or not os.path.isdir(base_path):
+        roots = self.scan_roots()
+        if not roots:
             messagebox.showerror("Error", "Please select a valid project folder")
             return
+        for path in roots:
+            if not os.path.isdir(path):
+                messagebox.showerror("Error", f"Not a valid project folder:\n{path}")
+                return
+        
+        registry = self.load_templates(roots)
+        if registry is None:
+            return
+        self.registry = registry
+        self.template_combo.config(values=list(registry) + [AUTO_DETECT])
+        template = self.template.get()
+        if template != AUTO_DETECT and template not in registry:
+            messagebox.showerror("Error", f"Template {template!r} is not defined for these folders")
+            return
+        templates = AUTO if template == AUTO_DETECT else template
+        self.ensure_engine()
+        self.sizer.reset()  # Mounts may have come back, or gone, since the last scan
+        self.showing_index = self.pending_index = None
+        if self.use_index.get() and self.show_live_index(roots, templates):
+            return
         
         # Start scanning in a separate thread
         self.is_scanning = True
-        self.scan_btn.config(state='disabled', text="🔄 Scanning...")
+        self.scan_generation += 1
+        self.scan_btn.config(text="⏹ Cancel Scan")
+        self.scan_progress = 0
+        self.progress.config(mode='determinate', value=0)
         self.progress.pack(fill='x', pady=(0, 10))
-        self.progress.start(10)
+        self.status_label.config(text="Scanning directories...", fg='#3498db')
         
-        # Clear previous results
-        self.clear_results()
-        
-        # Start scan thread
-        scan_thread = threading.Thread(target=self.scan_project, daemon=True)
+        # Start scan thread; it feeds scan_queue and the Tk loop drains it
+        self.metrics = Metrics(trace=bool(self.trace_path))
+        self.metrics[SIZE].start()
+        self.results.stats = self.metrics[UI]
+        self.current_scan = cleaner.ProjectScan(roots, templates, metrics=self.metrics,
+                                                one_filesystem=self.one_filesystem.get(), registry=registry)
+        self.clear_results(self.current_scan.base_path)
+        if self.use_cache:
+            self.current_scan.cache = cleaner.ScanCache()
+            for root in self.current_scan.roots:
+                self.current_scan.cache.load(root)
+        self.scan_cache = self.current_scan.cache
+        self.scan_queue = queue.SimpleQueue()
+        scan_thread = threading.Thread(target=self.scan_project,
+                                       args=(self.current_scan, self.scan_queue, self.scan_generation), daemon=True)
         scan_thread.start()
+        self.root.after(SCAN_DRAIN_INTERVAL, self.drain_scan_queue, self.scan_generation)
 
-    def scan_project(self):
+    def load_templates(self, roots=()):
+        """Template registry for roots (user and project config included); None if a config file is broken"""
         try:
-            base_path = self.base_path.get()
-            template_config = TEMPLATES[self.template.get()]
-            folders_to_find = template_config["folders"]
-            files_to_find = template_config["files"]
-            
-            self.root.after(0, lambda: self.status_label.config(text="Scanning directories...", fg='#3498db'))
-            
-            found_items = []
-            
-            # Walk through directory tree
-            for root_dir, dirs, files in os.walk(base_path):
-                # Skip if we're inside a node_modules or similar large folder
-                rel_path = os.path.relpath(root_dir, base_path)
-                if any(skip_folder in rel_path.split(os.sep) for skip_folder in ['node_modules', '.git', '.venv']):
-                    if os.path.basename(root_dir) not in folders_to_find:
-                        continue
-                
-                # Check for folders to clean
-                for folder_name in dirs[:]:  # Use slice to avoid modification issues
-                    if folder_name in folders_to_find:
-                        folder_path = os.path.join(root_dir, folder_name)
-                        size = self.calculate_folder_size(folder_path)
-                        
-                        found_items.append({
-                            'path': folder_path,
-                            'relative_path': os.path.relpath(folder_path, base_path),
-                            'type': 'Folder',
-                            'size': size,
-                            'selected': True
-                        })
-                        
-                        # Don't recurse into found folders
-                        dirs.remove(folder_name)
-                
-                # Check for files to clean
-                for file_name in files:
-                    if self.should_clean_file(file_name, files_to_find):
-                        file_path = os.path.join(root_dir, file_name)
-                        try:
-                            size = os.path.getsize(file_path)
-                        except (OSError, FileNotFoundError):
-                            size = 0
-                        
-                        found_items.append({
-                            'path': file_path,
-                            'relative_path': os.path.relpath(file_path, base_path),
-                            'type': 'File',
-                            'size': size,
-                            'selected': True
-                        })
-            
-            # Update UI in main thread
-            self.root.after(0, lambda: self.scan_completed(found_items))
-            
-        except Exception as e:
-            self.root.after(0, lambda e=e: self.scan_error(str(e)))
-
-    def should_clean_file(self, filename, patterns):
-        """Check if file matches any of the cleanup patterns"""
-        for pattern in patterns:
-            if '*' in pattern:
-                # Handle wildcard patterns
-                if pattern.startswith('*'):
-                    if filename.endswith(pattern[1:]):
-                        return True
-                elif pattern.endswith('*'):
-                    if filename.startswith(pattern[:-1]):
-                        return True
-            else:
-                # Exact match
-                if filename == pattern:
-                    return True
-        return False
-
-    def calculate_folder_size(self, folder_path):
-        """Calculate total size of folder (optimized)"""
-        total_size = 0
-        try:
-            # Use os.scandir for better performance
-            with os.scandir(folder_path) as entries:
-                for entry in entries:
-                    if entry.is_file(follow_symlinks=False):
-                        try:
-                            total_size += entry.stat().st_size
-                        except (OSError, FileNotFoundError):
-                            pass
-                    elif entry.is_dir(follow_symlinks=False):
-                        total_size += self.calculate_folder_size(entry.path)
-        except (OSError, FileNotFoundError, PermissionError):
-            pass
-        return total_size
-
-    def scan_completed(self, found_items):
-        self.is_scanning = False
-        self.progress.stop()
-        self.progress.pack_forget()
-        self.scan_btn.config(state='normal', text="🔍 Scan Project")
+            return load_registry(roots)
+        except (ValueError, OSError) as e:
+            messagebox.showerror("Template config", str(e))
+            return None if roots else BUILTIN_REGISTRY
+
+    def show_live_index(self, roots, templates):
+        """Fill the results from the live index; False when the roots still need a first scan"""
+        index = self.live_index
+        if index is None or not index.covers(roots, templates):
+            if index is not None:
+                threading.Thread(target=index.stop, daemon=True).start()
+            index = self.live_index = cleaner.LiveIndex(roots, templates, registry=self.registry)
+            index.on_change = lambda *changes: self.root.after(0, self.index_changed, index, *changes)
+            index.load()
+        if index.updated is None and not index.running:
+            self.pending_index = index  # Seeded from this scan's results once it is done
+            return False
         
-        self.scan_results = found_items
-        self.populate_results()
+        self.scan_generation += 1
+        self.clear_results(index.base_path)
+        self.current_scan = None
+        self.scan_cache = index.cache
+        self.showing_index = index
+        for item in index.items():
+            self.results.add(item)
+        index.start()  # Checks the loaded items against the disk, then watches
         
-        if found_items:
-            total_size = sum(item['size'] for item in found_items)
-            self.status_label.config(text=f"Found {len(found_items)} items ({self.format_size(total_size)})", fg='#e67e22')
+        if len(self.results):
+            self.enable_controls()
+        self.update_info_label()
+        self.update_scan_status()
+        self.status_label.config(text=self.status_label.cget('text') + " - live index, watching for changes")
+        return True
+
+    def index_changed(self, index, added, removed, resized):
+        """Apply what the live index noticed on disk to the results"""
+        if index is not self.showing_index:
+            return
+        self.results.remove(removed)
+        listed = self.results.find([item['path'] for item in added + resized])
+        for item in added:
+            if item['path'] not in listed:
+                self.results.add(item)
+        for item in resized:
+            row = listed.get(item['path'])
+            if row is not None:
+                self.results.set_usage(row, item['usage'])
+        
+        if len(self.results):
             self.enable_controls()
         else:
+            self.disable_controls()
+        self.update_info_label()
+        self.update_scan_status()
+
+    def toggle_live_index(self):
+        """Stop watching when the option is turned off"""
+        if not self.use_index.get() and self.live_index is not None:
+            threading.Thread(target=self.live_index.stop, daemon=True).start()
+            self.live_index = self.showing_index = self.pending_index = None
+
+    def cancel_scan(self):
+        """Stop the running scan; items found so far are kept"""
+        if self.current_scan is not None:
+            self.current_scan.cancel()
+            self.scan_btn.config(state='disabled', text="⏹ Cancelling...")
+
+    def scan_project(self, scan, results, generation):
+        """Walk the project on a worker thread, pushing items to the results queue"""
+        try:
+            for item in scan:
+                results.put(item)
+                if item['size'] is None:
+                    self.queue_folder_size(generation, item, scan.cache, scan.metrics)
+            results.put(SCAN_DONE)
+        except Exception as e:
+            results.put(e)
+
+    def drain_scan_queue(self, generation):
+        """Move found items into the tree, at most SCAN_ROWS_PER_TICK per call"""
+        if generation != self.scan_generation:
+            return
+        
+        began = time.perf_counter()
+        drained = 0
+        for _ in range(SCAN_ROWS_PER_TICK):
+            try:
+                item = self.scan_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is SCAN_DONE:
+                self.scan_completed()
+                return
+            if isinstance(item, Exception):
+                self.scan_error(str(item))
+                return
+            self.add_result(item)
+            drained += 1
+        self.metrics[UI].add(entries=drained)
+        self.metrics[UI].subtree('scan queue drain', time.perf_counter() - began)
+        
+        # The estimate dips whenever the walk discovers more directories; never move backwards
+        self.scan_progress = max(self.scan_progress, self.current_scan.progress * 100)
+        self.progress.config(value=self.scan_progress)
+        self.update_info_label()
+        self.status_label.config(
+            text=f"Scanning directories... {self.current_scan.dirs_visited} visited, "
+                 f"{len(self.results)} items found", fg='#3498db')
+        self.root.after(SCAN_DRAIN_INTERVAL, self.drain_scan_queue, generation)
+
+    def add_result(self, item):
+        """Append one found item to the results view"""
+        if item['size'] is None:
+            self.pending_sizes += 1
+        # Only folders still being sized keep their dict, to find their row again
+        item['row'] = self.results.add(item)
+        if len(self.results) == 1:
+            self.enable_controls()
+
+    def queue_folder_size(self, generation, item, cache=None, metrics=None):
+        """Size a found folder on the worker pool and report back to the UI"""
+        self.sizer.submit(item['path'], lambda path, usage: self.root.after(
+            0, lambda: self.folder_sized(generation, item, usage)), cache, metrics[SIZE] if metrics is not None else None)
+
+    def folder_sized(self, generation, item, usage):
+        """Fill in a folder size as soon as its worker finishes"""
+        if generation != self.scan_generation:
+            return
+        if 'row' not in item:
+            item['size'], item['usage'] = usage.apparent, usage
+            return  # Still queued; add_result picks the size up
+        
+        self.pending_sizes -= 1
+        if not self.results.store.is_removed(item['row']):  # Deleted while it was being measured
+            self.results.set_usage(item['row'], usage)
+            self.update_info_label()
+        if not self.is_scanning:
+            self.update_scan_status()
+            if not self.pending_sizes:
+                self.sizing_finished()
+                self.save_scan_cache()
+
+    def sizing_finished(self):
+        """Close the scan's metrics once the walk and all sizing are done and write the report"""
+        if self.metrics is not None:
+            self.metrics[SIZE].finish()
+            self.save_metrics_report()
+        self.save_session()
+
+    def save_scan_cache(self):
+        """Persist the scan cache once the walk and all sizing are done"""
+        # A cancelled walk leaves directories unlisted, which the cache must not record
+        cancelled = self.current_scan is None or self.current_scan.cancelled
+        if self.scan_cache is not None and not cancelled:
+            threading.Thread(target=self.scan_cache.save, daemon=True).start()
+        
+        index, self.pending_index = self.pending_index, None
+        if index is not None and not cancelled:
+            index.seed(self.results.items())
+            self.showing_index = index
+            index.start()
+
+    def update_scan_status(self):
+        """Show result totals, or sizing progress while folders are still being measured"""
+        if not len(self.results):
             self.status_label.config(text="✅ No cleanup items found - project is clean!", fg='#27ae60')
+            return
+        
+        text = f"Found {len(self.results)} items ({format_size(self.results.total_size)})"
+        if self.current_scan is not None and self.current_scan.cancelled:
+            text = "Scan cancelled - " + text
+        if self.current_scan is not None and self.current_scan.traversal is not None:
+            skipped = len(self.current_scan.traversal.skipped) + len(self.sizer.skipped)
+            if skipped:
+                text += f" - {skipped} folders skipped (loops, other filesystems or unresponsive mounts)"
+        if self.pending_sizes:
+            text += f" - sizing {self.pending_sizes} folders..."
+        elif self.scan_cache is not None:
+            text += f" - cache hit rate {self.scan_cache.hit_rate:.0%}"
+        self.status_label.config(text=text, fg='#e67e22')
 
-    def scan_error(self, error_msg):
+    def finish_scan_ui(self):
         self.is_scanning = False
-        self.progress.stop()
         self.progress.pack_forget()
         self.scan_btn.config(state='normal', text="🔍 Scan Project")
-        self.status_label.config(text=f"❌ Scan failed: {error_msg}", fg='#e74c3c')
 
-    def populate_results(self):
-        # Clear existing items
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        # Add items to tree
-        for i, item in enumerate(self.scan_results):
-            icon = "📁" if item['type'] == 'Folder' else "📄"
-            selected_icon = "✅" if item['selected'] else "⬜"
-            
-            self.tree.insert('', 'end', iid=str(i), values=(
-                selected_icon,
-                self.format_size(item['size']),
-                item['type'],
-                f"{icon} {item['relative_path']}"
-            ))
-        
+    def scan_completed(self):
+        self.finish_scan_ui()
         self.update_info_label()
+        self.update_scan_status()
+        if not self.pending_sizes:
+            self.sizing_finished()
+            self.save_scan_cache()
+
+    def scan_error(self, error_msg):
+        self.finish_scan_ui()
+        self.status_label.config(text=f"❌ Scan failed: {error_msg}", fg='#e74c3c')
 
-    def clear_results(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        self.scan_results = []
+    def clear_results(self, base_path=None):
+        self.results.clear(base_path)
+        self.results_time = time.time()
+        self.pending_sizes = 0
         self.disable_controls()
         self.info_label.config(text="")
 
@@ -374,19 +888,27 @@ class ImprovedCleanerApp:
         self.select_all_btn.config(state='normal')
         self.unselect_all_btn.config(state='normal')
         self.delete_btn.config(state='normal')
+        self.apply_policy_btn.config(state='normal')
+        self.dedup_btn.config(state='normal')
 
     def disable_controls(self):
         self.select_all_btn.config(state='disabled')
         self.unselect_all_btn.config(state='disabled')
         self.delete_btn.config(state='disabled')
+        self.apply_policy_btn.config(state='disabled')
+        self.dedup_btn.config(state='disabled')
 
     def on_tree_click(self, event):
-        """Handle tree item click for selection toggle"""
+        """Handle tree item click for selection toggle or group expansion"""
         item_id = self.tree.identify('item', event.x, event.y)
         column = self.tree.identify('column', event.x, event.y)
         
-        if item_id and column == '#1':  # Clicked on Selected column
+        if not item_id:
+            return
+        if column == '#1':  # Clicked on Selected column
             self.toggle_selection(item_id)
+        elif isinstance(self.results.row_targets.get(item_id), ResultGroup):
+            self.results.toggle_group(self.results.row_targets[item_id])
 
     def on_tree_space(self, event):
         """Handle spacebar for selection toggle"""
@@ -395,58 +917,155 @@ class ImprovedCleanerApp:
             self.toggle_selection(selection[0])
 
     def toggle_selection(self, item_id):
-        """Toggle selection state of an item"""
-        try:
-            index = int(item_id)
-            if 0 <= index < len(self.scan_results):
-                self.scan_results[index]['selected'] = not self.scan_results[index]['selected']
-                
-                # Update tree display
-                selected_icon = "✅" if self.scan_results[index]['selected'] else "⬜"
-                current_values = list(self.tree.item(item_id, 'values'))
-                current_values[0] = selected_icon
-                self.tree.item(item_id, values=current_values)
-                
-                self.update_info_label()
-        except (ValueError, IndexError):
-            pass
+        """Toggle selection state of the item or group shown in a row"""
+        target = self.results.row_targets.get(item_id)
+        if target is None:
+            return
+        
+        if isinstance(target, ResultGroup):
+            self.results.select_group(target, target.selected_count < len(target.rows))
+        else:
+            self.results.toggle(target)
+        self.update_info_label()
 
     def select_all(self):
         """Select all items"""
-        for item in self.scan_results:
-            item['selected'] = True
-        self.populate_results()
+        self.results.select_all(True)
+        self.update_info_label()
 
     def unselect_all(self):
         """Unselect all items"""
-        for item in self.scan_results:
-            item['selected'] = False
-        self.populate_results()
+        self.results.select_all(False)
+        self.update_info_label()
+
+    def read_policy(self):
+        """(CleanupPolicy, bytes to free or None) from the preselect fields; raises ValueError"""
+        def number(variable):
+            text = variable.get().strip()
+            return float(text) if text else None
+        
+        min_mb = number(self.policy_min_mb)
+        free_gb = number(self.policy_free_gb)
+        keep = [pattern.strip() for pattern in self.policy_keep.get().split(',') if pattern.strip()]
+        policy = cleaner.CleanupPolicy(int((min_mb or 0) * 1024 ** 2), number(self.policy_idle_days), keep,
+                                       registry=self.registry)
+        return policy, None if free_gb is None else int(free_gb * 1024 ** 3)
+
+    def apply_policy(self):
+        """Reselect the sized results that pass the preselect rules, or the free-space plan"""
+        try:
+            policy, free = self.read_policy()
+        except ValueError:
+            messagebox.showerror("Invalid preselect", "Sizes and days must be numbers.")
+            return
+        
+        items = [item for item in self.results.items() if item['size'] is not None]
+        generation = self.scan_generation
+        self.apply_policy_btn.config(state='disabled')
+        self.status_label.config(text="Applying preselect rules...")
+        
+        def choose():
+            # Checking how long projects went untouched walks their sources; keep it off the Tk thread
+            accepted = [item for item in items if policy.accepts(item)]
+            if free is not None:
+                planner = cleaner.BudgetPlanner(free)
+                for item in accepted:
+                    planner.offer(item)
+                accepted = planner.chosen()
+            self.root.after(0, self.policy_applied, generation, [item['row'] for item in accepted])
+        
+        threading.Thread(target=choose, daemon=True).start()
+
+    def policy_applied(self, generation, rows):
+        if generation != self.scan_generation:
+            return  # A new scan replaced the results meanwhile
+        self.apply_policy_btn.config(state='normal')
+        self.results.select_only(rows)
+        self.status_label.config(text=f"Preselected {len(rows)} items")
+        self.update_info_label()
+
+    def find_duplicates(self):
+        """Report packages and files stored more than once across the found folders"""
+        folders = [item['path'] for item in self.results.items() if item['type'] == 'Folder']
+        if not folders:
+            messagebox.showinfo("Duplicates", "No folders found to compare.")
+            return
+        
+        generation = self.scan_generation
+        self.dedup_btn.config(state='disabled')
+        self.status_label.config(text=f"Looking for duplicates in {len(folders)} folders...", fg='#3498db')
+        
+        def find():
+            report = cleaner.DuplicateFinder().find(folders)
+            self.root.after(0, self.duplicates_found, generation, report)
+        
+        threading.Thread(target=find, daemon=True).start()
+
+    def duplicates_found(self, generation, report):
+        if generation != self.scan_generation:
+            return
+        self.dedup_btn.config(state='normal')
+        self.status_label.config(text="Duplicate check done", fg='#27ae60')
+        lines = [f"{len(report.packages)} package versions are installed more than once "
+                 f"({format_size(report.package_wasted)} in extra copies).",
+                 f"{len(report.groups)} sets of identical files hold "
+                 f"{format_size(report.wasted)} in extra copies."]
+        for package in report.packages[:5]:
+            lines.append(f"  {package.name}@{package.version}: {len(package.copies)} copies, "
+                         f"{format_size(package.wasted)}")
+        if not report.groups:
+            messagebox.showinfo("Duplicates", "\n".join(lines))
+            return
+        lines.append(f"\nReplace the identical files with hard links to one copy, freeing up to "
+                     f"{format_size(report.wasted)}? Linked files share later edits.")
+        if not messagebox.askyesno("Duplicates", "\n".join(lines)):
+            return
+        
+        self.status_label.config(text="Linking duplicate files...", fg='#3498db')
+        
+        def link():
+            result = cleaner.link_duplicates(report)
+            self.root.after(0, self.duplicates_linked, result)
+        
+        threading.Thread(target=link, daemon=True).start()
+
+    def duplicates_linked(self, result):
+        freed = format_size(result.bytes_freed)
+        self.status_label.config(text=f"Linked {len(result.linked)} files, freed {freed}", fg='#27ae60')
+        if result.errors or result.skipped:
+            messagebox.showwarning("Duplicates", f"{len(result.skipped)} files had changed or differ in permissions "
+                                                 f"and {len(result.errors)} could not be linked; those were left as "
+                                                 f"they are.")
 
     def update_info_label(self):
         """Update the info label with selection statistics"""
-        selected_items = [item for item in self.scan_results if item['selected']]
-        if selected_items:
-            total_size = sum(item['size'] for item in selected_items)
-            self.info_label.config(text=f"Selected: {len(selected_items)} items ({self.format_size(total_size)})")
+        if self.results.selected_count:
+            self.info_label.config(text=f"Selected: {self.results.selected_count} items "
+                                        f"({format_size(self.results.selected_size)})")
         else:
             self.info_label.config(text="No items selected")
 
     def confirm_delete(self):
         """Confirm and delete selected items"""
-        selected_items = [item for item in self.scan_results if item['selected']]
+        selected_items = self.results.selected_items()
         
         if not selected_items:
             messagebox.showinfo("Info", "No items selected for deletion.")
             return
         
-        total_size = sum(item['size'] for item in selected_items)
-        
+        if self.fast_delete.get():
+            warning = f"Items are moved to trash first; you can undo for {cleaner.UNDO_GRACE_SECONDS} seconds."
+        else:
+            warning = "⚠️ This action cannot be undone!"
+        # Hardlinked files (pnpm store, uv/pip caches) only free space once every link goes
+        usage = DiskUsage.combine(item['usage'] for item in selected_items if item.get('usage') is not None)
         result = messagebox.askyesno(
             "Confirm Deletion",
             f"Delete {len(selected_items)} items?\n\n"
-            f"Total size: {self.format_size(total_size)}\n\n"
-            f"⚠️ This action cannot be undone!",
+            f"Total size: {format_size(usage.apparent)}\n"
+            f"On disk: {format_size(usage.allocated)}\n"
+            f"Space freed: {format_size(usage.reclaimable)}\n\n"
+            f"{warning}",
             icon='warning'
         )
         
@@ -455,37 +1074,115 @@ class ImprovedCleanerApp:
 
     def delete_items(self, items_to_delete):
         """Delete the specified items"""
+        self.ensure_engine()
         self.delete_btn.config(state='disabled', text="🗑️ Deleting...")
+        self.progress.config(mode='determinate', value=0)
         self.progress.pack(fill='x', pady=(0, 10))
-        self.progress.start(10)
         
         # Start deletion in separate thread
-        delete_thread = threading.Thread(target=self.perform_deletion, args=(items_to_delete,), daemon=True)
+        target = self.perform_fast_deletion if self.fast_delete.get() else self.perform_deletion
+        delete_thread = threading.Thread(target=target, args=(items_to_delete, self.delete_metrics()), daemon=True)
         delete_thread.start()
 
-    def perform_deletion(self, items_to_delete):
-        """Perform the actual deletion"""
-        deleted_count = 0
-        errors = []
+    def perform_deletion(self, items_to_delete, metrics):
+        """Perform the actual deletion, collecting removed paths and errors"""
+        def on_item(item, error, report):
+            done, freed = report.done, report.bytes_freed
+            self.root.after(0, lambda: self.deletion_progress(done, report.total, freed))
+        
+        report = self.deleter.delete(items_to_delete, on_item, metrics)
+        errors = [f"{item['relative_path']}: {message}" for item, message in report.errors]
         
+        # Update UI in main thread
+        self.root.after(0, lambda: self.deletion_completed(report.removed, errors))
+
+    def perform_fast_deletion(self, items_to_delete, metrics):
+        """Rename items into trash, deleting directly only those that cannot be staged"""
+        trashed = []
+        unstaged = []
+        stats = metrics[DELETE]
+        stats.start()
         for item in items_to_delete:
             try:
-                if item['type'] == 'Folder':
-                    shutil.rmtree(item['path'])
-                else:
-                    os.remove(item['path'])
-                deleted_count += 1
-            except Exception as e:
-                errors.append(f"{item['relative_path']}: {str(e)}")
+                with stats.span(item['path']):
+                    trashed.append((item, self.trash.stage(item['path'], item['size'])))
+                stats.add(syscalls=1)  # One rename
+            except FileNotFoundError:
+                trashed.append((item, None))  # Already gone
+            except OSError:
+                unstaged.append(item)  # No trash dir on its volume
         
-        # Update UI in main thread
-        self.root.after(0, lambda: self.deletion_completed(deleted_count, errors))
+        report = self.deleter.delete(unstaged, metrics=metrics)
+        removed = [item['path'] for item, _staged in trashed] + report.removed
+        errors = [f"{item['relative_path']}: {message}" for item, message in report.errors]
+        trashed = [(item, staged) for item, staged in trashed if staged is not None]
+        
+        self.root.after(0, lambda: self.deletion_completed(removed, errors, trashed))
+
+    def undo_delete(self):
+        """Restore the last fast-deleted batch before the reaper gets to it"""
+        trashed, self.last_trashed = self.last_trashed, []
+        self.undo_btn.config(state='disabled')
+        
+        failed = 0
+        listed = self.results.find([item['path'] for item, _staged in trashed])
+        for item, staged in trashed:
+            try:
+                restored = self.trash.restore(staged)
+            except OSError:
+                restored = False
+            if restored and item['path'] not in listed:
+                self.results.add(item)
+            elif not restored:
+                failed += 1
+        
+        if len(self.results):
+            self.enable_controls()
+        self.update_info_label()
+        self.update_scan_status()
+        self.save_session()
+        if failed:
+            messagebox.showwarning("Undo", f"{failed} items could not be restored.")
+
+    def expire_undo(self, batch):
+        if batch == self.trash_batch:
+            self.last_trashed = []
+            self.undo_btn.config(state='disabled')
 
-    def deletion_completed(self, deleted_count, errors):
+    def deletion_progress(self, done, total, bytes_freed):
+        self.progress.config(value=done * 100 / total)
+        self.status_label.config(text=f"Deleting... {done}/{total} items, {format_size(bytes_freed)} freed",
+                                 fg='#3498db')
+
+    def remove_results(self, removed_paths):
+        """Drop deleted items from the results without rescanning"""
+        self.results.remove(removed_paths)
+        if self.showing_index is not None:
+            self.showing_index.forget(removed_paths)
+        
+        if self.scan_cache is not None:
+            cache = self.scan_cache
+            threading.Thread(target=lambda: (cache.forget(removed_paths), cache.save()), daemon=True).start()
+        
+        self.update_info_label()
+        self.update_scan_status()
+        if not len(self.results):
+            self.disable_controls()
+
+    def deletion_completed(self, removed, errors, trashed=()):
         """Handle deletion completion"""
-        self.progress.stop()
+        self.save_metrics_report()
         self.progress.pack_forget()
         self.delete_btn.config(state='normal', text="🗑️ Delete Selected")
+        self.remove_results(removed)
+        self.save_session()
+        deleted_count = len(removed)
+        
+        if trashed:
+            self.trash_batch += 1
+            self.last_trashed = list(trashed)
+            self.undo_btn.config(state='normal')
+            self.root.after(cleaner.UNDO_GRACE_SECONDS * 1000, self.expire_undo, self.trash_batch)
         
         if errors:
             error_msg = f"Deleted {deleted_count} items.\n\nErrors ({len(errors)}):\n"
@@ -496,21 +1193,172 @@ class ImprovedCleanerApp:
         else:
             messagebox.showinfo("Success", f"Successfully deleted {deleted_count} items!")
         
-        # Refresh scan
-        self.start_scan()
+        # Failed items stay listed; a full rescan is opt-in
+        if self.rescan_after_delete.get():
+            self.start_scan()
+
+    def session_path(self):
+        return os.path.join(default_cache_dir(), SESSION_FILE)
+
+    def save_session(self):
+        """Snapshot the results for the next start; not while a scan or its sizing is still running"""
+        if self.is_scanning or self.pending_sizes or self.results_time is None:
+            return
+        meta = {'base_path': self.base_path.get(), 'template': self.template.get(), 'scanned': self.results_time}
+        try:
+            os.makedirs(default_cache_dir(), exist_ok=True)
+            self.results.store.save(self.session_path(), meta)
+        except OSError:
+            pass  # The next start is just empty
+
+    def restore_session(self):
+        """Show the last results straight away; a background check then drops or greys out what changed"""
+        try:
+            store, meta = ResultStore.load(self.session_path())
+        except (OSError, ValueError):
+            return  # No snapshot yet, or one from another version
+        self.base_path.set(meta.get('base_path', ''))
+        template = meta.get('template')
+        if template in self.registry or template == AUTO_DETECT:
+            self.template.set(template)
+        self.results.clear(store=store)
+        self.results_time = meta.get('scanned')
+        self.update_info_label()
+        when = time.strftime('%Y-%m-%d %H:%M', time.localtime(self.results_time or 0))
+        self.status_label.config(text=f"Results of the scan on {when} - checking {len(store)} items...",
+                                 fg='#3498db')
+        threading.Thread(target=self.revalidate_session, args=(self.scan_generation, self.results_time),
+                         daemon=True).start()
+
+    def revalidate_session(self, generation, scanned):
+        """lstat every restored item off the Tk thread
+        
+        Works on its own copy of the snapshot, since a scan started
+        meanwhile closes the store on screen. Row numbers match.
+        """
+        missing = []
+        stale = []
+        try:
+            store, _meta = ResultStore.load(self.session_path())
+        except (OSError, ValueError):
+            store = None  # Replaced by a save meanwhile; the generation check drops this
+        if store is not None:
+            for row in store.rows():
+                path = store.path(row)
+                try:
+                    st = os.lstat(path)
+                except FileNotFoundError:
+                    missing.append(path)
+                    continue
+                except OSError:
+                    continue
+                if scanned is None or st.st_mtime > scanned:
+                    stale.append(row)
+            store.close()
+        self.root.after(0, self.session_checked, generation, missing, stale)
+
+    def session_checked(self, generation, missing, stale):
+        """Apply the check unless a scan has replaced the restored results"""
+        if generation != self.scan_generation:
+            return
+        self.results.remove(missing)
+        self.results.mark_stale(stale)
+        self.update_info_label()
+        if not len(self.results):
+            self.status_label.config(text="Ready to scan", fg='#7f8c8d')
+            return
+        text = f"Last results: {len(self.results)} items ({format_size(self.results.total_size)})"
+        if missing:
+            text += f" - {len(missing)} gone since"
+        if stale:
+            text += f" - {len(stale)} changed since (greyed out), rescan to update"
+        self.status_label.config(text=text, fg='#e67e22')
+        self.enable_controls()
+
+    def on_close(self):
+        self.save_session()
+        self.root.destroy()
+
+    def delete_metrics(self):
+        """The Metrics deletes are counted in; results from the live index have none yet"""
+        if self.metrics is None:
+            self.metrics = Metrics(trace=bool(self.trace_path))
+        return self.metrics
+
+    def save_metrics_report(self, path=None):
+        """Write the metrics as JSON, by default to the cache folder; off the Tk thread"""
+        metrics = self.metrics
+        if metrics is None:
+            return
+        
+        def save():
+            try:
+                os.makedirs(default_cache_dir(), exist_ok=True)
+                metrics.save(path or os.path.join(default_cache_dir(), METRICS_REPORT))
+                if self.trace_path:
+                    metrics.save_trace(self.trace_path)
+            except OSError:
+                pass  # Diagnostics only
+        
+        threading.Thread(target=save, daemon=True).start()
 
-    def format_size(self, size_bytes):
-        """Format bytes to human readable string"""
-        if size_bytes == 0:
-            return "0 B"
+    def show_stats(self):
+        """Open the stats panel, or raise it when already open"""
+        if self.stats_window is not None and self.stats_window.winfo_exists():
+            self.stats_window.lift()
+            return
+        window = self.stats_window = tk.Toplevel(self.root)
+        window.title("📊 Scan Stats")
+        window.geometry("800x420")
+        window.configure(bg='#ffffff')
+        
+        columns = ('phase', 'dirs', 'entries', 'syscalls', 'bytes', 'errors', 'wall', 'busy')
+        table = ttk.Treeview(window, columns=columns, show='headings', height=5)
+        for column in columns:
+            table.heading(column, text=column.title())
+            table.column(column, width=90, anchor='w' if column == 'phase' else 'e')
+        table.pack(fill='x', padx=10, pady=(10, 5))
         
-        for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-            if size_bytes < 1024.0:
-                return f"{size_bytes:.1f} {unit}"
-            size_bytes /= 1024.0
-        return f"{size_bytes:.1f} PB"
+        ttk.Label(window, text="Slowest subtrees and UI ticks:", background='#ffffff').pack(anchor='w', padx=10)
+        slowest = tk.Listbox(window, font=('Consolas', 9))
+        slowest.pack(fill='both', expand=True, padx=10)
+        
+        save_btn = ttk.Button(window, text="💾 Save report...", command=self.ask_save_metrics_report)
+        save_btn.pack(anchor='e', padx=10, pady=10)
+        self.refresh_stats(table, slowest)
+
+    def refresh_stats(self, table, slowest):
+        """Redraw the stats panel from the live counters while it stays open"""
+        if not table.winfo_exists():
+            return
+        table.delete(*table.get_children())
+        slowest.delete(0, 'end')
+        for phase in self.metrics or ():
+            table.insert('', 'end', values=(phase.name, phase.dirs, phase.entries, phase.syscalls,
+                                            format_size(phase.bytes), phase.errors,
+                                            f"{phase.wall:.2f}s", f"{phase.busy:.2f}s"))
+            for seconds, path in phase.slowest():
+                slowest.insert('end', f"{phase.name:7} {seconds:8.3f}s  {path}")
+        self.root.after(STATS_REFRESH_INTERVAL, self.refresh_stats, table, slowest)
+
+    def ask_save_metrics_report(self):
+        if self.metrics is None:
+            messagebox.showinfo("Stats", "Nothing measured yet - run a scan first.")
+            return
+        path = filedialog.asksaveasfilename(title="Save metrics report", defaultextension='.json',
+                                            filetypes=[("JSON", "*.json")], initialfile=METRICS_REPORT)
+        if path:
+            self.save_metrics_report(path)
 
 if __name__ == "__main__":
+    if getattr(sys, 'frozen', False):
+        import multiprocessing
+        multiprocessing.freeze_support()  # The duplicate finder hashes in worker processes
     root = tk.Tk()
     app = ImprovedCleanerApp(root)
-    root.mainloop()
\ No newline at end of file
+    profile_path = os.environ.get('CLEANER_PROFILE')  # cProfile dump of the Tk thread, written on exit
+    if profile_path:
+        with profiled(profile_path):
+            root.mainloop()
+    else:
+        root.mainloop()
\ No newline at end of file
@@ -0,0 +1,86 @@
+import os
+
+from cleaner import ScanCache
+
+
+def cache_at(tmp_path, **options):
+    return ScanCache(path=str(tmp_path / 'cache' / 'scan.sqlite3'), **options)
+
+
+def bump_mtime(path):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+
+
+def test_listing_reused_while_mtime_unchanged(tmp_path):
+    (tmp_path / 'app' / 'src').mkdir(parents=True)
+    (tmp_path / 'app' / 'package.json').write_text('{}')
+    app = str(tmp_path / 'app')
+    cache = cache_at(tmp_path)
+    assert cache.listdir(app) == (('src',), ('package.json',))
+    cache.save()
+
+    again = cache_at(tmp_path).load(str(tmp_path))
+    assert again.listdir(app) == (('src',), ('package.json',))
+    assert (again.hits, again.misses) == (1, 0)
+
+    (tmp_path / 'app' / 'README.md').write_text('')  # Bumps the directory mtime
+    assert sorted(again.listdir(app)[1]) == ['README.md', 'package.json']
+    assert (again.hits, again.misses) == (1, 1)
+
+
+def test_sizes_reread_when_mtime_changes(tmp_path):
+    folder = tmp_path / 'node_modules'
+    folder.mkdir()
+    (folder / 'a.js').write_bytes(b'x' * 100)
+    cache = cache_at(tmp_path)
+    assert cache.size_dir(str(folder))[1] == 100
+    cache.save()
+
+    again = cache_at(tmp_path).load(str(tmp_path))
+    (folder / 'a.js').write_bytes(b'x' * 300)  # Rewritten in place: the cached size stays
+    assert again.size_dir(str(folder))[1] == 100
+    bump_mtime(folder)
+    assert again.size_dir(str(folder))[1] == 300
+    assert (again.hits, again.misses) == (1, 1)
+
+
+def test_forget_drops_subtrees_not_siblings(tmp_path):
+    for folder in ('app/node_modules/pkg', 'app/node_modules-old', 'lib'):
+        (tmp_path / folder).mkdir(parents=True)
+    cache = cache_at(tmp_path)
+    paths = [str(tmp_path / folder) for folder in
+             ('app', 'app/node_modules', 'app/node_modules/pkg', 'app/node_modules-old', 'lib')]
+    for path in paths:
+        cache.listdir(path)
+    cache.save()
+    cache.forget([str(tmp_path / 'app' / 'node_modules') + os.sep])
+    cache.save()
+
+    again = cache_at(tmp_path).load(str(tmp_path))
+    assert sorted(again._walk) == [paths[0], paths[3], paths[4]]
+
+
+def test_load_reads_only_the_root_subtree(tmp_path):
+    for folder in ('ws/app', 'ws-old/app'):
+        (tmp_path / folder).mkdir(parents=True)
+    cache = cache_at(tmp_path)
+    for folder in ('ws', 'ws/app', 'ws-old', 'ws-old/app'):
+        cache.listdir(str(tmp_path / folder))
+    cache.save()
+    assert sorted(cache_at(tmp_path).load(str(tmp_path / 'ws'))._walk) == \
+        [str(tmp_path / 'ws'), str(tmp_path / 'ws' / 'app')]
+
+
+def test_save_evicts_least_recently_seen_to_fit(tmp_path):
+    names = [f'd{i:04}' for i in range(2000)]
+    for name in names:
+        (tmp_path / 'tree' / name).mkdir(parents=True)
+    cache = cache_at(tmp_path, max_bytes=64 * 1024)
+    for name in names:
+        cache.listdir(str(tmp_path / 'tree' / name))
+    cache.save()
+    assert os.path.getsize(cache.path) <= 64 * 1024 + 32 * 1024  # Freed pages are vacuumed away
+
+    kept = cache_at(tmp_path).load(str(tmp_path))._walk
+    assert 0 < len(kept) < len(names)
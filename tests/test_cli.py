@@ -0,0 +1,41 @@
+import json
+import os
+
+from cleaner import ScanCache
+from cleaner.cli import main
+
+
+def make_project(root, name, size):
+    project = os.path.join(root, name)
+    os.makedirs(os.path.join(project, 'node_modules'))
+    with open(os.path.join(project, 'package.json'), 'w') as fh:
+        fh.write('{}')
+    with open(os.path.join(project, 'node_modules', 'blob'), 'wb') as fh:
+        fh.write(os.urandom(size))
+
+
+def events(capsys):
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def test_free_plans_over_the_whole_tree(tmp_path, capsys):
+    # The walk reaches the small projects first; the plan must still be the one big folder
+    for i in range(1, 7):
+        make_project(str(tmp_path), f'p{i}', 100 * 1024)
+    make_project(str(tmp_path), 'zbig', 2 * 1024 * 1024)
+    assert main(['size', str(tmp_path), '-t', 'auto', '--free', '150KB', '--no-cache']) == 0
+    found = events(capsys)
+    items = [event['relative_path'] for event in found if event['event'] == 'item']
+    assert items == [os.path.join('zbig', 'node_modules')]
+    assert found[-1]['reclaimable'] >= 150 * 1024
+
+
+def test_scan_updates_the_cache(tmp_path, capsys, monkeypatch):
+    monkeypatch.setattr('cleaner.cache.default_cache_dir', lambda: str(tmp_path / 'cache'))
+    make_project(str(tmp_path / 'ws'), 'app', 10)
+    assert main(['scan', str(tmp_path / 'ws'), '-t', 'auto']) == 0
+    assert [event['event'] for event in events(capsys)].count('item') == 1
+
+    cache = ScanCache()
+    cache.load(str(tmp_path / 'ws'))
+    assert os.path.join(str(tmp_path / 'ws'), 'app') in cache._walk
@@ -0,0 +1,100 @@
+import os
+import stat
+
+import pytest
+
+from cleaner import Deleter, folder_usage, make_item, remove_tree
+from cleaner.deletion import HAVE_FD_REMOVAL, _rmtree_fd
+from cleaner.metrics import DELETE, Metrics
+
+
+def write(path, size):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as fh:
+        fh.write(os.urandom(size))
+
+
+def sized(path, base_path):
+    usage = folder_usage(path)
+    return make_item(path, base_path, 'Folder', usage.apparent, usage=usage)
+
+
+def tree(root, depth=3, width=3):
+    for i in range(width):
+        write(os.path.join(root, f'f{i}.js'), 10)
+        if depth:
+            tree(os.path.join(root, f'd{i}'), depth - 1, width)
+
+
+@pytest.mark.skipif(not HAVE_FD_REMOVAL, reason='needs openat/unlinkat')
+def test_rmtree_fd_removes_nested_tree(tmp_path):
+    root = str(tmp_path / 'node_modules')
+    tree(root)
+    _rmtree_fd(root)
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.mark.skipif(not HAVE_FD_REMOVAL, reason='needs openat/unlinkat')
+def test_rmtree_fd_does_not_follow_symlinks(tmp_path):
+    write(str(tmp_path / 'keep' / 'precious.txt'), 10)
+    write(str(tmp_path / 'node_modules' / 'a.js'), 10)
+    os.symlink(tmp_path / 'keep', tmp_path / 'node_modules' / 'linked')
+    _rmtree_fd(str(tmp_path / 'node_modules'))
+    assert sorted(os.listdir(tmp_path)) == ['keep']
+    assert os.listdir(tmp_path / 'keep') == ['precious.txt']
+
+
+def test_remove_tree_unlinks_symlinked_folder(tmp_path):
+    write(str(tmp_path / 'store' / 'a.js'), 10)
+    os.symlink(tmp_path / 'store', tmp_path / 'node_modules', target_is_directory=True)
+    remove_tree(str(tmp_path / 'node_modules'))
+    assert os.listdir(tmp_path / 'store') == ['a.js']
+    assert not os.path.lexists(tmp_path / 'node_modules')
+
+
+def test_remove_tree_deletes_read_only_files(tmp_path):
+    path = tmp_path / 'build' / 'out.bin'
+    write(str(path), 10)
+    os.chmod(path, stat.S_IREAD)
+    remove_tree(str(tmp_path / 'build'))
+    assert not os.path.exists(tmp_path / 'build')
+
+
+def test_deleter_reports_every_item(tmp_path):
+    for name in ('a', 'b'):
+        write(str(tmp_path / name / 'dist' / 'x.js'), 1000)
+    items = [sized(str(tmp_path / name / 'dist'), str(tmp_path)) for name in ('a', 'b')]
+    items.append(make_item(str(tmp_path / 'gone'), str(tmp_path), 'Folder', 0))
+    seen = []
+    report = Deleter(workers=2, fan_out=True).delete(items, lambda item, error, r: seen.append(item['path']))
+    assert sorted(seen) == sorted(item['path'] for item in items)
+    assert report.done == report.total == 3
+    assert len(report.removed) == 3 and not report.errors  # Already gone counts as removed
+    assert report.bytes_freed == sum(item['usage'].reclaimable for item in items[:2])
+
+
+def test_deleter_counts_reclaimable_bytes(tmp_path):
+    # b only holds a link into a store that stays: removing it frees nothing
+    write(str(tmp_path / 'a' / 'node_modules' / 'x'), 100000)
+    write(str(tmp_path / 'store' / 'y'), 100000)
+    os.makedirs(tmp_path / 'b' / 'node_modules')
+    os.link(tmp_path / 'store' / 'y', tmp_path / 'b' / 'node_modules' / 'y')
+    items = [sized(str(tmp_path / name / 'node_modules'), str(tmp_path)) for name in ('a', 'b')]
+    metrics = Metrics()
+    report = Deleter(workers=1).delete(items, metrics=metrics)
+    assert len(report.removed) == 2
+    assert report.bytes_freed == items[0]['usage'].reclaimable
+    assert metrics[DELETE].bytes == report.bytes_freed
+
+
+def test_deleter_counts_links_shared_by_removed_items(tmp_path):
+    # Both links go, so the file is freed once, though neither item frees it alone
+    write(str(tmp_path / 'a' / 'node_modules' / 'y'), 100000)
+    os.makedirs(tmp_path / 'b' / 'node_modules')
+    os.link(tmp_path / 'a' / 'node_modules' / 'y', tmp_path / 'b' / 'node_modules' / 'y')
+    items = [sized(str(tmp_path / name / 'node_modules'), str(tmp_path)) for name in ('a', 'b')]
+    assert sum(item['usage'].reclaimable for item in items) == 0
+    metrics = Metrics()
+    report = Deleter(workers=2).delete(items, metrics=metrics)
+    assert report.bytes_freed == items[0]['usage'].allocated > 0
+    assert metrics[DELETE].bytes == report.bytes_freed
@@ -0,0 +1,147 @@
+import json
+import os
+
+import pytest
+
+from cleaner import DuplicateFinder, link_duplicates
+from cleaner.duplicates import PARTIAL_BYTES
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as fh:
+        fh.write(data)
+    return path
+
+
+def node_package(root, name='left-pad', version='1.3.0', data=b'x' * 1000):
+    folder = os.path.join(root, 'node_modules', name)
+    write(os.path.join(folder, 'package.json'), json.dumps({'name': name, 'version': version}).encode())
+    write(os.path.join(folder, 'index.js'), data)
+    return folder
+
+
+def find(tmp_path, *names, **options):
+    return DuplicateFinder(workers=1, **options).find([str(tmp_path / name / 'node_modules') for name in names])
+
+
+def test_hashing_in_stages(tmp_path):
+    head = os.urandom(PARTIAL_BYTES)
+    same = head + b'tail' * 1000
+    write(str(tmp_path / 'a' / 'node_modules' / 'big.bin'), same)
+    write(str(tmp_path / 'b' / 'node_modules' / 'big.bin'), same)
+    write(str(tmp_path / 'c' / 'node_modules' / 'big.bin'), head + b'TAIL' * 1000)  # Same size and head
+    write(str(tmp_path / 'a' / 'node_modules' / 'small.txt'), b'small')
+    write(str(tmp_path / 'b' / 'node_modules' / 'small.txt'), b'small')
+    write(str(tmp_path / 'c' / 'node_modules' / 'other.txt'), b'other')  # Same size, other content
+    report = find(tmp_path, 'a', 'b', 'c')
+    groups = {os.path.basename(group.paths[0]): group for group in report.groups}
+    assert sorted(groups) == ['big.bin', 'small.txt']
+    assert groups['big.bin'].paths == [str(tmp_path / name / 'node_modules' / 'big.bin') for name in 'ab']
+    assert report.wasted == len(same) + len(b'small')
+
+    assert [os.path.basename(group.paths[0]) for group in find(tmp_path, 'a', 'b', 'c', min_size=10).groups] \
+        == ['big.bin']
+
+
+def test_hard_links_are_one_copy(tmp_path):
+    path = write(str(tmp_path / 'a' / 'node_modules' / 'f.bin'), b'z' * 5000)
+    os.makedirs(tmp_path / 'b' / 'node_modules')
+    os.link(path, tmp_path / 'b' / 'node_modules' / 'f.bin')
+    report = find(tmp_path, 'a', 'b')
+    assert report.files == 1 and not report.groups
+
+
+def test_package_copies_waste(tmp_path):
+    for name in ('a', 'b', 'c'):
+        node_package(str(tmp_path / name))
+    report = find(tmp_path, 'a', 'b', 'c')
+    [package] = report.packages
+    assert (package.name, len(package.copies)) == ('left-pad', 3)
+    assert package.wasted == 2 * sum(size for _path, size in package.copies) // 3
+
+
+def test_linked_package_copies_waste_nothing(tmp_path):
+    # pnpm: every project links the files of one store copy
+    store = node_package(str(tmp_path / 'store'))
+    for name in ('a', 'b'):
+        folder = tmp_path / name / 'node_modules' / 'left-pad'
+        folder.mkdir(parents=True)
+        for entry in os.listdir(store):
+            os.link(os.path.join(store, entry), folder / entry)
+    report = find(tmp_path, 'a', 'b')
+    assert report.package_wasted == 0 and not report.packages
+
+
+def test_linking_frees_package_waste(tmp_path):
+    for name in ('a', 'b'):
+        node_package(str(tmp_path / name))
+    report = find(tmp_path, 'a', 'b')
+    assert report.package_wasted > 0
+    result = link_duplicates(report)
+    assert len(result.linked) == 2 and result.bytes_freed == report.wasted
+    assert find(tmp_path, 'a', 'b').package_wasted == 0
+
+
+def copies(tmp_path, count=3, data=b'd' * 4096):
+    paths = [write(str(tmp_path / f'p{i}' / 'node_modules' / 'f.bin'), data) for i in range(count)]
+    return paths, find(tmp_path, *(f'p{i}' for i in range(count)))
+
+
+def test_link_swaps_each_copy_in_one_rename(tmp_path):
+    paths, report = copies(tmp_path)
+    result = link_duplicates(report)
+    assert result.linked == paths[1:] and not result.skipped and not result.errors
+    assert len({os.stat(path).st_ino for path in paths}) == 1
+    assert all(os.listdir(os.path.dirname(path)) == ['f.bin'] for path in paths)  # No temp links left
+
+
+def test_link_dry_run_changes_nothing(tmp_path):
+    paths, report = copies(tmp_path)
+    result = link_duplicates(report, dry_run=True)
+    assert result.linked == paths[1:]
+    assert len({os.stat(path).st_ino for path in paths}) == 3
+
+
+def test_link_skips_files_changed_since_hashing(tmp_path):
+    paths, report = copies(tmp_path)
+    write(paths[1], b'e' * 4096)  # Same size, new content
+    result = link_duplicates(report)
+    assert result.skipped == [(paths[1], 'changed')] and result.linked == [paths[2]]
+    with open(paths[1], 'rb') as fh:
+        assert fh.read() == b'e' * 4096
+
+
+def test_link_skips_files_with_other_permissions(tmp_path):
+    paths, report = copies(tmp_path)
+    os.chmod(paths[2], 0o600)
+    os.chmod(paths[0], 0o644)
+    os.chmod(paths[1], 0o644)
+    result = link_duplicates(report)
+    assert result.skipped == [(paths[2], 'different permissions')] and result.linked == [paths[1]]
+
+
+def test_failed_link_leaves_copy_in_place(tmp_path, monkeypatch):
+    paths, report = copies(tmp_path, count=2)
+
+    def refuse(src, dst):
+        open(dst, 'wb').close()  # As if the link was made, then the rename fails
+        raise OSError('no links here')
+
+    monkeypatch.setattr(os, 'link', refuse)
+    result = link_duplicates(report)
+    assert [path for path, _message in result.errors] == [paths[1]] and not result.linked
+    assert os.listdir(os.path.dirname(paths[1])) == ['f.bin']
+    with open(paths[1], 'rb') as fh:
+        assert fh.read() == b'd' * 4096
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_full_hashes_on_either_pool(tmp_path, monkeypatch, workers):
+    monkeypatch.setattr('cleaner.duplicates.PROCESS_POOL_MIN_BYTES', 0)
+    monkeypatch.setattr('cleaner.duplicates.HASH_BATCH_BYTES', 1)
+    data = os.urandom(PARTIAL_BYTES * 2)
+    for name in 'ab':
+        write(str(tmp_path / name / 'node_modules' / 'f.bin'), data)
+    report = DuplicateFinder(workers=workers).find([str(tmp_path / name / 'node_modules') for name in 'ab'])
+    assert [len(group.paths) for group in report.groups] == [2]
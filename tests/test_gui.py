@@ -0,0 +1,86 @@
+"""The Tk-free parts of main.py, driven with a stand-in Treeview"""
+
+import types
+
+import main
+from cleaner import DiskUsage, make_item
+
+
+class FakeTree:
+    def __init__(self):
+        self.rows = {}
+        self.idle = []
+
+    def tag_configure(self, *args, **kwargs):
+        pass
+
+    def bind(self, *args):
+        pass
+
+    def after_idle(self, callback):
+        self.idle.append(callback)
+
+    def exists(self, iid):
+        return iid in self.rows
+
+    def item(self, iid, **kwargs):
+        self.rows[iid] = kwargs
+
+    def insert(self, parent, index, iid, **kwargs):
+        self.rows[iid] = kwargs
+
+    def delete(self, iid):
+        del self.rows[iid]
+
+    def bbox(self, iid):
+        return None
+
+
+class FakeScrollbar:
+    def configure(self, **kwargs):
+        pass
+
+    def set(self, *args):
+        pass
+
+
+def results_view():
+    return main.ResultsView(FakeTree(), FakeScrollbar())
+
+
+def test_late_size_for_deleted_row_finishes_sizing():
+    view = results_view()
+    item = make_item('/work/app/node_modules', '/work', 'Folder', None)
+    item['row'] = view.add(item)
+    view.remove([item['path']])
+    calls = []
+    app = types.SimpleNamespace(
+        scan_generation=1, pending_sizes=1, is_scanning=False, results=view,
+        update_info_label=lambda: calls.append('info'), update_scan_status=lambda: calls.append('status'),
+        sizing_finished=lambda: calls.append('finished'), save_scan_cache=lambda: calls.append('cache'))
+    main.ImprovedCleanerApp.folder_sized(app, 1, item, DiskUsage(10, 10))
+    assert app.pending_sizes == 0
+    assert calls == ['status', 'finished', 'cache']
+    assert len(view) == 0 and view.total_size == 0
+
+
+def test_cancelled_scan_does_not_save_cache():
+    saved, seeded = [], []
+    index = types.SimpleNamespace(seed=seeded.append, start=lambda: None)
+    app = types.SimpleNamespace(
+        scan_cache=types.SimpleNamespace(save=lambda: saved.append(True)), pending_index=index,
+        current_scan=types.SimpleNamespace(cancelled=True), results=results_view())
+    main.ImprovedCleanerApp.save_scan_cache(app)
+    assert not saved and not seeded
+    assert app.pending_index is None
+
+
+def test_groups_are_projects():
+    view = results_view()
+    view.clear('/work')
+    for project in ('app', 'lib'):
+        for folder in ('a', 'b', 'c/d'):
+            view.add(make_item(f'/work/{project}/{folder}/x.pyc', '/work', 'File', 10, project=f'/work/{project}'))
+    view.add(make_item('/work/loose/y.pyc', '/work', 'File', 5))  # No project known: its folder
+    assert [(group.name, len(group.rows), group.size) for group in view.group_list] == \
+        [('app', 3, 30), ('lib', 3, 30), ('loose', 1, 5)]
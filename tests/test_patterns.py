@@ -0,0 +1,83 @@
+import fnmatch
+import re
+
+import pytest
+
+from cleaner import PatternMatcher, TEMPLATES, glob_to_regex
+
+NAMES = ['node_modules', 'app.pyc', 'app.pyo', 'app.py', 'npm-debug.log', 'npm-debug.log.1', 'debug.log',
+         'yarn.lock', 'yarn.lock.bak', 'a.min.js', 'amin.js', 'cache', '.cache', 'x.log', 'keep.log',
+         'build', 'build2', 'rebuild', 'Thumbs.db', 'thumbs.db', 'notes.txt', '*.log', '']
+
+
+def fnmatch_loop(name, patterns):
+    """Per-pattern reference: the last matching pattern wins, as in .gitignore"""
+    matched = False
+    for pattern in patterns:
+        negated = pattern.startswith('!')
+        if fnmatch.fnmatchcase(name, pattern[1:] if negated else pattern):
+            matched = not negated
+    return matched
+
+
+@pytest.mark.parametrize('patterns', [
+    ['node_modules', 'yarn.lock'],  # Set lookups
+    ['*.pyc', '*.log'],  # Suffix tuple
+    ['npm-debug.log*', 'build*'],  # Prefix tuple
+    ['*.py[co]', '*.min.*', 'bui?d', '[Tt]humbs.db', '*.[!p]y*'],  # Regex
+    ['*.log', '!keep.log', '!debug.*'],  # Negations
+    ['*.log*', 'yarn.*', '*cache', '.*', '*'],
+])
+def test_name_patterns_match_like_fnmatch(patterns):
+    matcher = PatternMatcher(patterns)
+    for name in NAMES:
+        assert matcher.matches(name) == fnmatch_loop(name, patterns), name
+
+
+@pytest.mark.parametrize('template', sorted(TEMPLATES))
+def test_templates_match_like_fnmatch(template):
+    patterns = [p for key in ('files', 'folders') for p in TEMPLATES[template][key] if '/' not in p and ':' not in p]
+    matcher = PatternMatcher(patterns)
+    for name in NAMES:
+        assert matcher.matches(name) == fnmatch_loop(name, patterns), name
+
+
+def test_fast_paths_only_take_plain_affixes():
+    rules = PatternMatcher(['*.log', 'npm-debug.log*', '*.py[co]', '*cache*', 'a*b', 'node_modules'])._include
+    assert rules.names == {'node_modules'}
+    assert rules.suffixes == ('.log',) and rules.prefixes == ('npm-debug.log',)
+    assert rules.name_regex('app.pyc') and rules.name_regex('.cache.db') and rules.name_regex('a-b')
+    assert not rules.name_regex('app.py') and rules.path_regex is None
+
+
+def test_anchored_patterns_match_the_path():
+    matcher = PatternMatcher(['packages/*/dist', '/out', 'docs/**/build', '**/coverage', '!packages/keep/dist'])
+    assert matcher.needs_path
+    hits = ['packages/ui/dist', 'out', 'docs/build', 'docs/api/v1/build', 'coverage', 'a/b/coverage']
+    misses = ['packages/ui/lib/dist', 'dist', 'src/out', 'packages/keep/dist', 'docs/buildx', 'a/coveragex']
+    for path in hits:
+        assert matcher.matches(path.rsplit('/', 1)[-1], path), path
+    for path in misses:
+        assert not matcher.matches(path.rsplit('/', 1)[-1], path), path
+    assert not matcher.matches('dist')  # No path given: anchored patterns cannot match
+
+
+@pytest.mark.parametrize('glob, hits, misses', [
+    ('*.py[co]', ['a.pyc', 'a.pyo'], ['a.py', 'a.pyd', 'dir/a.pyc']),
+    ('[!a]*', ['b', 'ba'], ['a', 'ab']),
+    ('[]]x', [']x'], ['x']),
+    ('a[', ['a['], ['a']),
+    ('**/x', ['x', 'a/x', 'a/b/x'], ['ax']),
+    ('a/**', ['a/b', 'a/b/c'], ['b/a']),
+    ('f?o.+', ['foo.+', 'fxo.+'], ['fo.+', 'f/o.+', 'foo.a']),
+])
+def test_glob_to_regex(glob, hits, misses):
+    regex = re.compile(glob_to_regex(glob) + r'\Z')
+    assert all(regex.match(text) for text in hits)
+    assert not any(regex.match(text) for text in misses)
+
+
+def test_comments_and_blank_patterns_are_ignored():
+    matcher = PatternMatcher(['# *.log', '  ', ' build '])
+    assert matcher.patterns == ('build',)
+    assert matcher.matches('build') and not matcher.matches('x.log')
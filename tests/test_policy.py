@@ -0,0 +1,47 @@
+import os
+
+from cleaner import BudgetPlanner, folder_usage, make_item, plan_budget
+from cleaner.sizing import DiskUsage
+
+
+def write(path, size):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as fh:
+        fh.write(os.urandom(size))
+
+
+def sized(path, base_path):
+    usage = folder_usage(path)
+    return make_item(path, base_path, 'Folder', usage.apparent, usage=usage)
+
+
+def plain(name, size):
+    return make_item(f'/work/{name}', '/work', 'Folder', size, usage=DiskUsage(size, size))
+
+
+def test_plan_takes_fewest_largest_items():
+    items = [plain(f'p{i}', 100) for i in range(5)] + [plain('big', 1000)]
+    assert [item['relative_path'] for item in plan_budget(items, 150)] == ['big']
+    assert [item['relative_path'] for item in plan_budget(items, 1050)] == ['big', 'p4']
+
+
+def test_plan_drops_items_the_rest_can_do_without():
+    planner = BudgetPlanner(150)
+    for item in [plain('a', 100), plain('b', 100), plain('c', 200)]:
+        planner.offer(item)
+    assert [item['relative_path'] for item in planner.chosen()] == ['c']
+    assert planner.met and planner.total == 200
+
+
+def test_plan_ignores_hardlinked_store(tmp_path):
+    # b only holds links into a store outside it: deleting it frees nothing
+    write(str(tmp_path / 'a' / 'node_modules' / 'x'), 100000)
+    for i in range(2):
+        write(str(tmp_path / 'store' / f'f{i}'), 100000)
+        os.makedirs(tmp_path / 'b' / 'node_modules', exist_ok=True)
+        os.link(tmp_path / 'store' / f'f{i}', tmp_path / 'b' / 'node_modules' / f'f{i}')
+    items = [sized(str(tmp_path / name / 'node_modules'), str(tmp_path)) for name in ('b', 'a')]
+    chosen = plan_budget(items, 90000)
+    assert [item['relative_path'] for item in chosen] == [os.path.join('a', 'node_modules')]
+    assert DiskUsage.combine(item['usage'] for item in chosen).reclaimable >= 90000
+
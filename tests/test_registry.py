@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from cleaner import load_registry
+from cleaner import registry
+from cleaner.registry import build_registry
+
+
+def config(tmp_path, data, name='templates.json'):
+    path = tmp_path / name
+    path.write_text(json.dumps(data))
+    return str(path)
+
+
+def test_extends_builds_on_parents(tmp_path):
+    reg = build_registry([config(tmp_path, {'templates': {
+        'Remix': {'extends': 'Node.js', 'folders': ['public/build', '!dist'], 'markers': ['remix.config.*']},
+        'Blog': {'extends': 'Remix', 'files': ['*.draft']},
+    }})])
+    remix, node = reg['Remix'], reg['Node.js']
+    assert remix['folders'] == node['folders'] + ['public/build', '!dist']
+    assert remix['markers'] == ['remix.config.*']  # Own markers replace the parent's
+    assert remix['supersedes'] == ['Node.js']
+    assert reg['Blog']['markers'] == ['remix.config.*']  # None of its own: inherited
+    assert reg['Blog']['files'] == node['files'] + ['*.draft']
+    assert reg['Blog']['supersedes'] == ['Node.js', 'Remix']
+
+
+def test_extending_own_name_uses_previous_layer(tmp_path):
+    user = config(tmp_path, {'templates': {'Node.js': {'extends': 'Node.js', 'folders': ['.turbo']}}})
+    project = config(tmp_path, {'templates': {'Node.js': {'extends': 'Node.js', 'folders': ['.next']}}},
+                     '.cleaner.json')
+    node = build_registry([user, project])['Node.js']
+    assert node['folders'][-2:] == ['.turbo', '.next']
+    assert 'Node.js' not in node['supersedes']
+
+
+def test_extends_cycle_is_an_error(tmp_path):
+    path = config(tmp_path, {'templates': {
+        'A': {'extends': 'B', 'folders': ['a']},
+        'B': {'extends': 'C', 'folders': ['b']},
+        'C': {'extends': 'A', 'folders': ['c']},
+    }})
+    with pytest.raises(ValueError, match='templates extend each other: A -> B -> C -> A'):
+        build_registry([path])
+
+
+@pytest.mark.parametrize('data, message', [
+    ({'templates': {'A': {'extends': 'Nope', 'folders': ['a']}}}, "extends unknown template 'Nope'"),
+    ({'templates': {'A': {'markers': ['a.txt']}}}, 'has no folders or files to clean'),
+    ({'templates': {'A': {'folders': ['a'], 'dirs': ['b']}}}, "unknown key 'dirs'"),
+    ({'templates': {'A': {'folders': ['build:']}}}, "should be 'name:entry pattern'"),
+    ({'templates': {'A': {'folders': 'a', 'markers': ['src/app/']}}}, 'must be a single name'),
+    ({'skip': ['a/b']}, 'skip takes folder names'),
+    ({'templates': []}, 'must be a table of templates'),
+    ({'exclude': []}, "unknown setting 'exclude'"),
+])
+def test_invalid_config_names_the_file(tmp_path, data, message):
+    path = config(tmp_path, data)
+    with pytest.raises(ValueError, match=message) as error:
+        build_registry([path])
+    assert str(error.value).startswith(path)
+
+
+def test_load_registry_reuses_cached_resolution(tmp_path, monkeypatch):
+    monkeypatch.setattr(registry, 'default_config_dir', lambda: str(tmp_path / 'none'))
+    monkeypatch.setattr(registry, '_loaded', {})
+    root = tmp_path / 'project'
+    root.mkdir()
+    config(root, {'skip': ['.git'], 'templates': {'Site': {'folders': ['_site']}}}, '.cleaner.json')
+    cache_path = str(tmp_path / 'cache.json')
+    first = load_registry([str(root)], cache_path=cache_path)
+    assert first['Site']['folders'] == ['_site'] and first.skip == ('.git',)
+
+    def rebuilt(paths):
+        raise AssertionError('resolved again')
+
+    monkeypatch.setattr(registry, '_loaded', {})  # As in a new process
+    monkeypatch.setattr(registry, 'build_registry', rebuilt)
+    again = load_registry([str(root)], cache_path=cache_path)
+    assert again.as_dict() == first.as_dict()
@@ -0,0 +1,93 @@
+import pytest
+
+from cleaner import DiskUsage, ResultStore, make_item
+
+
+def filled(rows=21, removed=(3, 8, 20)):
+    store = ResultStore('/work')
+    for i in range(rows):
+        item = make_item(f'/work/p{i % 4}/f{i}.log', '/work', 'File', i * 10 if i % 5 else None)
+        item['selected'] = i % 2 == 0
+        store.add(item)
+    store.remove(removed)
+    return store
+
+
+def test_select_all_sets_live_rows_only():
+    store = filled()
+    store.select_all(True)
+    assert store.selected_count == store.count == 18
+    assert store.selected_size == store.total_size
+    assert [row for row in range(21) if store.is_selected(row)] == list(store.rows())
+
+    row = store.add(make_item('/work/new.log', '/work', 'File', 5))  # Fills the last bitmap byte
+    assert store.is_selected(row) and store.selected_count == 19
+
+
+def test_select_none_then_new_row_unselected():
+    store = filled()
+    store.select_all(False)
+    assert store.selected_count == store.selected_size == 0
+    assert not any(store.is_selected(row) for row in range(21))
+
+    item = make_item('/work/new.log', '/work', 'File', 5)
+    item['selected'] = False
+    store.select_all(True)
+    row = store.add(item)
+    assert not store.is_selected(row) and store.selected_count == 18
+
+
+def fields(item):
+    usage = item.pop('usage')
+    return item, usage and (usage.apparent, usage.allocated, usage.reclaimable)
+
+
+def test_snapshot_round_trip(tmp_path):
+    store = filled()
+    store.add(make_item('/work/p0/node_modules', '/work', 'Folder', 9000, usage=DiskUsage(9000, 12288)))
+    path = str(tmp_path / 'results.bin')
+    store.save(path, {'roots': ['/work']})
+    loaded, meta = ResultStore.load(path)
+    assert meta == {'roots': ['/work']}
+    assert list(loaded.rows()) == list(store.rows())
+    assert [fields(loaded.item(row)) for row in loaded.rows()] == [fields(store.item(row)) for row in store.rows()]
+    assert (loaded.count, loaded.total_size, loaded.selected_count, loaded.selected_size) == \
+        (store.count, store.total_size, store.selected_count, store.selected_size)
+
+    row = loaded.add(make_item('/work/p9/new.log', '/work', 'File', 5))  # New directory after the saved ones
+    assert loaded.path(row) == '/work/p9/new.log' and loaded.count == store.count + 1
+    store.close()
+    loaded.close()
+
+
+def test_snapshot_rejects_other_files(tmp_path):
+    store = filled()
+    path = str(tmp_path / 'results.bin')
+    store.save(path)
+    store.close()
+    with open(path, 'rb') as fh:
+        data = fh.read()
+    magic, header, body = data.split(b'\n', 2)
+
+    damaged = [(b'not a snapshot\n', 'not a results snapshot'),
+               (magic + b'\n{"rows": 3\n' + body, 'damaged header'),
+               (magic + b'\n[]\n' + body, 'damaged header'),
+               (data[:-5], 'truncated'),
+               (magic + b'\n' + header + b'\n' + body[:10], 'truncated')]
+    for content, message in damaged:
+        with open(path, 'wb') as fh:
+            fh.write(content)
+        with pytest.raises(ValueError, match=message):
+            ResultStore.load(path)
+
+
+def test_many_templates_round_trip(tmp_path):
+    store = ResultStore('/work')
+    for i in range(300):
+        store.add(make_item(f'/work/p{i}/out', '/work', 'Folder', i, template=f'Custom {i}'))
+    path = str(tmp_path / 'results.bin')
+    store.save(path)
+    loaded, _meta = ResultStore.load(path)
+    assert [loaded.template(row) for row in loaded.rows()] == [f'Custom {i}' for i in range(300)]
+    store.close()
+    loaded.close()
@@ -0,0 +1,82 @@
+import json
+import os
+
+import pytest
+
+from cleaner import AUTO, ProjectScan, dedupe_roots
+from cleaner.registry import build_registry
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    """A workspace folder holding one Remix project, whose template anchors public/gen"""
+    site = tmp_path / 'ws' / 'site'
+    (site / 'public' / 'gen').mkdir(parents=True)
+    (site / 'public' / 'gen' / 'app.js').write_text('x')
+    (site / 'node_modules').mkdir()
+    (site / 'package.json').write_text('{}')
+    (site / 'remix.config.js').write_text('')
+    config = tmp_path / 'remix.json'
+    config.write_text(json.dumps({'templates': {'Remix': {
+        'extends': 'Node.js', 'folders': ['public/gen'], 'markers': ['remix.config.*']}}}))
+    return tmp_path / 'ws', build_registry([str(config)])
+
+
+@pytest.mark.parametrize('templates', [AUTO, 'Remix'])
+def test_anchored_pattern_matches_nested_project(workspace, templates):
+    root, registry = workspace
+    found = sorted(item['relative_path'] for item in ProjectScan(str(root), templates, registry=registry))
+    assert found == [os.path.join('site', 'node_modules'), os.path.join('site', 'public', 'gen')]
+
+
+def test_anchored_pattern_matches_project_as_root(workspace):
+    root, registry = workspace
+    found = sorted(item['relative_path'] for item in ProjectScan(str(root / 'site'), 'Remix', registry=registry))
+    assert found == ['node_modules', os.path.join('public', 'gen')]
+
+
+@pytest.mark.parametrize('templates', [AUTO, 'Remix'])
+def test_items_carry_their_project(workspace, templates):
+    root, registry = workspace
+    projects = {item['project'] for item in ProjectScan(str(root), templates, registry=registry)}
+    assert projects == {os.path.realpath(root / 'site')}
+
+
+def node_project(path):
+    (path / 'node_modules').mkdir(parents=True)
+    (path / 'package.json').write_text('{}')
+
+
+def test_dedupe_roots_drops_nested_and_repeated(tmp_path):
+    for name in ('a', 'a/inner', 'ab', 'b'):
+        (tmp_path / name).mkdir()
+    os.symlink(tmp_path / 'b', tmp_path / 'b-link')
+    roots = [str(tmp_path / name) for name in ('a/inner', 'ab', 'a', 'b', 'b-link', 'a', 'missing')]
+    roots.append(str(tmp_path / 'a') + os.sep)
+    assert sorted(dedupe_roots(roots)) == [os.path.realpath(tmp_path / name) for name in ('a', 'ab', 'b')]
+
+
+def test_multi_root_scan(tmp_path):
+    for name in ('one/app', 'two/app', 'two/lib'):
+        node_project(tmp_path / name)
+    scan = ProjectScan([str(tmp_path / 'one'), str(tmp_path / 'two'), str(tmp_path / 'two' / 'lib')], AUTO)
+    assert len(scan.roots) == 2
+    found = sorted(item['path'] for item in scan)
+    assert found == [os.path.realpath(tmp_path / name / 'node_modules') for name in ('one/app', 'two/app', 'two/lib')]
+
+
+def test_multi_root_scan_raises_a_roots_error(tmp_path):
+    for name in ('one/app', 'two/app'):
+        node_project(tmp_path / name)
+    scan = ProjectScan([str(tmp_path / 'one'), str(tmp_path / 'two')], AUTO)
+    scan_root = scan._scan_root
+
+    def failing(root):
+        if root.endswith('two'):
+            raise RuntimeError('disk went away')
+        yield from scan_root(root)
+
+    scan._scan_root = failing
+    with pytest.raises(RuntimeError, match='disk went away'):
+        list(scan)
+    assert scan.cancelled
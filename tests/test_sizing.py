@@ -0,0 +1,33 @@
+import os
+import threading
+import time
+
+import cleaner.sizing
+from cleaner import FolderSizer, walk_project
+
+
+def test_sizer_gives_up_on_hung_device(tmp_path, monkeypatch):
+    (tmp_path / 'node_modules' / 'pkg').mkdir(parents=True)
+    dev = os.stat(tmp_path).st_dev
+    sizer = FolderSizer(2, device_timeout=0.2, mounts={os.sep: (dev, 'nfs')})  # Everything counts as NFS
+    hung = threading.Event()
+    size_dir = cleaner.sizing.size_dir
+    monkeypatch.setattr(cleaner.sizing, 'size_dir', lambda path, stats=None: hung.wait() and size_dir(path, stats))
+    try:
+        began = time.monotonic()
+        usage = sizer.submit(str(tmp_path / 'node_modules')).result(5)
+        assert usage.apparent == 0 and time.monotonic() - began < 2
+        assert sizer.skipped == [(str(tmp_path / 'node_modules'), 'timeout')]
+        sizer.usage(str(tmp_path))  # The device is stalled now: no waiting again
+        assert sizer.skipped[-1] == (str(tmp_path), 'stalled device')
+    finally:
+        hung.set()
+        sizer.shutdown()
+
+
+def test_walk_project_uses_skip_names(tmp_path):
+    for folder in ('app/node_modules', 'app/vendor/dist', 'app/dist'):
+        (tmp_path / folder).mkdir(parents=True)
+    found = {rel: matched for _path, rel, matched, _files in walk_project(str(tmp_path), ['dist'],
+                                                                          skip_names={'vendor'})}
+    assert found == {'': [], 'app': ['dist'], 'app/node_modules': []}
@@ -0,0 +1,76 @@
+import os
+
+import pytest
+
+from cleaner import Trash
+from cleaner.trash import _lower_thread_priority
+
+
+@pytest.fixture
+def trash(tmp_path):
+    return Trash(grace=60, cache_dir=str(tmp_path / 'cache'))
+
+
+def make_item(root):
+    item = root / 'app' / 'node_modules'
+    (item / 'pkg').mkdir(parents=True)
+    (item / 'pkg' / 'index.js').write_text('x')
+    return item
+
+
+def test_stage_and_restore(tmp_path, trash):
+    item = make_item(tmp_path)
+    staged = trash.stage(str(item))
+    assert not item.exists() and os.path.isdir(staged.payload)
+    assert trash.restore(staged)
+    assert (item / 'pkg' / 'index.js').read_text() == 'x'
+    assert not os.path.exists(staged.entry_dir)
+    assert not trash.restore(staged)  # Only once
+
+
+def test_restore_onto_taken_path_keeps_item_staged(tmp_path, trash):
+    item = make_item(tmp_path)
+    staged = trash.stage(str(item))
+    item.mkdir()
+    assert not trash.restore(staged)
+    assert os.path.isdir(staged.payload)
+    assert trash.reap_due(now=staged.staged_at) == staged.staged_at + 60  # Still due for reaping
+
+
+def test_failed_rename_keeps_item_staged(tmp_path, trash):
+    item = make_item(tmp_path)
+    staged = trash.stage(str(item))
+    (tmp_path / 'app').rmdir()  # Parent gone: the rename back fails with ENOENT
+    assert not trash.restore(staged)
+    assert os.path.isdir(staged.payload)
+    trash.reap_due(now=staged.staged_at + 60)
+    assert not os.path.exists(staged.entry_dir)
+
+
+def test_resume_reaps_leftovers_of_earlier_run(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    staged = Trash(cache_dir=cache_dir).stage(str(make_item(tmp_path)))
+    later = Trash(grace=0, cache_dir=cache_dir)
+    later.resume()
+    later.reap_due()
+    assert not os.path.exists(staged.entry_dir)
+
+
+@pytest.mark.parametrize('platform, calls', [('linux', 1), ('darwin', 0), ('win32', 0)])
+def test_reaper_priority_only_lowered_per_thread_on_linux(monkeypatch, platform, calls):
+    seen = []
+    monkeypatch.setattr('sys.platform', platform)
+    monkeypatch.setattr(os, 'setpriority', lambda *args: seen.append(args), raising=False)
+    monkeypatch.setattr(os, 'PRIO_PROCESS', 0, raising=False)
+    _lower_thread_priority()
+    assert len(seen) == calls
+
+
+def test_refused_priority_change_is_ignored(monkeypatch):
+    def refuse(*args):
+        raise PermissionError('not allowed')
+
+    monkeypatch.setattr('sys.platform', 'linux')
+    monkeypatch.setattr(os, 'setpriority', refuse, raising=False)
+    monkeypatch.setattr(os, 'PRIO_PROCESS', 0, raising=False)
+    _lower_thread_priority()
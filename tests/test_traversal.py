@@ -0,0 +1,61 @@
+import os
+
+from cleaner import FolderSizer, Traversal
+from cleaner.scanner import list_dir
+from cleaner.traversal import LOOP, OTHER_FILESYSTEM
+
+
+def following(path, stats=None):
+    """A lister that treats symlinked folders as folders, so the walk can meet a loop"""
+    with os.scandir(path) as entries:
+        entries = list(entries)
+    return [e.name for e in entries if e.is_dir()], [e.name for e in entries if not e.is_dir()]
+
+
+def tree(root):
+    for folder in ('a/b', 'c'):
+        (root / folder).mkdir(parents=True)
+
+
+def walked(traversal, root, lister=list_dir):
+    return [visit.rel for visit in traversal.walk(str(root), lister)]
+
+
+def test_symlink_loop_is_walked_once(tmp_path):
+    tree(tmp_path)
+    os.symlink(tmp_path / 'a', tmp_path / 'a' / 'b' / 'up')
+    traversal = Traversal(mounts={})
+    rels = walked(traversal, tmp_path, following)
+    assert sorted(rels) == ['', 'a', 'a/b', 'a/b/up', 'c']  # up is the link itself, listed once
+    assert traversal.skipped == [(str(tmp_path / 'a' / 'b' / 'up' / 'b'), LOOP)]
+
+
+def test_alias_of_walked_folder_is_skipped(tmp_path):
+    # Like a bind mount: the same directory under a second path
+    tree(tmp_path)
+    os.symlink(tmp_path / 'a', tmp_path / 'alias')
+    traversal = Traversal(mounts={})
+    walked(traversal, tmp_path / 'a')
+    assert walked(traversal, tmp_path / 'alias') == ['']  # The link itself, then its contents are known
+    assert traversal.skipped == [(str(tmp_path / 'alias' / 'b'), LOOP)]
+
+
+def test_one_filesystem_stays_on_the_root_device(tmp_path):
+    tree(tmp_path)
+    other = os.stat(tmp_path).st_dev + 1
+    mounts = {str(tmp_path / 'a'): (other, 'ext4')}
+    assert sorted(walked(Traversal(mounts=mounts), tmp_path)) == ['', 'a', 'a/b', 'c']
+    traversal = Traversal(one_filesystem=True, mounts=mounts)
+    assert sorted(walked(traversal, tmp_path)) == ['', 'c']
+    assert traversal.skipped == [(str(tmp_path / 'a'), OTHER_FILESYSTEM)]
+
+
+def test_sizer_reset_keeps_given_mounts(tmp_path):
+    dev = os.stat(tmp_path).st_dev
+    mounts = {os.sep: (dev, 'nfs')}
+    sizer = FolderSizer(1, mounts=mounts)
+    try:
+        sizer.reset()
+        assert sizer.traversal.mounts is mounts and sizer.traversal.slow_devices == {dev}
+    finally:
+        sizer.shutdown()
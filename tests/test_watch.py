@@ -0,0 +1,51 @@
+import os
+import sys
+import threading
+
+import pytest
+
+from cleaner import AUTO, LiveIndex, ScanCache
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith('linux'), reason='inotify only')
+
+
+def test_append_to_existing_file_resizes(tmp_path):
+    project = tmp_path / 'app'
+    (project / 'node_modules').mkdir(parents=True)
+    (project / 'package.json').write_text('{}')
+    blob = project / 'node_modules' / 'blob'
+    blob.write_bytes(b'x' * 1000)
+
+    resized = threading.Event()
+    sizes = []
+
+    def on_change(added, removed, changed):
+        sizes.extend(item['size'] for item in changed)
+        if changed:
+            resized.set()
+
+    cache = ScanCache(path=str(tmp_path / 'cache.sqlite3'))
+    index = LiveIndex([str(tmp_path)], 'Node.js', cache=cache,
+                      path=str(tmp_path / 'index.sqlite3'), on_change=on_change)
+    index.start()
+    try:
+        assert index.ready.wait(10)
+        mtime = os.stat(project / 'node_modules').st_mtime_ns
+        with open(blob, 'ab') as fh:
+            fh.write(b'y' * 500)
+        assert os.stat(project / 'node_modules').st_mtime_ns == mtime  # The directory itself is unchanged
+        assert resized.wait(10)
+        assert sizes[-1] == 1500
+    finally:
+        index.stop()
+
+
+def test_saved_index_keeps_projects(tmp_path):
+    project = tmp_path / 'ws' / 'app'
+    (project / 'node_modules').mkdir(parents=True)
+    (project / 'package.json').write_text('{}')
+    options = dict(cache=ScanCache(path=str(tmp_path / 'cache.sqlite3')), path=str(tmp_path / 'index.sqlite3'))
+    assert LiveIndex([str(tmp_path / 'ws')], AUTO, **options).refresh()
+    loaded = LiveIndex([str(tmp_path / 'ws')], AUTO, **options)
+    assert loaded.load()
+    assert [item['project'] for item in loaded.items()] == [os.path.realpath(project)]